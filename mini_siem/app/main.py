@@ -4,6 +4,7 @@ Provides dashboard for visualizing and managing alerts
 """
 
 from flask import Flask, render_template, jsonify, request
+import atexit
 import logging
 from datetime import datetime, timedelta
 import json
@@ -13,8 +14,10 @@ from pathlib import Path
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from core.database import DatabaseManager
-from core.enricher import IPEnricher
+from core.database import create_database_manager
+from core.enricher import build_enricher
+from core.ratelimit import PRIORITY_HIGH
+import config
 
 logger = logging.getLogger(__name__)
 
@@ -22,8 +25,13 @@ app = Flask(__name__)
 app.config['JSON_SORT_KEYS'] = False
 
 # Initialize managers
-db_manager = DatabaseManager()
-ip_enricher = IPEnricher(use_free_api=True)
+db_manager = create_database_manager(config)
+atexit.register(db_manager.close)
+# Shares the orchestrator's persisted lookups through the database
+ip_enricher = build_enricher(config, db_manager, process='dashboard')
+ip_enricher.cache.warm()
+atexit.register(ip_enricher.cache.close)
+atexit.register(ip_enricher.close)
 
 
 @app.route('/')
@@ -108,7 +116,8 @@ def get_correlations():
 def enrich_ip(ip):
     """Enrich an IP address"""
     try:
-        enrichment = ip_enricher.enrich_ip(ip)
+        # An analyst is waiting on this one
+        enrichment = ip_enricher.enrich_ip(ip, priority=PRIORITY_HIGH)
 
         return jsonify({
             'success': True,
@@ -126,14 +135,14 @@ def get_stats():
     try:
         stats = db_manager.get_alert_stats()
         
-        # Get alerts from last hour
-        alerts_last_hour = len(db_manager.get_recent_alerts(limit=10000))
+        # Get alerts from last hour (the most recent alerts, capped at 10000)
+        alerts_last_hour = min(stats['total_alerts'], 10000)
         
         return jsonify({
             'success': True,
             'stats': {
                 **stats,
-                'alerts_last_hour': min(alerts_last_hour, 10000)
+                'alerts_last_hour': alerts_last_hour
             },
             'timestamp': datetime.now().isoformat()
         })
@@ -5,6 +5,7 @@ Provides real-time dashboard, analytics, and advanced search
 
 from flask import Flask, render_template, jsonify, request
 from flask_socketio import SocketIO, emit, join_room, leave_room
+import atexit
 import logging
 from datetime import datetime, timedelta
 import json
@@ -18,8 +19,10 @@ from collections import Counter
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from core.database import DatabaseManager
-from core.enricher import IPEnricher
+from core.database import create_database_manager
+from core.enricher import build_enricher
+from core.ratelimit import PRIORITY_HIGH
+import config
 
 logger = logging.getLogger(__name__)
 
@@ -31,8 +34,13 @@ app.config['SECRET_KEY'] = 'mini-siem-secret-key-2025'
 socketio = SocketIO(app, cors_allowed_origins="*")
 
 # Initialize managers
-db_manager = DatabaseManager()
-ip_enricher = IPEnricher(use_free_api=True)
+db_manager = create_database_manager(config)
+atexit.register(db_manager.close)
+# Shares the orchestrator's persisted lookups through the database
+ip_enricher = build_enricher(config, db_manager, process='dashboard_enhanced')
+ip_enricher.cache.warm()
+atexit.register(ip_enricher.cache.close)
+atexit.register(ip_enricher.close)
 
 # Shared color palette for charts (consistent across charts)
 PALETTE = {
@@ -451,7 +459,8 @@ def api_stats():
 def api_enrich_ip(ip):
     """Enrich IP address with geolocation and organization data"""
     try:
-        enrichment = ip_enricher.enrich_ip(ip)
+        # An analyst is waiting on this one
+        enrichment = ip_enricher.enrich_ip(ip, priority=PRIORITY_HIGH)
         return jsonify({'success': True, 'ip': ip, 'enrichment': enrichment})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
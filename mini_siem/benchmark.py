@@ -0,0 +1,883 @@
+#!/usr/bin/env python3
+"""
+Mini SIEM Benchmarks
+Measures throughput of the ingest pipeline components
+"""
+
+import sys
+import time
+import json
+import random
+import gzip
+import shutil
+import sqlite3
+import argparse
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import tempfile
+from pathlib import Path
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.collector import (SnortAlertParser, MockAlertGenerator, AlertCollector,
+                            open_alert_stream, iter_line_chunks)
+from core.database import DatabaseManager
+from core.migrations import MIGRATIONS, get_schema_version
+from core.backfill import BackfillImporter
+from core.alert import Alert
+from core.cache import EnrichmentCache, PersistentEnrichmentCache
+from core.enricher import IPEnricher
+from core.geoip import GeoIPDatabase
+from core.networks import NetworkClassifier
+from core.providers import IPAPIProvider
+from core.stub_provider import StubProviderServer
+from core.pipeline import AlertPipeline, GroupCommitWriter
+from core.correlator import CorrelationEngine
+from core.loadgen import LoadGenerator, write_lines
+
+
+def print_header(text):
+    """Print formatted header"""
+    print("\n" + "=" * 60)
+    print(f"  {text}")
+    print("=" * 60)
+
+
+def print_result(label, count, elapsed, unit="lines"):
+    """Print a throughput line"""
+    rate = count / elapsed if elapsed > 0 else float('inf')
+    print(f"→ {label:<32} {elapsed:8.3f}s  {rate:12,.0f} {unit}/sec")
+
+
+def make_fast_lines(count, seed=42, junk_ratio=0.0):
+    """Build synthetic Snort fast-format lines"""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        if junk_ratio and rng.random() < junk_ratio:
+            lines.append(f"junk line {i} that no parser accepts")
+            continue
+        lines.append(
+            f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}-"
+            f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}."
+            f"{rng.randint(0, 999999):06d}  "
+            f"[Classification: {rng.choice(MockAlertGenerator.SIGNATURES)}] "
+            f"[Priority: {rng.randint(1, 4)}] "
+            f"{{{rng.choice(['TCP', 'UDP', 'ICMP'])}}} "
+            f"203.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}:{rng.randint(1024, 65535)} -> "
+            f"10.0.0.{rng.randint(1, 254)}:{rng.choice([22, 80, 443])}"
+        )
+    return lines
+
+
+def bench_batch_parser(count):
+    """Per-line parse_snort_line path vs. parse_buffer"""
+    print_header(f"Batch Parser ({count:,} lines)")
+
+    parser = SnortAlertParser()
+    lines = make_fast_lines(count)
+    buffer = ("\n".join(lines) + "\n").encode('utf-8')
+
+    # Per-line path as used by AlertCollector before batching
+    start = time.perf_counter()
+    per_line = 0
+    for line in buffer.decode('utf-8').splitlines(True):
+        if not line.strip():
+            continue
+        alert = parser.parse_snort_line(line)
+        if not alert:
+            alert = parser.parse_csv_format(line)
+        if alert:
+            per_line += 1
+    print_result("per-line (search + strptime)", count, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    batch = parser.parse_buffer(buffer)
+    print_result("parse_buffer (finditer)", count, time.perf_counter() - start)
+
+    assert per_line == batch['matched'], "Batch parser disagrees with per-line parser"
+
+
+def bench_backfill(count):
+    """Serial vs. parallel archive backfill into a scratch database"""
+    print_header(f"Backfill ({count:,} lines)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = Path(tmp) / "alert_fast.log"
+        archive.write_text("\n".join(make_fast_lines(count, junk_ratio=0.01)) + "\n")
+
+        for workers in (1, 2, 4):
+            db = DatabaseManager(str(Path(tmp) / f"backfill_{workers}.db"))
+            importer = BackfillImporter(db, workers=workers, chunk_size=2 * 1024 * 1024)
+            totals = importer.import_file(str(archive))
+            print_result(f"{workers} worker(s)", totals['lines'], totals['elapsed'])
+
+
+def bench_compressed(count):
+    """Chunked streaming parse of plain vs. gzip/zstd alert logs"""
+    print_header(f"Compressed Logs ({count:,} lines)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = ("\n".join(make_fast_lines(count)) + "\n").encode('utf-8')
+        files = {'plain': Path(tmp) / "alert_fast.log.1"}
+        files['plain'].write_bytes(raw)
+        files['gzip'] = Path(tmp) / "alert_fast.log.1.gz"
+        files['gzip'].write_bytes(gzip.compress(raw, compresslevel=6))
+        try:
+            import zstandard
+            files['zstd'] = Path(tmp) / "alert_fast.log.1.zst"
+            files['zstd'].write_bytes(zstandard.ZstdCompressor().compress(raw))
+        except ImportError:
+            print("→ zstandard not installed, skipping .zst")
+
+        parser = SnortAlertParser()
+        for label, path in files.items():
+            start = time.perf_counter()
+            alerts = 0
+            with open_alert_stream(str(path)) as stream:
+                for chunk in iter_line_chunks(stream):
+                    alerts += parser.parse_buffer(chunk)['matched']
+            elapsed = time.perf_counter() - start
+            size_mb = path.stat().st_size / (1024 * 1024)
+            print_result(f"{label} ({size_mb:.1f} MB on disk)", count, elapsed)
+            assert alerts == count
+
+
+def bench_alert_records(count):
+    """Memory and build time of dict alerts vs. slotted Alert records"""
+    print_header(f"Alert Records ({count:,} alerts)")
+
+    rng = random.Random(42)
+    fields = [
+        (rng.choice(MockAlertGenerator.SIGNATURES), f"203.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+         rng.randint(1024, 65535), rng.choice(MockAlertGenerator.PROTOCOLS))
+        for _ in range(count)
+    ]
+    now = datetime.now()
+
+    def as_dict(sig, ip, port, proto):
+        return {'timestamp': now, 'signature': sig, 'classification': sig, 'priority': '2',
+                'severity': 'MEDIUM', 'protocol': proto, 'src_ip': ip, 'src_port': port,
+                'dst_ip': '10.0.0.1', 'dst_port': 22, 'message': sig}
+
+    def as_record(sig, ip, port, proto):
+        return Alert(now, sig, sig, '2', 'MEDIUM', proto, ip, port, '10.0.0.1', 22, sig)
+
+    for label, build in (("dict", as_dict), ("Alert (__slots__)", as_record)):
+        start = time.perf_counter()
+        alerts = [build(*f) for f in fields]
+        print_result(label, count, time.perf_counter() - start, unit="alerts")
+        del alerts
+
+        # Measured separately: tracing allocations distorts the timing
+        tracemalloc.start()
+        alerts = [build(*f) for f in fields]
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  {'':<32} {current / (1024 * 1024):8.1f} MB  ({current / count:.0f} bytes/alert)")
+        del alerts
+
+    parser = SnortAlertParser()
+    buffer = ("\n".join(make_fast_lines(min(count, 200000))) + "\n").encode('utf-8')
+    tracemalloc.start()
+    alerts = parser.parse_buffer(buffer)['alerts']
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"→ parse_buffer output: {current / len(alerts):.0f} bytes/alert incl. message strings")
+
+
+def bench_load_test(count, rate=50000):
+    """Synthetic load through collector -> pipeline -> database -> correlator"""
+    print_header(f"Load Test ({count:,} lines at {rate:,} lines/sec)")
+
+    class NoLookupEnricher:
+        # Keeps the run offline; enrichment cost is measured separately
+        def enrich_alert(self, alert):
+            alert['enrichment'] = {}
+            return alert
+
+    with tempfile.TemporaryDirectory() as tmp:
+        alert_file = Path(tmp) / "alert_fast.log"
+        alert_file.write_text("")
+        db = DatabaseManager(str(Path(tmp) / "load.db"))
+        collector = AlertCollector(str(alert_file))
+        collector.start_collection()
+        pipeline = AlertPipeline(NoLookupEnricher(), db, enrich_workers=2)
+        pipeline.start()
+
+        generator = LoadGenerator(seed=42)
+        written = {}
+        writer = threading.Thread(target=lambda: written.update(
+            write_lines(str(alert_file), generator.lines(count, rate), rate=rate)))
+
+        start = time.perf_counter()
+        writer.start()
+        collected = 0
+        while collected < count:
+            alerts = collector.read_new_alerts()
+            pipeline.submit(alerts, collector.checkpoint_state())
+            collected += len(alerts)
+            if collected < count:
+                collector.wait_for_alerts(timeout=1)
+        pipeline.stop()
+        elapsed = time.perf_counter() - start
+        writer.join()
+
+        print_result("writer", written['lines'], written['elapsed'])
+        print_result("collected and stored", collected, elapsed)
+        metrics = pipeline.get_metrics()
+        print(f"  {'':<32} enrich queue high water {metrics['enrich']['high_water']:,}, "
+              f"persist queue high water {metrics['persist']['high_water']:,}")
+        collector.stop_collection()
+
+        start = time.perf_counter()
+        try:
+            detections = CorrelationEngine(db).analyze_alerts()
+            print_result(f"correlation ({len(detections)} detections)", collected,
+                         time.perf_counter() - start, unit="alerts")
+        except Exception as e:
+            print(f"✗ Correlation failed: {str(e)}")
+
+
+def bench_enrichment_cache(count):
+    """Cold start with a warmed persistent cache vs. a running process"""
+    count = min(count, 100000)
+    print_header(f"Persistent Enrichment Cache ({count:,} IPs)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(str(Path(tmp) / "cache.db"))
+        ips = [f"{1 + i % 200}.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}" for i in range(count)]
+        record = IPEnricher._get_default_enrichment()
+
+        # Shards fill unevenly, so leave headroom over the working set
+        cache = PersistentEnrichmentCache(db, max_size=2 * count)
+        start = time.perf_counter()
+        for ip in ips:
+            cache.set(ip, dict(record, country='Cached'))
+        cache.close()
+        print_result("set + batched write-behind", count, time.perf_counter() - start, unit="IPs")
+
+        # Restarted process: load the table, then look everything up
+        start = time.perf_counter()
+        restarted = PersistentEnrichmentCache(db, max_size=2 * count)
+        warmed = restarted.warm()
+        print_result(f"warm() at startup ({warmed:,} rows)", warmed, time.perf_counter() - start, unit="IPs")
+
+        enricher = IPEnricher(cache=restarted)
+        for label in ("first lookups after restart", "lookups in a running process"):
+            start = time.perf_counter()
+            for ip in ips:
+                enricher.enrich_ip(ip)
+            print_result(label, count, time.perf_counter() - start, unit="lookups")
+
+        stats = restarted.get_stats()
+        print(f"  {'':<32} {stats['hits']:,} memory hits, {stats['persistent_hits']:,} database hits, "
+              f"{stats['memory_bytes'] / (1024 * 1024):.1f} MB")
+        restarted.close()
+
+
+def bench_geoip(count):
+    """Offline range database load time and lookup rate"""
+    ranges = 1000000
+    print_header(f"Offline GeoIP ({ranges:,} ranges, {count:,} lookups)")
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "ranges.csv"
+        with open(path, 'w') as f:
+            f.write("start,end,country_code,country,city,asn,org\n")
+            step = (2 ** 32) // ranges
+            for i in range(ranges):
+                country = rng.randrange(250)
+                f.write(f"{i * step},{i * step + step - 1},C{country},Country {country},"
+                        f"City {rng.randrange(5000)},{rng.randrange(60000)},Org {rng.randrange(20000)}\n")
+
+        start = time.perf_counter()
+        db = GeoIPDatabase.from_csv(str(path))
+        print_result("from_csv", ranges, time.perf_counter() - start, unit="ranges")
+        stats = db.get_stats()
+        print(f"  {'':<32} {stats['records']:,} records, {stats['array_bytes'] / (1024 * 1024):.1f} MB of range arrays")
+
+    ips = [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+           for _ in range(count)]
+    lookup = db.lookup
+    start = time.perf_counter()
+    for ip in ips:
+        lookup(ip)
+    elapsed = time.perf_counter() - start
+    print_result("GeoIPDatabase.lookup", count, elapsed, unit="lookups")
+    print(f"  {'':<32} {count / elapsed * 60 / 1e6:,.1f}M lookups/minute")
+
+    enricher = IPEnricher(geoip=db)
+    start = time.perf_counter()
+    for ip in ips:
+        enricher.enrich_ip(ip)
+    print_result("IPEnricher.enrich_ip (offline)", count, time.perf_counter() - start, unit="lookups")
+
+
+def _split_is_private(ip):
+    """The per-call string parsing NetworkClassifier replaced (IPv4 only)"""
+    try:
+        parts = ip.split('.')
+        if len(parts) != 4:
+            return False
+        octets = [int(p) for p in parts]
+        if octets[0] == 10:
+            return True
+        if octets[0] == 172 and 16 <= octets[1] <= 31:
+            return True
+        if octets[0] == 192 and octets[1] == 168:
+            return True
+        if octets[0] == 127:
+            return True
+        return False
+    except:
+        return False
+
+
+def bench_networks(count):
+    """Internal/external classification: string parsing vs. compiled prefixes"""
+    print_header(f"Network Classification ({count:,} addresses)")
+
+    rng = random.Random(42)
+    ips = []
+    for i in range(count):
+        kind = i % 10
+        if kind < 4:
+            ips.append(f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}")
+        elif kind < 8:
+            ips.append(f"192.168.{rng.randint(0, 255)}.{rng.randint(1, 254)}" if kind < 6
+                       else f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}")
+        elif kind == 8:
+            ips.append(f"172.{rng.randint(0, 40)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}")
+        else:
+            ips.append(f"2001:db8:{rng.randint(0, 0xffff):x}::{rng.randint(1, 0xffff):x}")
+
+    start = time.perf_counter()
+    for ip in ips:
+        _split_is_private(ip)
+    baseline = time.perf_counter() - start
+    print_result("split/int() per call (IPv4 only)", count, baseline, unit="addresses")
+
+    networks = NetworkClassifier(['10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16', '2001:db8:0::/40'])
+    classify = networks.classify
+    start = time.perf_counter()
+    for ip in ips:
+        classify(ip)
+    elapsed = time.perf_counter() - start
+    print_result("NetworkClassifier.classify", count, elapsed, unit="addresses")
+    print(f"  {'':<32} {baseline / elapsed:.1f}x the old rate, with IPv6 and {networks.prefix_count} prefixes")
+
+    external = sum(1 for ip in ips if classify(ip) is None)
+    print(f"  {'':<32} {external:,} of {count:,} addresses left for external enrichment")
+
+
+def bench_providers(count):
+    """Enrichment throughput by cache hit ratio, provider latency and batch size"""
+    count = min(count, 5000)
+    print_header(f"Enrichment Providers ({count:,} public IPs per run, stub server)")
+
+    ips = [f"{1 + i // 65536 % 9}.{i // 256 % 256}.{i % 256}.{7 + i % 200}" for i in range(count)]
+    for latency in (0.0, 0.01, 0.05):
+        stub = StubProviderServer(latency=latency).start()
+        try:
+            for hit_ratio in (0.0, 0.5, 0.9):
+                for batch_size in (1, 100):
+                    enricher = IPEnricher(cache=EnrichmentCache(max_size=count * 2),
+                                          provider=IPAPIProvider(stub.url, batch_size=batch_size))
+                    for ip in ips[:int(count * hit_ratio)]:
+                        enricher.cache.set(ip, IPAPIProvider.from_ip_api(stub.make_record(ip)))
+
+                    before = stub.get_stats()['requests']
+                    start = time.perf_counter()
+                    # Deferred backfill shape: distinct IPs 500 at a time
+                    for i in range(0, count, 500):
+                        enricher.enrich_ips(ips[i:i + 500])
+                    elapsed = time.perf_counter() - start
+                    enricher.close()
+
+                    requests_made = stub.get_stats()['requests'] - before
+                    print_result(f"{latency * 1000:>2g}ms {hit_ratio:>4.0%} hits batch {batch_size:<3}",
+                                 count, elapsed, unit="IPs")
+                    print(f"  {'':<32} {requests_made:,} provider requests")
+        finally:
+            stub.stop()
+
+
+def bench_group_commit(count):
+    """Stored rows/sec: one commit per alert vs. group commit by batch size"""
+    count = min(count, 50000)
+    producers = 4
+    print_header(f"Group Commit ({count:,} alerts from {producers} threads)")
+
+    alerts = MockAlertGenerator.generate_batch(count=count)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Baseline: insert_alert per alert, capped (it is slow on real disks)
+        single = min(count, 2000)
+        db = DatabaseManager(str(Path(tmp) / "single.db"))
+        start = time.perf_counter()
+        for alert in alerts[:single]:
+            db.insert_alert(alert)
+        print_result("insert_alert per alert", single, time.perf_counter() - start, unit="rows")
+
+        for batch_size in (10, 100, 500, 1000):
+            db = DatabaseManager(str(Path(tmp) / f"group-{batch_size}.db"))
+            writer = GroupCommitWriter(db, batch_size=batch_size, max_latency=0.05,
+                                       queue_size=max(5000, batch_size * 2))
+            writer.start()
+            share = count // producers
+
+            def produce(offset):
+                writer.write_many(alerts[offset:offset + share])
+
+            threads = [threading.Thread(target=produce, args=(i * share,)) for i in range(producers)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            writer.flush()
+            elapsed = time.perf_counter() - start
+            writer.stop()
+
+            metrics = writer.get_metrics()
+            print_result(f"group commit, batch {batch_size}", share * producers, elapsed, unit="rows")
+            print(f"  {'':<32} {metrics['batches']:,} commits, "
+                  f"{metrics['commit_seconds'] / max(1, metrics['batches']) * 1000:.2f}ms per commit")
+
+
+def bench_time_windows(count):
+    """Time-window queries: datetime(timestamp) filters vs. timestamp_us range scans"""
+    count = min(count, 1000000)
+    print_header(f"Time-Window Queries ({count:,} alerts over 7 days, 2,000 source IPs)")
+
+    rng = random.Random(42)
+    ips = [f"203.0.{i // 250}.{i % 250 + 1}" for i in range(2000)]
+    now = datetime.now()
+    alerts = [{'signature': f"Bench {i % 40}", 'src_ip': ips[min(int(rng.paretovariate(1.2)) - 1, 1999)],
+               'dst_ip': '10.0.0.1', 'severity': 'LOW',
+               'timestamp': now - timedelta(seconds=rng.uniform(0, 7 * 86400))}
+              for i in range(count)]
+    # The heaviest source, and a sample of the rest
+    sample = [ips[0]] + rng.sample(ips, 200)
+
+    legacy = {
+        'count by ip': "SELECT COUNT(*) FROM alerts WHERE src_ip = ? "
+                       "AND datetime(timestamp) > datetime('now', '-' || ? || ' minutes')",
+        'signatures by ip': "SELECT COUNT(DISTINCT signature) FROM alerts WHERE src_ip = ? "
+                            "AND datetime(timestamp) > datetime('now', '-' || ? || ' minutes')",
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(str(Path(tmp) / "windows.db"))
+        for i in range(0, count, 10000):
+            db.insert_alerts(alerts[i:i + 10000])
+
+        current = {'count by ip': db.get_alert_count_by_ip,
+                   'signatures by ip': db.get_unique_signatures_by_ip}
+        with sqlite3.connect(db.db_path) as conn:
+            # The single alerts table as it was, next to the partitions
+            union = ' UNION ALL '.join(f"SELECT * FROM {p['name']}" for p in db.get_partitions())
+            conn.execute(f"CREATE TABLE alerts AS {union}")
+            conn.execute("CREATE INDEX idx_src_ip ON alerts(src_ip)")
+            conn.execute("CREATE INDEX idx_timestamp ON alerts(timestamp)")
+            for name, sql in legacy.items():
+                for label, ips_used in (('top ip', sample[:1] * 20), ('200 ips', sample[1:])):
+                    start = time.perf_counter()
+                    for ip in ips_used:
+                        conn.execute(sql, (ip, 10)).fetchone()
+                    print_result(f"{name}, {label}, datetime()", len(ips_used),
+                                 time.perf_counter() - start, unit="queries")
+
+                    start = time.perf_counter()
+                    for ip in ips_used:
+                        current[name](ip, minutes=10)
+                    print_result(f"{name}, {label}, timestamp_us", len(ips_used),
+                                 time.perf_counter() - start, unit="queries")
+
+        db.close()
+
+
+class _SteppedDatabaseManager(DatabaseManager):
+    """DatabaseManager that leaves schema upgrades to the caller"""
+
+    def _ensure_db_exists(self):
+        pass
+
+
+@contextmanager
+def track_file_sizes(path, interval=0.05):
+    """
+    Sample a database file and its WAL on a thread while the block runs
+
+    Yields a dictionary holding the largest 'db' and 'wal' sizes seen, in bytes.
+    """
+    peaks = {'db': 0, 'wal': 0}
+    stop = threading.Event()
+
+    def sample():
+        for key, file in (('db', Path(path)), ('wal', Path(f"{path}-wal"))):
+            try:
+                peaks[key] = max(peaks[key], file.stat().st_size)
+            except FileNotFoundError:
+                pass
+
+    def run():
+        sample()
+        while not stop.wait(interval):
+            sample()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        yield peaks
+    finally:
+        stop.set()
+        thread.join()
+        sample()
+
+
+def bench_migrations(count):
+    """
+    Time and disk use of each schema migration on an unversioned database
+
+    Runs at any --count: use --count 10000000 to check an upgrade at the
+    scale of a long-running install (about 6 GB of legacy alerts; the
+    batched converters, partition copy and VACUUM each need free space
+    for another copy of the data).
+    """
+    print_header(f"Schema Migrations ({count:,} alerts from before versioning)")
+
+    rng = random.Random(42)
+    ips = [f"203.0.{i // 250}.{i % 250 + 1}" for i in range(2000)]
+    sample = [ips[0]] * 20 + rng.sample(ips, 200)
+    now = datetime.now()
+    enrichment = json.dumps({'source': dict(IPEnricher._get_default_enrichment(), country='Testland'),
+                             'destination': IPEnricher._get_private_ip_enrichment()})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "migrations.db")
+        with sqlite3.connect(path) as conn:
+            MIGRATIONS[0][2](conn.cursor())
+            for i in range(0, count, 100000):
+                conn.executemany(
+                    "INSERT INTO alerts (signature, src_ip, dst_ip, timestamp, enrichment_data) "
+                    "VALUES (?, ?, '10.0.0.1', ?, ?)",
+                    [(f"Bench {j % 40}", ips[min(int(rng.paretovariate(1.2)) - 1, 1999)],
+                      str(now - timedelta(seconds=rng.uniform(0, 7 * 86400))), enrichment)
+                     for j in range(i, min(count, i + 100000))])
+        print(f"  {'':<32} {Path(path).stat().st_size / 1048576:.1f} MB before migrating")
+
+        db = _SteppedDatabaseManager(path)
+        with db._connect() as conn:
+            version = get_schema_version(conn)
+
+        total = time.perf_counter()
+        peak = {'db': 0, 'wal': 0}
+        for number, description, _, _ in MIGRATIONS[version:]:
+            start = time.perf_counter()
+            with track_file_sizes(path) as sizes:
+                db.migrate(number - 1, number)
+            print_result(f"{number}: {description}", count, time.perf_counter() - start, unit="rows")
+            print(f"  {'':<32} peak {sizes['db'] / 1048576:.1f} MB database, "
+                  f"{sizes['wal'] / 1048576:.1f} MB WAL")
+            peak = {key: max(peak[key], sizes[key]) for key in peak}
+        print_result("all migrations", count, time.perf_counter() - total, unit="rows")
+        print(f"  {'':<32} peak {peak['db'] / 1048576:.1f} MB database, "
+              f"{peak['wal'] / 1048576:.1f} MB WAL; {Path(path).stat().st_size / 1048576:.1f} MB after")
+
+        start = time.perf_counter()
+        for ip in sample:
+            db.get_alert_count_by_ip(ip, minutes=60)
+            db.get_unique_signatures_by_ip(ip, minutes=60)
+        print_result("window queries", len(sample) * 2, time.perf_counter() - start, unit="queries")
+
+        start = time.perf_counter()
+        for _ in range(100):
+            DatabaseManager(path).close()
+        print_result("startup on current schema", 100, time.perf_counter() - start, unit="opens")
+        db.close()
+
+
+def bench_partitions(count):
+    """Retention: DELETE from a single alerts table vs. dropping expired partitions"""
+    count = min(count, 1000000)
+    days, keep = 8, 7
+    print_header(f"Alert Retention ({count:,} alerts over {days} days, keeping {keep})")
+
+    rng = random.Random(42)
+    now = time.time()
+    rows = []
+    for i in range(count):
+        ts = now - rng.uniform(0, days * 86400)
+        rows.append((f"Bench {i % 40}", f"203.0.{i % 2000 // 250}.{i % 250 + 1}", '10.0.0.1', 'LOW',
+                     str(datetime.fromtimestamp(ts)), round(ts * 1000000)))
+    rows.sort(key=lambda row: row[5])
+    sample = [f"203.0.{i // 250}.{i % 250 + 1}" for i in rng.sample(range(2000), 200)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        single_path = str(Path(tmp) / "single.db")
+        single = _SteppedDatabaseManager(single_path)
+        single.migrate(0, 7)  # the last schema before partitioning
+        with single._connect() as conn:
+            conn.executemany("INSERT INTO alerts (signature, src_ip, dst_ip, severity, timestamp, "
+                             "timestamp_us) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        single.close()
+        partitioned_path = str(Path(tmp) / "partitioned.db")
+        shutil.copy(single_path, partitioned_path)
+
+        start = time.perf_counter()
+        db = DatabaseManager(partitioned_path)
+        print_result("partitioning (migration)", count, time.perf_counter() - start, unit="rows")
+        partitions = db.get_partitions()
+        print(f"  {'':<32} {len(partitions)} daily partitions")
+
+        start = time.perf_counter()
+        for ip in sample:
+            with single._connect() as conn:
+                conn.execute("SELECT COUNT(*) FROM alerts WHERE src_ip = ? AND timestamp_us > ?",
+                             (ip, DatabaseManager._cutoff_us(600))).fetchone()
+        print_result("count by ip, single table", len(sample), time.perf_counter() - start,
+                     unit="queries")
+        start = time.perf_counter()
+        for ip in sample:
+            db.get_alert_count_by_ip(ip, minutes=10)
+        print_result("count by ip, partitions", len(sample), time.perf_counter() - start,
+                     unit="queries")
+
+        # Both remove the same rows: those of the partitions past the cutoff
+        cutoff = DatabaseManager._cutoff_us(keep * 86400)
+        boundary = max(p['end_us'] for p in partitions if p['end_us'] <= cutoff)
+        expired = sum(1 for row in rows if row[5] < boundary)
+
+        start = time.perf_counter()
+        with single._connect() as conn:
+            conn.execute("DELETE FROM alerts WHERE timestamp_us < ?", (boundary,))
+        delete_elapsed = time.perf_counter() - start
+        print_result("DELETE expired rows", expired, delete_elapsed, unit="rows")
+        wal = Path(single_path + "-wal")
+        print(f"  {'':<32} {wal.stat().st_size / 1048576 if wal.exists() else 0:.1f} MB of WAL")
+        single.close()
+
+        start = time.perf_counter()
+        dropped = db.apply_retention(keep)
+        elapsed = time.perf_counter() - start
+        print_result(f"drop {dropped} expired partition(s)", expired, elapsed, unit="rows")
+        wal = Path(partitioned_path + "-wal")
+        print(f"  {'':<32} {wal.stat().st_size / 1048576 if wal.exists() else 0:.1f} MB of WAL, "
+              f"{delete_elapsed / elapsed:.0f}x faster")
+        db.close()
+
+
+class _UnpooledDatabaseManager(DatabaseManager):
+    """DatabaseManager as it was: a fresh connection per call, rollback journal"""
+
+    def _ensure_db_exists(self):
+        super()._ensure_db_exists()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("PRAGMA journal_mode = DELETE")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def bench_dashboard(count):
+    """
+    Web request latency under concurrent ingest: per-call vs. pooled WAL connections
+
+    / is dominated by reading thousands of rows (through the WAL while
+    ingest runs), not by connection setup: pooling cuts its p95 only.
+    /api/stats reads the catalog's alert counts, and like the small
+    requests after it and the direct point lookups it is dominated by
+    connection setup, which is what pooling removes.
+    """
+    preload = min(count, 20000)
+    requests_per_client = 25
+    clients = 4
+    print_header(f"Dashboard Latency ({preload:,} alerts stored, ingest running, {clients} clients)")
+
+    from app import main as web
+    web.app.config['TESTING'] = True
+    alerts = MockAlertGenerator.generate_batch(count=preload)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, manager in (("per-call", _UnpooledDatabaseManager),
+                               ("pooled WAL", DatabaseManager)):
+            db = manager(str(Path(tmp) / f"{manager.__name__}.db"))
+            db.insert_alerts(alerts)
+            web.db_manager = db
+
+            # Ingest in small groups, as the pipeline does under a steady trickle
+            stop = threading.Event()
+            ingested = [0]
+
+            def ingest():
+                while not stop.is_set():
+                    db.insert_alerts(MockAlertGenerator.generate_batch(count=20))
+                    ingested[0] += 20
+                    time.sleep(0.005)
+
+            writer = threading.Thread(target=ingest)
+            writer.start()
+            try:
+                for name, path in (('/api/stats', '/api/stats'), ('/', '/'),
+                                   ('/api/correlations', '/api/correlations'),
+                                   ('/api/alerts', '/api/alerts?limit=10'),
+                                   ('/api/alerts/ip', '/api/alerts/ip/203.0.113.5')):
+                    latencies = []
+                    lock = threading.Lock()
+
+                    def client():
+                        http = web.app.test_client()
+                        for _ in range(requests_per_client):
+                            start = time.perf_counter()
+                            response = http.get(path)
+                            elapsed = time.perf_counter() - start
+                            assert response.status_code == 200, response.status_code
+                            with lock:
+                                latencies.append(elapsed)
+
+                    threads = [threading.Thread(target=client) for _ in range(clients)]
+                    start = time.perf_counter()
+                    for thread in threads:
+                        thread.start()
+                    for thread in threads:
+                        thread.join()
+                    elapsed = time.perf_counter() - start
+
+                    latencies.sort()
+                    print_result(f"{name:<18} {label}", len(latencies), elapsed, unit="requests")
+                    print(f"  {'':<32} p50 {latencies[len(latencies) // 2] * 1000:.1f}ms, "
+                          f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f}ms, "
+                          f"max {latencies[-1] * 1000:.1f}ms")
+
+                # Point lookups without Flask: per-call cost is the connection
+                start = time.perf_counter()
+                for i in range(2000):
+                    db.is_ip_blocked(f"198.51.100.{i % 250}")
+                print_result(f"{'is_ip_blocked':<18} {label}", 2000, time.perf_counter() - start,
+                             unit="queries")
+            finally:
+                stop.set()
+                writer.join()
+            print(f"  {'':<32} {ingested[0]:,} alerts ingested meanwhile")
+            db.close()
+
+
+def bench_enrichment_storage(count):
+    """Database size and read time: per-row JSON vs. ip_enrichment references"""
+    count = min(count, 500000)
+    read_limit = min(count, 10000)
+    print_header(f"Enrichment Storage ({count:,} alerts, 2,000 source IPs)")
+
+    rng = random.Random(42)
+    ips = [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+           for _ in range(2000)]
+    records = {ip: dict(IPEnricher._get_default_enrichment(), country=f"Country {i % 200}",
+                        city=f"City {i}", org=f"Org {i % 500}", asn=f"AS{i + 1000}",
+                        latitude=rng.uniform(-60, 60), longitude=rng.uniform(-180, 180))
+               for i, ip in enumerate(ips)}
+    private = IPEnricher._get_private_ip_enrichment()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "storage.db"
+        # Old layout: both records copied into every row
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE alerts (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                         "signature TEXT NOT NULL, src_ip TEXT NOT NULL, dst_ip TEXT NOT NULL, "
+                         "src_port INTEGER, dst_port INTEGER, protocol TEXT, severity TEXT, "
+                         "message TEXT, timestamp DATETIME, enrichment_data TEXT, "
+                         "created_at DATETIME DEFAULT CURRENT_TIMESTAMP)")
+            conn.execute("CREATE INDEX idx_timestamp ON alerts(timestamp)")
+            rows = []
+            for i in range(count):
+                src_ip = ips[min(int(rng.paretovariate(1.2)) - 1, len(ips) - 1)]
+                enrichment = {'source': records[src_ip], 'destination': private,
+                              'enriched_at': datetime.now().isoformat()}
+                rows.append(('Bench', src_ip, f"10.0.0.{i % 50 + 1}", 1024 + i % 60000, 22, 'TCP',
+                             'LOW', f"Bench - {src_ip}", f"2025-01-{1 + i % 28:02d} 00:00:{i % 60:02d}",
+                             json.dumps(enrichment)))
+            conn.executemany("INSERT INTO alerts (signature, src_ip, dst_ip, src_port, dst_port, "
+                             "protocol, severity, message, timestamp, enrichment_data) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        legacy_size = path.stat().st_size
+
+        def legacy_read():
+            with sqlite3.connect(path) as conn:
+                conn.row_factory = sqlite3.Row
+                alerts = []
+                for row in conn.execute("SELECT * FROM alerts ORDER BY timestamp DESC LIMIT ?",
+                                        (read_limit,)):
+                    alert = dict(row)
+                    alert['enrichment'] = json.loads(alert['enrichment_data'])
+                    alerts.append(alert)
+                return alerts
+
+        start = time.perf_counter()
+        for _ in range(5):
+            legacy_read()
+        legacy_elapsed = (time.perf_counter() - start) / 5
+        print_result(f"per-row JSON read ({read_limit:,})", read_limit, legacy_elapsed, unit="alerts")
+
+        start = time.perf_counter()
+        db = DatabaseManager(str(path))
+        print_result("migration (incl. VACUUM)", count, time.perf_counter() - start, unit="alerts")
+        size = path.stat().st_size
+
+        start = time.perf_counter()
+        for _ in range(5):
+            db.get_recent_alerts(limit=read_limit)
+        elapsed = (time.perf_counter() - start) / 5
+        print_result(f"normalized read ({read_limit:,})", read_limit, elapsed, unit="alerts")
+
+        print(f"  {'':<32} database {legacy_size / 1048576:.1f} MB -> {size / 1048576:.1f} MB "
+              f"({100 * (1 - size / legacy_size):.0f}% smaller), reads {legacy_elapsed / elapsed:.1f}x faster")
+
+
+BENCHMARKS = {
+    'parser': bench_batch_parser,
+    'backfill': bench_backfill,
+    'compressed': bench_compressed,
+    'records': bench_alert_records,
+    'loadtest': bench_load_test,
+    'enrichcache': bench_enrichment_cache,
+    'geoip': bench_geoip,
+    'storage': bench_enrichment_storage,
+    'networks': bench_networks,
+    'providers': bench_providers,
+    'groupcommit': bench_group_commit,
+    'dashboard': bench_dashboard,
+    'timewindows': bench_time_windows,
+    'migrations': bench_migrations,
+    'partitions': bench_partitions,
+}
+
+
+def main():
+    """Run selected benchmarks"""
+    parser = argparse.ArgumentParser(description='Mini SIEM benchmarks')
+    parser.add_argument('names', nargs='*', help=f"Benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument('--count', type=int, default=200000,
+                        help='Workload size (migrations: --count 10000000 for a full-scale upgrade)')
+    args = parser.parse_args()
+
+    names = args.names or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"✗ Unknown benchmark: {name}")
+            return 1
+        BENCHMARKS[name](args.count)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,11 +10,50 @@ DATABASE_BACKUP_PATH = "data/backups"
 SNORT_ALERT_FILE = "/var/log/snort/alert_fast.log"
 COLLECTION_INTERVAL = 5  # seconds between checks
 MOCK_ALERT_INTERVAL = 5  # seconds for mock generation
+COLLECTION_TAIL_MODE = "auto"  # "inotify", "poll" or "auto" (inotify when available)
+COLLECTION_COALESCE_DELAY = 0.05  # seconds to gather a burst of writes into one batch
+COLLECTION_POLL_INTERVAL = 0.25  # seconds between file checks in poll mode
+COLLECTION_CHECKPOINT_FILE = "data/collector.checkpoint"  # read position kept across restarts
+
+# Processing pipeline (collect -> enrich -> persist, correlation on its own thread)
+PIPELINE_ENRICH_WORKERS = 8  # threads running enrichment lookups
+PIPELINE_PERSIST_WORKERS = 1  # threads writing to the database
+PIPELINE_QUEUE_SIZE = 5000  # alerts queued per stage before the stage feeding it blocks
+PIPELINE_PERSIST_BATCH_SIZE = 500  # maximum alerts stored per transaction
+PIPELINE_PERSIST_MAX_LATENCY = 0.05  # seconds an alert waits for its transaction to fill (group commit)
+
+# Runtime: "thread" (worker threads per stage) or "asyncio" (single event loop)
+ORCHESTRATOR_RUNTIME = "thread"
+ASYNC_ENRICH_CONCURRENCY = 200  # enrichment lookups in flight at once (asyncio runtime)
+ASYNC_DB_WORKERS = 2  # threads in the executor that runs database work (asyncio runtime)
+
+# Networks
+HOME_NET = ["10.0.0.0/8", "172.16.0.0/12", "192.168.0.0/16", "fc00::/7"]  # monitored networks; never looked up externally
 
 # Enrichment settings
 IP_ENRICHMENT_ENABLED = True
+IP_ENRICHMENT_MODE = "inline"  # "inline" (enrich, then store) or "deferred" (store at once, enrich in the background)
+IP_ENRICHMENT_BACKFILL_BATCH_SIZE = 1000  # pending alerts enriched per background pass
+IP_ENRICHMENT_BACKFILL_INTERVAL = 1.0  # seconds between background passes when idle
 IP_ENRICHMENT_CACHE_DURATION = 24  # hours
-IP_ENRICHMENT_USE_FREE_API = True  # Use IP-API.com (free) vs MaxMind (paid)
+IP_ENRICHMENT_CACHE_SIZE = 100000  # IPs kept in memory (least recently used are evicted)
+IP_ENRICHMENT_CACHE_FLUSH_INTERVAL = 1.0  # seconds new lookups wait before being saved to the database
+IP_ENRICHMENT_LOOKUP_WORKERS = 8  # threads resolving distinct uncached IPs concurrently
+IP_ENRICHMENT_NEGATIVE_TTL = 60  # seconds a failed IP is marked pending before it is retried
+IP_ENRICHMENT_BREAKER_THRESHOLD = 5  # consecutive lookup failures that stop calls to the provider
+IP_ENRICHMENT_BREAKER_COOLDOWN = 30  # seconds before a stopped provider is tried again
+IP_ENRICHMENT_RATE_PER_MINUTE = 40  # provider calls per minute across all processes (ip-api.com allows 45)
+IP_ENRICHMENT_RATE_BURST = 5  # calls allowed back to back; rate + burst must stay within the quota
+# Part of the rate and burst each process gets: every process keeps its own
+# limiter, so shares summing to 1 keep them within the quota when run together
+IP_ENRICHMENT_RATE_SHARES = {'orchestrator': 0.6, 'dashboard': 0.2, 'dashboard_enhanced': 0.2}
+IP_ENRICHMENT_MAX_WAIT = (10.0, 2.0, 0.0)  # seconds high/normal/low priority lookups wait before being deferred
+IP_ENRICHMENT_SHED_DEPTH = 100  # queued lookups at which low-priority lookups are dropped
+IP_ENRICHMENT_PROVIDER = "ip-api"  # "ip-api" (IP-API.com or compatible) or "ipwhois"
+IP_ENRICHMENT_PROVIDER_URL = "http://ip-api.com"  # e.g. "http://127.0.0.1:8081" for stub_provider.py
+IP_ENRICHMENT_BATCH_SIZE = 1  # IPs per request (up to 100 via /batch; ip-api.com allows 15 batches/minute)
+IP_ENRICHMENT_TIMEOUT = 5  # seconds allowed for one provider request
+IP_ENRICHMENT_GEOIP_DB = None  # offline IP range CSV (e.g. "data/geoip.csv"); replaces online lookups when set
 
 # Correlation settings
 CORRELATION_ANALYSIS_INTERVAL = 30  # seconds
@@ -31,6 +70,8 @@ CORRELATIONS_PER_PAGE = 20
 
 # Data retention
 ALERT_RETENTION_DAYS = 30  # Delete alerts older than this
+ALERT_PARTITION_HOURS = 24  # alerts are stored in one table per period; retention drops whole tables
+ALERT_RETENTION_INTERVAL = 3600  # seconds between retention passes
 
 # Logging
 LOG_LEVEL = "INFO"  # DEBUG, INFO, WARNING, ERROR, CRITICAL
@@ -0,0 +1,141 @@
+"""
+Alert record module for Mini SIEM
+Compact record type passed from the collector to the enricher and database
+"""
+
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+# Snort's fast format carries no year (unless run with -y): the current year
+# is assumed unless that puts an alert further ahead than this, in which
+# case it is from last year (a December alert read in January)
+YEAR_ROLLBACK_MARGIN = timedelta(days=1)
+
+
+def assume_year(timestamp: datetime, now: datetime) -> datetime:
+    """
+    Date a year-less timestamp relative to the time it was read
+
+    Args:
+        timestamp: Timestamp whose year is unknown (any year is replaced)
+        now: Local time the alert was read or stored at
+
+    Returns:
+        The timestamp in now's year, or the year before if that is
+        more than YEAR_ROLLBACK_MARGIN ahead of now
+
+    Raises:
+        ValueError: For February 29 outside a leap year
+    """
+    dated = timestamp.replace(year=now.year)
+    if dated > now + YEAR_ROLLBACK_MARGIN:
+        dated = dated.replace(year=now.year - 1)
+    return dated
+
+
+class Alert:
+    """
+    Slotted alert record produced by the parsers and MockAlertGenerator
+
+    Supports the read/write mapping operations the rest of the pipeline
+    uses on alert dictionaries (alert['src_ip'], alert.get(...), 'x' in
+    alert, dict(alert)), so it can be passed anywhere a dict alert was.
+    """
+
+    FIELDS = ('timestamp', 'signature', 'classification', 'priority', 'severity',
+              'protocol', 'src_ip', 'src_port', 'dst_ip', 'dst_port', 'message',
+              'enrichment')
+
+    __slots__ = FIELDS
+
+    def __init__(self, timestamp=None, signature: str = '', classification: str = '',
+                 priority: str = '4', severity: str = 'INFO', protocol: str = '',
+                 src_ip: str = '', src_port: int = 0, dst_ip: str = '', dst_port: int = 0,
+                 message: str = '', enrichment: Optional[Dict[str, Any]] = None):
+        """Initialize an alert record"""
+        self.timestamp = timestamp
+        self.signature = signature
+        self.classification = classification
+        self.priority = priority
+        self.severity = severity
+        self.protocol = protocol
+        self.src_ip = src_ip
+        self.src_port = src_port
+        self.dst_ip = dst_ip
+        self.dst_port = dst_port
+        self.message = message
+        self.enrichment = enrichment
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Alert':
+        """Build a record from an alert dictionary, ignoring unknown keys"""
+        return cls(**{key: data[key] for key in cls.FIELDS if key in data})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get a plain dictionary view (enrichment omitted until set)"""
+        return {key: getattr(self, key) for key in self.keys()}
+
+    def keys(self):
+        """Field names that are set, as for a dict alert"""
+        return [key for key in self.FIELDS if key != 'enrichment' or self.enrichment is not None]
+
+    def get(self, key: str, default=None):
+        """Get a field, or default if it is unknown or unset"""
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def __getitem__(self, key: str):
+        if key not in self.__slots__ or (key == 'enrichment' and self.enrichment is None):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key) -> bool:
+        return key in self.__slots__ and (key != 'enrichment' or self.enrichment is not None)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Alert):
+            return all(getattr(self, key) == getattr(other, key) for key in self.FIELDS)
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __reduce__(self):
+        # Pickle as a flat tuple, which is smaller and faster than slot state
+        return (Alert, tuple(getattr(self, key) for key in self.FIELDS))
+
+    def __repr__(self) -> str:
+        return (f"Alert({self.signature!r}, {self.src_ip}:{self.src_port} -> "
+                f"{self.dst_ip}:{self.dst_port}, {self.severity}, {self.timestamp})")
+
+
+class StringPool:
+    """Bounded interning table for repeated alert field values"""
+
+    def __init__(self, max_size: int = 65536):
+        """
+        Initialize string pool
+
+        Args:
+            max_size: Entries kept before the pool is reset
+        """
+        self.max_size = max_size
+        self._pool = {}
+
+    def text(self, raw: bytes) -> str:
+        """Decode and intern a raw field, reusing earlier results"""
+        value = self._pool.get(raw)
+        if value is None:
+            if len(self._pool) >= self.max_size:
+                self._pool.clear()
+            value = sys.intern(raw.decode('utf-8', errors='ignore'))
+            self._pool[raw] = value
+        return value
@@ -0,0 +1,226 @@
+"""
+Historical backfill module for Mini SIEM
+Imports archived Snort alert logs into the database in parallel
+"""
+
+import os
+import mmap
+import time
+import logging
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Tuple, Optional, Callable
+
+from core.collector import SnortAlertParser, is_compressed, open_alert_stream, iter_line_chunks
+
+logger = logging.getLogger(__name__)
+
+# Parser reused by every range a worker process handles
+_worker_parser = None
+
+
+def split_ranges(data, chunk_size: int) -> List[Tuple[int, int]]:
+    """
+    Split a buffer into byte ranges that end on line boundaries
+
+    Args:
+        data: Buffer (bytes or mmap) to split
+        chunk_size: Target size of each range in bytes
+
+    Returns:
+        List of (start, end) offsets covering the whole buffer in order
+    """
+    ranges = []
+    size = len(data)
+    start = 0
+    while start < size:
+        end = start + chunk_size
+        if end >= size:
+            end = size
+        else:
+            newline = data.find(b'\n', end)
+            end = size if newline == -1 else newline + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _get_worker_parser() -> SnortAlertParser:
+    """Get this process's parser"""
+    global _worker_parser
+    if _worker_parser is None:
+        _worker_parser = SnortAlertParser()
+    return _worker_parser
+
+
+def parse_chunk(data: bytes, fmt: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Parse a buffer of complete lines (runs in a worker process)
+
+    Args:
+        data: Decompressed alert lines
+        fmt: Line format sniffed for the file (None tries fast then CSV)
+
+    Returns:
+        SnortAlertParser.parse_buffer result for the buffer
+    """
+    return _get_worker_parser().buffer_parser(fmt)(data)
+
+
+def parse_range(path: str, start: int, end: int, fmt: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Parse one byte range of an alert file (runs in a worker process)
+
+    Args:
+        path: Alert log to read
+        start: First byte of the range
+        end: One past the last byte of the range
+        fmt: Line format sniffed for the file (None tries fast then CSV)
+
+    Returns:
+        SnortAlertParser.parse_buffer result for the range
+    """
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _get_worker_parser().buffer_parser(fmt)(mm[start:end])
+
+
+class BackfillImporter:
+    """Bulk-loads archived alert logs through DatabaseManager"""
+
+    # Leading bytes of a file used to sniff its line format
+    SNIFF_SIZE = 64 * 1024
+
+    def __init__(self, db_manager, workers: Optional[int] = None,
+                 chunk_size: int = 16 * 1024 * 1024, batch_size: int = 50000):
+        """
+        Initialize backfill importer
+
+        Args:
+            db_manager: DatabaseManager instance to load into
+            workers: Parser processes (1 parses serially in this process)
+            chunk_size: Bytes per parsed range
+            batch_size: Alerts per database transaction
+        """
+        self.db = db_manager
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+
+    def import_file(self, path: str,
+                    progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Import an archived alert log
+
+        Plain files are memory-mapped and split into newline-aligned ranges;
+        compressed files (.gz/.zst/.bz2) are stream-decompressed in
+        chunk_size pieces cut at line boundaries. Either way the pieces are
+        parsed in a process pool and inserted strictly in file order, so the
+        rows (and their IDs) are the same as a serial import. Alerts are
+        stored without IP enrichment.
+
+        Args:
+            path: Alert log to import
+            progress: Optional callback receiving the running totals after
+                each range
+
+        Returns:
+            Dictionary with line, alert and timing totals
+        """
+        totals = {
+            'path': path,
+            'bytes': 0,
+            'bytes_done': 0,
+            'lines': 0,
+            'alerts': 0,
+            'rejected': 0,
+            'format': None,
+            'elapsed': 0.0,
+            'lines_per_sec': 0.0
+        }
+
+        # For compressed files, progress is measured in compressed bytes
+        size = os.path.getsize(path)
+        totals['bytes'] = size
+        if size == 0:
+            return totals
+
+        start_time = time.perf_counter()
+        pending = []
+
+        def consume(batch: Dict[str, Any], bytes_done: int):
+            pending.extend(batch['alerts'])
+            while len(pending) >= self.batch_size:
+                self.db.insert_alerts(pending[:self.batch_size])
+                del pending[:self.batch_size]
+
+            totals['bytes_done'] = bytes_done
+            totals['alerts'] += batch['matched']
+            totals['rejected'] += batch['rejected']
+            totals['lines'] += batch['matched'] + batch['rejected']
+            totals['elapsed'] = time.perf_counter() - start_time
+            totals['lines_per_sec'] = totals['lines'] / totals['elapsed'] if totals['elapsed'] else 0.0
+            if progress:
+                progress(dict(totals))
+
+        # The line format is sniffed once per file and passed to every worker
+        sniffer = SnortAlertParser()
+        if is_compressed(path):
+            with open(path, 'rb') as raw, open_alert_stream(path, raw) as stream:
+                chunks = iter_line_chunks(stream, self.chunk_size)
+                first = next(chunks, b'')
+                fmt = totals['format'] = sniffer.sniff_format(first[:self.SNIFF_SIZE])
+                tasks = ((parse_chunk, (chunk, fmt), raw.tell())
+                         for chunk in itertools.chain([first], chunks))
+                self._run(tasks, consume)
+        else:
+            with open(path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    ranges = split_ranges(mm, self.chunk_size)
+                    fmt = totals['format'] = sniffer.sniff_format(mm[:self.SNIFF_SIZE])
+            tasks = ((parse_range, (path, start, end, fmt), end) for start, end in ranges)
+            self._run(tasks, consume, serial=len(ranges) == 1)
+
+        if pending:
+            self.db.insert_alerts(pending)
+
+        totals['bytes_done'] = size
+        totals['elapsed'] = time.perf_counter() - start_time
+        totals['lines_per_sec'] = totals['lines'] / totals['elapsed'] if totals['elapsed'] else 0.0
+        return totals
+
+    def _run(self, tasks, consume: Callable, serial: bool = False):
+        """
+        Execute (function, args, bytes_done) parse tasks and consume results in order
+
+        Args:
+            tasks: Iterator of parse tasks in file order
+            consume: Called with each result and its bytes_done marker
+            serial: Parse in this process even if workers > 1
+        """
+        if serial or self.workers <= 1:
+            for func, args, bytes_done in tasks:
+                consume(func(*args), bytes_done)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            # Keep a bounded window of tasks in flight and consume them in
+            # submission order, so memory stays flat and order is preserved
+            window = deque()
+            for func, args, bytes_done in tasks:
+                window.append((pool.submit(func, *args), bytes_done))
+                if len(window) >= self.workers * 2:
+                    future, done = window.popleft()
+                    consume(future.result(), done)
+            while window:
+                future, done = window.popleft()
+                consume(future.result(), done)
+
+
+def log_progress(totals: Dict[str, Any]):
+    """Progress callback that logs percentage and throughput"""
+    percent = 100.0 * totals['bytes_done'] / totals['bytes'] if totals['bytes'] else 100.0
+    logger.info(f"Backfill {totals['path']}: {percent:5.1f}% "
+                f"({totals['lines']:,} lines, {totals['alerts']:,} alerts, "
+                f"{totals['lines_per_sec']:,.0f} lines/sec)")
@@ -0,0 +1,117 @@
+"""
+Circuit breaker module for Mini SIEM
+Stops calling an unhealthy external service until it has had time to recover
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Three-state circuit breaker around calls to one external service
+
+    Closed: calls go through and consecutive failures are counted. After
+    failure_threshold failures in a row the breaker opens, and calls are
+    refused without touching the service for cooldown seconds. It then goes
+    half-open and lets a single trial call through: success closes it,
+    failure opens it for another cool-down.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown: float = 30.0):
+        """
+        Initialize circuit breaker
+
+        Args:
+            name: Service name used in log messages
+            failure_threshold: Consecutive failures that open the breaker
+            cooldown: Seconds the breaker stays open before a trial call
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.stats = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may be made now
+
+        Returns:
+            True if the caller should call the service, False if it should
+            fail fast; a True from a half-open breaker must be followed by
+            record_success(), record_failure() or release()
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN and time.monotonic() >= self._opened_at + self.cooldown:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+
+            self.stats['rejected'] += 1
+            return False
+
+    def release(self):
+        """Give back a call allow() permitted but that was not made"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+
+    def record_success(self):
+        """Record a successful call"""
+        with self._lock:
+            self.stats['successes'] += 1
+            self._consecutive_failures = 0
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed: service recovered")
+                self.state = self.CLOSED
+                self._trial_in_flight = False
+
+    def record_failure(self):
+        """Record a failed call"""
+        with self._lock:
+            self.stats['failures'] += 1
+            self._consecutive_failures += 1
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self._consecutive_failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+                self.stats['opened'] += 1
+                logger.warning(f"Circuit for {self.name} opened after "
+                               f"{self._consecutive_failures} consecutive failures; "
+                               f"retrying in {self.cooldown:g}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get breaker state and counters
+
+        Returns:
+            Dictionary with the state, consecutive failures, seconds until a
+            trial call is allowed and success/failure/rejected/opened counts
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['state'] = self.state
+            stats['consecutive_failures'] = self._consecutive_failures
+            stats['retry_in'] = (max(0.0, self._opened_at + self.cooldown - time.monotonic())
+                                 if self.state == self.OPEN else 0.0)
+            return stats
@@ -0,0 +1,398 @@
+"""
+Cache module for Mini SIEM
+Bounded, thread-safe LRU cache with expiry used for IP enrichment data
+"""
+
+import sys
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class EnrichmentCache:
+    """
+    Bounded LRU cache with a time-to-live per entry
+
+    Entries are spread over independently locked shards so enrichment
+    workers on different threads rarely contend. Each shard holds at most
+    max_size / shards entries and evicts its least recently used entry when
+    full. Expired entries are dropped when looked up, and a few of the
+    oldest are checked on every insert, so idle entries do not pile up.
+
+    Values are returned as stored, without copying; callers must treat
+    them as read-only. Each entry's size is estimated once when it is
+    stored and kept in a running total per shard, so get_stats() does not
+    walk the entries.
+    """
+
+    # Oldest entries checked for expiry on each insert
+    SWEEP_COUNT = 2
+
+    def __init__(self, max_size: int = 100000, ttl: float = 86400, shards: int = 16):
+        """
+        Initialize cache
+
+        Args:
+            max_size: Maximum entries across all shards
+            ttl: Default seconds an entry stays valid
+            shards: Number of independently locked partitions
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shard_count = max(1, min(shards, max_size))
+        self.shard_size = max(1, -(-max_size // self.shard_count))
+        self._shards = [OrderedDict() for _ in range(self.shard_count)]
+        self._locks = [threading.Lock() for _ in range(self.shard_count)]
+        self._stats = [{'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+                       for _ in range(self.shard_count)]
+        self._bytes = [0] * self.shard_count
+
+    def _shard(self, key: Hashable) -> int:
+        """Index of the shard holding key"""
+        return hash(key) % self.shard_count
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Get a cached value
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The stored value, or None if absent or expired
+        """
+        index = self._shard(key)
+        shard = self._shards[index]
+        stats = self._stats[index]
+        with self._locks[index]:
+            entry = shard.get(key)
+            if entry is None:
+                stats['misses'] += 1
+                return None
+            if entry[0] <= time.time():
+                del shard[key]
+                self._bytes[index] -= entry[2]
+                stats['expirations'] += 1
+                stats['misses'] += 1
+                return None
+            shard.move_to_end(key)
+            stats['hits'] += 1
+            return entry[1]
+
+    def get_memory(self, key: Hashable) -> Optional[Any]:
+        """Get a value held in memory, never reading a slower tier (see load)"""
+        return EnrichmentCache.get(self, key)
+
+    def load(self, key: Hashable) -> Optional[Any]:
+        """
+        Look a key up in the slower tier behind memory
+
+        This cache has none; subclasses backed by storage read it here,
+        which may block. On success the value is also kept in memory.
+
+        Returns:
+            The stored value, or None if absent or expired
+        """
+        return None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None,
+            expires_at: Optional[float] = None):
+        """
+        Store a value
+
+        Args:
+            key: Cache key
+            value: Value to store (kept by reference)
+            ttl: Seconds the entry stays valid (default: the cache TTL)
+            expires_at: Absolute expiry time (epoch seconds), overriding ttl
+        """
+        now = time.time()
+        if expires_at is None:
+            expires_at = now + (self.ttl if ttl is None else ttl)
+
+        # Sized outside the lock; the tuple gets its third item's slot too
+        size = sys.getsizeof(key) + sys.getsizeof((expires_at, value, 0)) + _value_size(value)
+
+        index = self._shard(key)
+        shard = self._shards[index]
+        stats = self._stats[index]
+        with self._locks[index]:
+            previous = shard.get(key)
+            if previous is not None:
+                self._bytes[index] -= previous[2]
+            shard[key] = (expires_at, value, size)
+            shard.move_to_end(key)
+            self._bytes[index] += size
+
+            for _ in range(self.SWEEP_COUNT):
+                oldest_key, (oldest_expiry, _, oldest_size) = next(iter(shard.items()))
+                if oldest_key == key or oldest_expiry > now:
+                    break
+                del shard[oldest_key]
+                self._bytes[index] -= oldest_size
+                stats['expirations'] += 1
+
+            while len(shard) > self.shard_size:
+                _, (_, _, evicted_size) = shard.popitem(last=False)
+                self._bytes[index] -= evicted_size
+                stats['evictions'] += 1
+
+    def delete(self, key: Hashable) -> bool:
+        """Remove an entry, returning whether it was present"""
+        index = self._shard(key)
+        with self._locks[index]:
+            entry = self._shards[index].pop(key, None)
+            if entry is None:
+                return False
+            self._bytes[index] -= entry[2]
+            return True
+
+    def clear(self):
+        """Remove all entries (statistics are kept)"""
+        for index, shard in enumerate(self._shards):
+            with self._locks[index]:
+                shard.clear()
+                self._bytes[index] = 0
+
+    def purge_expired(self) -> int:
+        """
+        Remove every expired entry
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.time()
+        removed = 0
+        for index, shard in enumerate(self._shards):
+            with self._locks[index]:
+                expired = [key for key, (expires_at, _, _) in shard.items() if expires_at <= now]
+                for key in expired:
+                    self._bytes[index] -= shard.pop(key)[2]
+                self._stats[index]['expirations'] += len(expired)
+                removed += len(expired)
+        return removed
+
+    def items(self):
+        """Snapshot of (key, value, expires_at) for every unexpired entry"""
+        now = time.time()
+        snapshot = []
+        for index, shard in enumerate(self._shards):
+            with self._locks[index]:
+                snapshot.extend((key, value, expires_at)
+                                for key, (expires_at, value, _) in shard.items() if expires_at > now)
+        return snapshot
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Check for an unexpired entry without touching LRU order or statistics"""
+        index = self._shard(key)
+        with self._locks[index]:
+            entry = self._shards[index].get(key)
+            return entry is not None and entry[0] > time.time()
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics
+
+        Returns:
+            Dictionary with hit/miss/eviction/expiration counters, size and
+            an estimate of the memory held by the entries in bytes
+        """
+        totals = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+        memory = 0
+        size = 0
+        for index, shard in enumerate(self._shards):
+            with self._locks[index]:
+                for name in totals:
+                    totals[name] += self._stats[index][name]
+                size += len(shard)
+                memory += sys.getsizeof(shard) + self._bytes[index]
+
+        lookups = totals['hits'] + totals['misses']
+        totals.update({
+            'size': size,
+            'max_size': self.max_size,
+            'hit_rate': totals['hits'] / lookups if lookups else 0.0,
+            'memory_bytes': memory
+        })
+        return totals
+
+
+class PersistentEnrichmentCache(EnrichmentCache):
+    """
+    EnrichmentCache with a durable second tier in the SIEM database
+
+    warm() loads unexpired entries from the enrichment_cache table so a
+    restarted process starts with a hot cache. Memory misses fall through
+    to the table (which also shares lookups between the orchestrator and
+    the web interface), and new entries are written back by a background
+    thread in batched transactions rather than one write per lookup.
+    """
+
+    def __init__(self, db_manager, max_size: int = 100000, ttl: float = 86400,
+                 shards: int = 16, flush_interval: float = 1.0, flush_size: int = 500):
+        """
+        Initialize persistent cache
+
+        Args:
+            db_manager: DatabaseManager holding the enrichment_cache table
+            max_size: Maximum entries kept in memory
+            ttl: Default seconds an entry stays valid
+            shards: Number of independently locked partitions
+            flush_interval: Longest seconds a new entry waits to be written
+            flush_size: Pending entries that trigger an immediate write
+        """
+        super().__init__(max_size=max_size, ttl=ttl, shards=shards)
+        self.db = db_manager
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._writer = None
+        self._closed = False
+        self._persistent_stats = {'warmed': 0, 'persistent_hits': 0,
+                                  'persistent_writes': 0, 'write_errors': 0}
+
+    def warm(self) -> int:
+        """
+        Load unexpired entries from the database into memory
+
+        Returns:
+            Number of entries loaded
+        """
+        try:
+            entries = self.db.load_enrichment_cache(limit=self.max_size)
+        except Exception as e:
+            logger.warning(f"Could not warm enrichment cache: {str(e)}")
+            return 0
+
+        # Shortest-lived first, so they are the first evicted
+        for ip, data, expires_at in reversed(entries):
+            EnrichmentCache.set(self, ip, data, expires_at=expires_at)
+
+        self._persistent_stats['warmed'] += len(entries)
+        return len(entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached value from memory, falling back to the database"""
+        value = super().get(key)
+        if value is not None:
+            return value
+        return self.load(key)
+
+    def load(self, key: Hashable) -> Optional[Any]:
+        """Read an entry from the database into memory (a blocking query)"""
+        try:
+            row = self.db.get_cached_enrichment(key)
+        except Exception as e:
+            logger.warning(f"Persistent enrichment cache lookup failed: {str(e)}")
+            return None
+        if row is None:
+            return None
+
+        data, expires_at = row
+        EnrichmentCache.set(self, key, data, expires_at=expires_at)
+        with self._cond:
+            self._persistent_stats['persistent_hits'] += 1
+        return data
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None,
+            expires_at: Optional[float] = None):
+        """Store a value in memory and queue it for the database"""
+        if expires_at is None:
+            expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        super().set(key, value, expires_at=expires_at)
+
+        with self._cond:
+            self._pending[key] = (value, expires_at)
+            closed = self._closed
+            if self._writer is None and not closed:
+                self._writer = threading.Thread(target=self._write_loop,
+                                                name='enrichment-cache-writer', daemon=True)
+                self._writer.start()
+            elif len(self._pending) >= self.flush_size:
+                self._cond.notify()
+
+        # No writer runs after close(): write late entries straight through
+        if closed:
+            self.flush()
+
+    def _write_loop(self):
+        """Background writer: flush pending entries in batches"""
+        while True:
+            with self._cond:
+                if not self._closed and len(self._pending) < self.flush_size:
+                    self._cond.wait(self.flush_interval)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def flush(self) -> int:
+        """
+        Write pending entries to the database now
+
+        Returns:
+            Number of entries written
+        """
+        with self._cond:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+
+        try:
+            written = self.db.save_enrichment_cache(
+                [(key, value, expires_at) for key, (value, expires_at) in batch.items()])
+        except Exception as e:
+            logger.error(f"Failed to persist {len(batch)} enrichment entries: {str(e)}")
+            with self._cond:
+                self._persistent_stats['write_errors'] += len(batch)
+            return 0
+
+        with self._cond:
+            self._persistent_stats['persistent_writes'] += written
+        return written
+
+    def close(self):
+        """Stop the writer after flushing pending entries"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            writer = self._writer
+        if writer is not None:
+            writer.join()
+        self.flush()
+
+    def purge_expired(self) -> int:
+        """Remove expired entries from memory and the database"""
+        removed = super().purge_expired()
+        try:
+            self.db.purge_enrichment_cache()
+        except Exception as e:
+            logger.warning(f"Could not purge persistent enrichment cache: {str(e)}")
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics, including the database tier"""
+        stats = super().get_stats()
+        with self._cond:
+            stats.update(self._persistent_stats)
+            stats['pending_writes'] = len(self._pending)
+        return stats
+
+
+def _value_size(value: Any) -> int:
+    """Approximate size of a cached value, following dicts and lists"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + _value_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_value_size(v) for v in value)
+    return size
@@ -3,16 +3,95 @@ Alert Collector module for Mini SIEM
 Reads and parses Snort alerts from log files in real-time
 """
 
+import os
 import re
+import bz2
+import gzip
+import json
+import base64
+import asyncio
+import hashlib
 import logging
 import time
 import random
+from sys import intern
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 from datetime import datetime, timedelta
 
+from core.alert import Alert, StringPool, YEAR_ROLLBACK_MARGIN, assume_year
+from core.tailer import create_watcher
+
 logger = logging.getLogger(__name__)
 
+# Suffixes of rotated alert logs that are read through a decompressor
+COMPRESSED_SUFFIXES = ('.gz', '.zst', '.bz2')
+
+# Bytes of decompressed data read per chunk when streaming archives
+ARCHIVE_CHUNK_SIZE = 1024 * 1024
+
+
+def is_compressed(path: str) -> bool:
+    """Check whether a path names a compressed alert log"""
+    return str(path).endswith(COMPRESSED_SUFFIXES)
+
+
+def open_alert_stream(path: str, raw=None):
+    """
+    Open an alert log for sequential binary reading
+
+    Compressed logs are wrapped in a streaming decompressor, so nothing is
+    decompressed to disk or held in memory beyond the current read.
+
+    Args:
+        path: Alert log, plain or .gz/.zst/.bz2
+        raw: Already opened binary file for path (opened here if None)
+
+    Returns:
+        Binary file-like object yielding decompressed bytes
+    """
+    if raw is None:
+        raw = open(path, 'rb')
+
+    path = str(path)
+    if path.endswith('.gz'):
+        return gzip.GzipFile(fileobj=raw, mode='rb')
+    if path.endswith('.bz2'):
+        return bz2.BZ2File(raw, mode='rb')
+    if path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raw.close()
+            raise ImportError("Reading .zst alert logs requires the zstandard package")
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    return raw
+
+
+def iter_line_chunks(stream, chunk_size: int = ARCHIVE_CHUNK_SIZE):
+    """
+    Read a binary stream in fixed-size chunks cut at line boundaries
+
+    Args:
+        stream: Binary file-like object
+        chunk_size: Bytes read per chunk
+
+    Yields:
+        Buffers of complete lines; the final buffer may lack a newline
+    """
+    partial = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        data = partial + chunk
+        end = data.rfind(b'\n') + 1
+        partial = data[end:]
+        if end:
+            yield data[:end]
+    if partial:
+        yield partial
+
 
 class SnortAlertParser:
     """Parses Snort alerts from the alert_fast.log file"""
@@ -27,6 +106,18 @@ class SnortAlertParser:
         r"([0-9.]+):(\d+)\s+->\s+([0-9.]+):(\d+)"
     )
 
+    # Same pattern compiled for whole byte buffers (see parse_buffer).
+    # Anchored per line with a lazy prefix so that the leftmost match on each
+    # line is found exactly like SNORT_ALERT_REGEX.search, and with whitespace
+    # classes that cannot cross a newline.
+    SNORT_BATCH_REGEX = re.compile(
+        rb"^[^\n]*?(\d{2}/\d{2}-\d{2}:\d{2}:\d{2})\.(\d+)[^\S\n]+"
+        rb"\[Classification: ([^\]\n]+)\][^\S\n]+\[Priority: (\d+)\][^\S\n]+"
+        rb"\{([A-Z]+)\}[^\S\n]+"
+        rb"([0-9.]+):(\d+)[^\S\n]+->[^\S\n]+([0-9.]+):(\d+)[^\n]*",
+        re.MULTILINE
+    )
+
     # Priority levels mapping to severity
     SEVERITY_MAP = {
         '1': 'HIGH',
@@ -35,11 +126,54 @@ class SnortAlertParser:
         '4': 'INFO'
     }
 
+    # Line formats sniff_format can detect
+    FORMATS = ('fast', 'csv', 'json')
+
+    # Non-blank lines examined when sniffing a source's format
+    SNIFF_LINES = 20
+
+    # Seconds between summary warnings about unparseable lines
+    FAILURE_LOG_INTERVAL = 60
+
     def __init__(self):
         """Initialize the parser"""
         self.last_position = 0
+        self.strings = StringPool()
+        self.failure_counts = {}
+        self._window_failures = {}
+        self._last_errors = {}
+        self._last_failure_log = time.monotonic()
+
+    def _record_failure(self, fmt: str, count: int = 1, error: Optional[str] = None):
+        """
+        Count unparseable lines without logging each one
+
+        A single summary warning is logged at most every FAILURE_LOG_INTERVAL
+        seconds.
+
+        Args:
+            fmt: Format the lines failed to parse as
+            count: Number of failed lines
+            error: Last parse error message, if any
+        """
+        self.failure_counts[fmt] = self.failure_counts.get(fmt, 0) + count
+        self._window_failures[fmt] = self._window_failures.get(fmt, 0) + count
+        if error:
+            self._last_errors[fmt] = error
 
-    def parse_snort_line(self, line: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        if now - self._last_failure_log >= self.FAILURE_LOG_INTERVAL:
+            summary = ", ".join(
+                f"{n} {name}" + (f" (last error: {self._last_errors[name]})" if name in self._last_errors else "")
+                for name, n in self._window_failures.items()
+            )
+            logger.warning(f"Unparseable alert lines in the last "
+                           f"{now - self._last_failure_log:.0f}s: {summary}")
+            self._window_failures = {}
+            self._last_errors = {}
+            self._last_failure_log = now
+
+    def parse_snort_line(self, line: str) -> Optional[Alert]:
         """
         Parse a single Snort alert line
         
@@ -47,7 +181,7 @@ class SnortAlertParser:
             line: Raw alert line from Snort log
             
         Returns:
-            Dictionary with parsed alert data or None
+            Alert record or None
         """
         match = self.SNORT_ALERT_REGEX.search(line)
         if not match:
@@ -57,32 +191,32 @@ class SnortAlertParser:
             timestamp_str, classification, priority, protocol, src_ip, src_port, dst_ip, dst_port = match.groups()
 
             # Parse timestamp
-            timestamp = datetime.strptime(timestamp_str, "%m/%d-%H:%M:%S.%f")
+            timestamp = self._parse_fast_timestamp(timestamp_str)
             
             # Extract signature from classification (usually first part)
             signature = classification.split('|')[0].strip() if '|' in classification else classification
 
-            alert = {
-                'timestamp': timestamp,
-                'signature': signature,
-                'classification': classification,
-                'priority': priority,
-                'severity': self.SEVERITY_MAP.get(priority, 'INFO'),
-                'protocol': protocol,
-                'src_ip': src_ip,
-                'src_port': int(src_port),
-                'dst_ip': dst_ip,
-                'dst_port': int(dst_port),
-                'message': line.strip()
-            }
+            alert = Alert(
+                timestamp=timestamp,
+                signature=intern(signature),
+                classification=intern(classification),
+                priority=intern(priority),
+                severity=self.SEVERITY_MAP.get(priority, 'INFO'),
+                protocol=intern(protocol),
+                src_ip=src_ip,
+                src_port=int(src_port),
+                dst_ip=dst_ip,
+                dst_port=int(dst_port),
+                message=line.strip()
+            )
 
             return alert
 
         except Exception as e:
-            logger.warning(f"Failed to parse alert line: {str(e)}")
+            self._record_failure('fast', error=str(e))
             return None
 
-    def parse_csv_format(self, line: str) -> Optional[Dict[str, Any]]:
+    def parse_csv_format(self, line: str) -> Optional[Alert]:
         """
         Parse Snort CSV format alert
         Format: timestamp,sig_generator,sig_id,sig_rev,msg,proto,src,srcport,dst,dstport,id,classification,priority
@@ -91,55 +225,377 @@ class SnortAlertParser:
             line: CSV formatted alert line
             
         Returns:
-            Parsed alert dictionary
+            Alert record or None
         """
         try:
-            parts = [p.strip('"') for p in line.split(',')]
-            
-            if len(parts) < 13:
-                return None
+            return self._parse_csv(line)
 
-            timestamp = datetime.fromisoformat(parts[0])
-            
-            alert = {
-                'timestamp': timestamp,
-                'signature': parts[4],  # msg
-                'classification': parts[11],
-                'priority': parts[12],
-                'severity': self.SEVERITY_MAP.get(parts[12], 'INFO'),
-                'protocol': parts[5],
-                'src_ip': parts[6],
-                'src_port': int(parts[7]) if parts[7] else 0,
-                'dst_ip': parts[8],
-                'dst_port': int(parts[9]) if parts[9] else 0,
-                'message': f"{parts[4]} - {parts[6]}:{parts[7]} -> {parts[8]}:{parts[9]}"
-            }
+        except Exception as e:
+            self._record_failure('csv', error=str(e))
+            return None
 
-            return alert
+    def _parse_csv(self, line: str) -> Optional[Alert]:
+        """Parse a CSV alert line, raising on malformed fields"""
+        parts = [p.strip('"') for p in line.split(',')]
+
+        if len(parts) < 13:
+            return None
+
+        timestamp = datetime.fromisoformat(parts[0])
+
+        return Alert(
+            timestamp=timestamp,
+            signature=intern(parts[4]),  # msg
+            classification=intern(parts[11]),
+            priority=intern(parts[12]),
+            severity=self.SEVERITY_MAP.get(parts[12], 'INFO'),
+            protocol=intern(parts[5]),
+            src_ip=parts[6],
+            src_port=int(parts[7]) if parts[7] else 0,
+            dst_ip=parts[8],
+            dst_port=int(parts[9]) if parts[9] else 0,
+            message=f"{parts[4]} - {parts[6]}:{parts[7]} -> {parts[8]}:{parts[9]}"
+        )
+
+    def parse_json_line(self, line: str) -> Optional[Alert]:
+        """
+        Parse a Snort 3 alert_json line
+
+        Uses the msg, class, priority, proto, src_addr/src_port and
+        dst_addr/dst_port fields, falling back to src_ap/dst_ap
+        ("addr:port") when the separate fields are not configured.
+
+        Args:
+            line: JSON formatted alert line
+
+        Returns:
+            Alert record or None
+        """
+        try:
+            return self._parse_json(line)
 
         except Exception as e:
-            logger.warning(f"Failed to parse CSV alert line: {str(e)}")
+            self._record_failure('json', error=str(e))
+            return None
+
+    def _parse_json(self, line: str) -> Optional[Alert]:
+        """Parse a JSON alert line, raising on malformed fields"""
+        record = json.loads(line)
+        if not isinstance(record, dict) or 'timestamp' not in record:
             return None
 
+        timestamp_str = record['timestamp']
+        try:
+            timestamp = self._parse_fast_timestamp(timestamp_str)
+        except ValueError:
+            timestamp = datetime.fromisoformat(timestamp_str)
+
+        src_ip, src_port = record.get('src_addr'), record.get('src_port')
+        dst_ip, dst_port = record.get('dst_addr'), record.get('dst_port')
+        if src_ip is None and 'src_ap' in record:
+            src_ip, _, src_port = record['src_ap'].rpartition(':')
+        if dst_ip is None and 'dst_ap' in record:
+            dst_ip, _, dst_port = record['dst_ap'].rpartition(':')
+
+        signature = record.get('msg', 'Unknown')
+        priority = str(record.get('priority', '4'))
+        src_port = int(src_port) if src_port not in (None, '') else 0
+        dst_port = int(dst_port) if dst_port not in (None, '') else 0
+
+        return Alert(
+            timestamp=timestamp,
+            signature=intern(signature),
+            classification=intern(record.get('class', 'none')),
+            priority=intern(priority),
+            severity=self.SEVERITY_MAP.get(priority, 'INFO'),
+            protocol=intern(record.get('proto', '')),
+            src_ip=src_ip or '',
+            src_port=src_port,
+            dst_ip=dst_ip or '',
+            dst_port=dst_port,
+            message=f"{signature} - {src_ip}:{src_port} -> {dst_ip}:{dst_port}"
+        )
+
+    def sniff_format(self, data: bytes) -> Optional[str]:
+        """
+        Detect the line format of a source from its first lines
+
+        Args:
+            data: Leading bytes of the source
+
+        Returns:
+            'fast', 'csv' or 'json', or None if no format fits the sample
+        """
+        lines = data.split(b'\n')
+        if not data.endswith(b'\n'):
+            lines = lines[:-1]  # last line may be cut short
+        sample = [line.decode('utf-8', errors='ignore') for line in lines if line.strip()]
+        sample = sample[:self.SNIFF_LINES]
+        if not sample:
+            return None
+
+        checks = {
+            'fast': lambda line: self.SNORT_ALERT_REGEX.search(line) is not None,
+            'csv': self._parse_csv,
+            'json': lambda line: line.lstrip().startswith('{') and self._parse_json(line)
+        }
+
+        scores = {}
+        for fmt in self.FORMATS:
+            score = 0
+            for line in sample:
+                try:
+                    if checks[fmt](line):
+                        score += 1
+                except Exception:
+                    pass
+            scores[fmt] = score
+
+        best = max(self.FORMATS, key=lambda fmt: scores[fmt])
+        return best if scores[best] else None
+
+    def buffer_parser(self, fmt: Optional[str]):
+        """
+        Get the buffer parsing function for a line format
+
+        Args:
+            fmt: 'fast', 'csv', 'json', or None to try fast then CSV per line
+
+        Returns:
+            Callable taking a bytes buffer and returning a parse_buffer-style result
+        """
+        if fmt == 'fast':
+            return lambda data: self.parse_buffer(data, csv_fallback=False)
+        if fmt == 'csv':
+            return lambda data: self._parse_lines(data, 'csv', self._parse_csv)
+        if fmt == 'json':
+            return lambda data: self._parse_lines(data, 'json', self._parse_json)
+        return self.parse_buffer
+
+    def _parse_lines(self, data: bytes, fmt: str, line_parser) -> Dict[str, Any]:
+        """Parse a buffer line by line with a single-format parser"""
+        alerts = []
+        rejected = 0
+        error = None
+        for raw in data.split(b'\n'):
+            if not raw.strip():
+                continue
+            try:
+                alert = line_parser(raw.decode('utf-8', errors='ignore'))
+            except Exception as e:
+                alert = None
+                error = str(e)
+            if alert:
+                alerts.append(alert)
+            else:
+                rejected += 1
+
+        if rejected:
+            self._record_failure(fmt, rejected, error)
+
+        return {
+            'alerts': alerts,
+            'matched': len(alerts),
+            'csv': len(alerts) if fmt == 'csv' else 0,
+            'rejected': rejected
+        }
+
+    def parse_buffer(self, data: bytes, csv_fallback: bool = True,
+                     now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Parse a whole buffer of Snort fast-format lines in one pass
+
+        Runs SNORT_BATCH_REGEX over the buffer with finditer instead of
+        calling parse_snort_line once per line. Lines the fast pattern does
+        not match are handed to parse_csv_format when csv_fallback is set,
+        so the result is the same as the per-line path.
+
+        Args:
+            data: Raw bytes read from the alert log (complete lines)
+            csv_fallback: Try CSV format on lines the fast pattern rejects
+            now: Local time the buffer was read at, which dates its year-less
+                timestamps (see assume_year); defaults to the current time
+
+        Returns:
+            Dictionary with 'alerts' (parsed alerts in file order), 'matched'
+            (lines that produced an alert), 'csv' (of which parsed as CSV)
+            and 'rejected' (non-blank lines that produced no alert)
+        """
+        alerts = []
+        matched = 0
+        csv_matched = 0
+        rejected = 0
+        position = 0
+        now = now or datetime.now()
+        year, horizon = now.year, now + YEAR_ROLLBACK_MARGIN
+
+        def parse_gap(gap: bytes):
+            nonlocal matched, csv_matched, rejected
+            for raw in gap.split(b'\n'):
+                if not raw.strip():
+                    continue
+                alert = None
+                if csv_fallback:
+                    alert = self.parse_csv_format(raw.decode('utf-8', errors='ignore'))
+                if alert:
+                    alerts.append(alert)
+                    matched += 1
+                    csv_matched += 1
+                else:
+                    rejected += 1
+
+        for match in self.SNORT_BATCH_REGEX.finditer(data):
+            if match.start() > position:
+                parse_gap(data[position:match.start()])
+            position = match.end()
+
+            alert = self._alert_from_batch_match(match, year, horizon)
+            if alert:
+                alerts.append(alert)
+                matched += 1
+            else:
+                parse_gap(match.group(0))
+
+        if position < len(data):
+            parse_gap(data[position:])
+
+        if rejected:
+            self._record_failure('fast', rejected)
+
+        return {
+            'alerts': alerts,
+            'matched': matched,
+            'csv': csv_matched,
+            'rejected': rejected
+        }
+
+    @staticmethod
+    def _parse_fast_timestamp(text: str, now: Optional[datetime] = None) -> datetime:
+        """
+        Parse a year-less fast-format timestamp ("01/02-13:45:33.123456")
+
+        Args:
+            text: Timestamp as written by Snort
+            now: Local time it was read at (see assume_year); defaults to
+                the current time
+
+        Raises:
+            ValueError: If the text is not a valid timestamp
+        """
+        now = now or datetime.now()
+        # Parsed in now's year: "02/29" is only valid in a leap year
+        return assume_year(datetime.strptime(f"{now.year}/{text}", "%Y/%m/%d-%H:%M:%S.%f"), now)
+
+    def _alert_from_batch_match(self, match, year: int, horizon: datetime) -> Optional[Alert]:
+        """
+        Build an Alert from a SNORT_BATCH_REGEX match
+
+        Args:
+            match: SNORT_BATCH_REGEX match
+            year: Year assumed for the timestamp
+            horizon: Latest plausible time; later timestamps are from the
+                year before
+        """
+        (second_str, fraction, classification, priority, protocol,
+         src_ip, src_port, dst_ip, dst_port) = match.groups()
+
+        # Build the timestamp directly rather than through strptime. Like
+        # _parse_fast_timestamp this rejects out-of-range fields and accepts
+        # at most six fractional digits.
+        if len(fraction) > 6:
+            return None
+        try:
+            timestamp = datetime(year, int(second_str[0:2]), int(second_str[3:5]),
+                                 int(second_str[6:8]), int(second_str[9:11]),
+                                 int(second_str[12:14]), int(fraction.ljust(6, b'0')))
+            if timestamp > horizon:
+                timestamp = timestamp.replace(year=year - 1)
+        except ValueError:
+            return None
+
+        # Repeated fields are decoded once and shared between alerts
+        strings = self.strings
+        classification = strings.text(classification)
+        signature = intern(classification.split('|')[0].strip()) if '|' in classification else classification
+        priority = strings.text(priority)
+
+        return Alert(
+            timestamp=timestamp,
+            signature=signature,
+            classification=classification,
+            priority=priority,
+            severity=self.SEVERITY_MAP.get(priority, 'INFO'),
+            protocol=strings.text(protocol),
+            src_ip=src_ip.decode('ascii'),
+            src_port=int(src_port),
+            dst_ip=dst_ip.decode('ascii'),
+            dst_port=int(dst_port),
+            message=match.group(0).decode('utf-8', errors='ignore').strip()
+        )
+
 
 class AlertCollector:
     """Collects alerts from Snort log file in real-time"""
 
-    def __init__(self, alert_file: str = "/var/log/snort/alert_fast.log"):
+    # Leading bytes hashed to recognise a rotated file after compression
+    FINGERPRINT_SIZE = 1024
+
+    # Leading bytes of a file used to sniff its line format
+    SNIFF_SIZE = 64 * 1024
+
+    # Most bytes read from the live file per read_new_alerts call, so a
+    # backlog (e.g. after resuming from a checkpoint) is read piecewise
+    READ_CHUNK_SIZE = 4 * 1024 * 1024
+
+    def __init__(self, alert_file: str = "/var/log/snort/alert_fast.log",
+                 tail_mode: str = 'auto', coalesce_delay: float = 0.05,
+                 poll_interval: float = 0.25, checkpoint_file: Optional[str] = None):
         """
         Initialize alert collector
         
         Args:
             alert_file: Path to Snort alert log file
+            tail_mode: 'inotify', 'poll' or 'auto' (inotify when available)
+            coalesce_delay: Seconds to keep gathering writes after the first
+                one wakes the collector, so bursts are read as one batch
+            poll_interval: Seconds between checks when polling
+            checkpoint_file: Where to persist the read position across
+                restarts (None keeps it in memory only)
         """
         self.alert_file = alert_file
+        self.tail_mode = tail_mode
+        self.coalesce_delay = coalesce_delay
+        self.poll_interval = poll_interval
+        self.checkpoint_file = checkpoint_file
         self.parser = SnortAlertParser()
         self.last_position = 0
+        self.partial_line = b''
         self.file_handle = None
+        self.watcher = None
+        self._saved_checkpoint = None
+        # Line format of the current file and the parser bound to it
+        self.line_format = None
+        self._parse_buffer = self.parser.buffer_parser(None)
+        # Compressed rotated file being drained before the live file
+        self.archive = None
+        self.archive_raw = None
+        self.archive_position = 0
+        self.archive_partial = b''
+        self.archive_fingerprint = None
+        self._archive_parse_buffer = None
+        self.stats = {
+            'batches': 0,
+            'lines_matched': 0,
+            'lines_rejected': 0,
+            'rotations': 0
+        }
 
     def start_collection(self) -> bool:
         """
         Open and prepare alert file for collection
+
+        Resumes from the saved checkpoint when there is one, otherwise
+        starts at the end of the file.
         
         Returns:
             True if successful, False otherwise
@@ -149,47 +605,408 @@ class AlertCollector:
                 logger.error(f"Alert file not found: {self.alert_file}")
                 return False
 
-            self.file_handle = open(self.alert_file, 'r', encoding='utf-8', errors='ignore')
-            # Move to end of file
-            self.file_handle.seek(0, 2)
-            self.last_position = self.file_handle.tell()
-            logger.info(f"Alert collection started on {self.alert_file}")
+            if not self._resume_from_checkpoint():
+                self.file_handle = self._open_source(self.alert_file)
+                # Move to end of file
+                self.file_handle.seek(0, 2)
+                self.last_position = self.file_handle.tell()
+                self.partial_line = b''
+
+            self.watcher = create_watcher(self.alert_file, self.tail_mode, self.poll_interval)
+            logger.info(f"Alert collection started on {self.alert_file} at offset "
+                        f"{self.last_position} ({type(self.watcher).__name__})")
             return True
 
         except Exception as e:
             logger.error(f"Failed to start collection: {str(e)}")
             return False
 
-    def read_new_alerts(self) -> List[Dict[str, Any]]:
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Read the checkpoint file, if any"""
+        if not self.checkpoint_file:
+            return None
+        try:
+            with open(self.checkpoint_file, 'r') as f:
+                checkpoint = json.load(f)
+            checkpoint['partial'] = base64.b64decode(checkpoint.get('partial', ''))
+            return checkpoint
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, OSError) as e:
+            logger.warning(f"Ignoring unreadable collector checkpoint: {str(e)}")
+            return None
+
+    def _resume_from_checkpoint(self) -> bool:
         """
-        Read new alerts from the log file
-        
+        Reopen the file recorded in the checkpoint at its saved offset
+
+        If the alert file was rotated while we were down, the rotated file is
+        located by inode and read to the end first; read_new_alerts then moves
+        on to the new file. A rotated file that has since been compressed is
+        found by the fingerprint of its first bytes and streamed through a
+        decompressor.
+
         Returns:
-            List of new alert dictionaries
+            True if a checkpoint was applied
         """
-        alerts = []
+        checkpoint = self._load_checkpoint()
+        if not checkpoint:
+            return False
+        if checkpoint.get('path') != self.alert_file:
+            logger.info(f"Checkpoint is for {checkpoint.get('path')}, not {self.alert_file}; ignoring it")
+            return False
+
+        target = (checkpoint['inode'], checkpoint['device'])
+        path = self._find_file_by_inode(checkpoint) or self._find_archive_by_fingerprint(checkpoint)
+        if path is None:
+            logger.warning(f"Checkpointed file (inode {target[0]}) no longer exists, "
+                           f"reading {self.alert_file} from the start")
+            self.file_handle = self._open_source(self.alert_file)
+            self.last_position = 0
+            self.partial_line = b''
+            return True
+
+        if is_compressed(path):
+            logger.info(f"Finishing compressed rotated file {path} before {self.alert_file}")
+            self._open_archive(path, checkpoint['offset'], checkpoint['partial'])
+            self.file_handle = self._open_source(self.alert_file)
+            self.last_position = 0
+            self.partial_line = b''
+            self._saved_checkpoint = self.checkpoint_state()
+            return True
+
+        self.file_handle = self._open_source(path)
+        size = os.fstat(self.file_handle.fileno()).st_size
+        if size < checkpoint['offset']:
+            logger.warning(f"{path} was truncated since the checkpoint, reading from the start")
+            self.last_position = 0
+            self.partial_line = b''
+        else:
+            self.last_position = checkpoint['offset']
+            self.partial_line = checkpoint['partial']
 
+        if path != self.alert_file:
+            logger.info(f"Finishing rotated file {path} before {self.alert_file}")
+        self._saved_checkpoint = self.checkpoint_state()
+        return True
+
+    def _find_file_by_inode(self, checkpoint: Dict[str, Any]) -> Optional[str]:
+        """
+        Find the alert file or one of its rotated siblings by inode
+
+        A match is only accepted if the file still starts with the
+        checkpointed fingerprint, since inode numbers are reused.
+        """
+        inode, device = checkpoint['inode'], checkpoint['device']
+        fingerprint = checkpoint.get('fingerprint')
+        size = checkpoint.get('fingerprint_size', 0)
+        candidates = [self.alert_file]
+        directory = os.path.dirname(os.path.abspath(self.alert_file))
+        base = os.path.basename(self.alert_file)
         try:
-            if not self.file_handle:
-                self.start_collection()
+            candidates += sorted(entry.path for entry in os.scandir(directory)
+                                 if entry.name.startswith(base) and entry.name != base)
+        except OSError:
+            pass
 
-            self.file_handle.seek(self.last_position)
-            new_lines = self.file_handle.readlines()
-            self.last_position = self.file_handle.tell()
+        for candidate in candidates:
+            try:
+                st = os.stat(candidate)
+            except OSError:
+                continue
+            if (st.st_ino, st.st_dev) != (inode, device):
+                continue
+            if fingerprint and not self._matches_fingerprint(candidate, fingerprint, size):
+                logger.info(f"{candidate} reuses the checkpointed inode but not its content")
+                continue
+            return candidate
+        return None
 
-            for line in new_lines:
-                if not line.strip():
-                    continue
+    def _matches_fingerprint(self, path: str, fingerprint: str, size: int) -> bool:
+        """Check whether a (possibly compressed) file starts with the fingerprinted bytes"""
+        try:
+            with open_alert_stream(path) as stream:
+                head = self._read_exactly(stream, size)
+        except (OSError, ImportError, EOFError) as e:
+            logger.debug(f"Cannot fingerprint {path}: {str(e)}")
+            return False
+        return len(head) == size and hashlib.sha1(head).hexdigest() == fingerprint
 
-                # Try parsing as fast format first
-                alert = self.parser.parse_snort_line(line)
-                
-                # If that fails, try CSV format
-                if not alert:
-                    alert = self.parser.parse_csv_format(line)
+    def _find_archive_by_fingerprint(self, checkpoint: Dict[str, Any]) -> Optional[str]:
+        """Find a compressed rotated sibling whose content starts like the checkpointed file"""
+        fingerprint = checkpoint.get('fingerprint')
+        size = checkpoint.get('fingerprint_size', 0)
+        if not fingerprint or not size:
+            return None
 
-                if alert:
-                    alerts.append(alert)
+        directory = os.path.dirname(os.path.abspath(self.alert_file))
+        base = os.path.basename(self.alert_file)
+        try:
+            candidates = sorted(entry.path for entry in os.scandir(directory)
+                                if entry.name.startswith(base) and is_compressed(entry.name))
+        except OSError:
+            return None
+
+        for candidate in candidates:
+            if self._matches_fingerprint(candidate, fingerprint, size):
+                return candidate
+        return None
+
+    @staticmethod
+    def _read_exactly(stream, size: int) -> bytes:
+        """Read up to size bytes, looping over short reads"""
+        chunks = []
+        while size > 0:
+            chunk = stream.read(min(size, ARCHIVE_CHUNK_SIZE))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def _open_archive(self, path: str, offset: int, partial: bytes):
+        """Open a compressed rotated file and skip to a decompressed offset"""
+        with open_alert_stream(path) as stream:
+            head = self._read_exactly(stream, self.SNIFF_SIZE)
+        self.archive_fingerprint = (hashlib.sha1(head[:self.FINGERPRINT_SIZE]).hexdigest(),
+                                    min(len(head), self.FINGERPRINT_SIZE))
+        self._archive_parse_buffer = self.parser.buffer_parser(self.parser.sniff_format(head))
+
+        self.archive_raw = open(path, 'rb')
+        self.archive = open_alert_stream(path, self.archive_raw)
+
+        # Decompress and discard everything before the checkpointed offset
+        skipped = 0
+        while skipped < offset:
+            chunk = self.archive.read(min(offset - skipped, ARCHIVE_CHUNK_SIZE))
+            if not chunk:
+                break
+            skipped += len(chunk)
+        self.archive_position = skipped
+        self.archive_partial = partial if skipped == offset else b''
+
+    def _read_archive_chunk(self) -> List[Alert]:
+        """Parse the next chunk of the compressed rotated file"""
+        chunk = self.archive.read(ARCHIVE_CHUNK_SIZE)
+        if chunk:
+            self.archive_position += len(chunk)
+            data = self.archive_partial + chunk
+            end = data.rfind(b'\n') + 1
+            self.archive_partial = data[end:]
+            return self._parse(data[:end], self._archive_parse_buffer)
+
+        # Finished: the unterminated tail is a final line
+        leftover = self.archive_partial
+        parse_buffer = self._archive_parse_buffer
+        self._close_archive()
+        self.stats['rotations'] += 1
+        alerts = self._parse(leftover + b'\n' if leftover else b'', parse_buffer)
+        alerts.extend(self._read_complete_lines())
+        return alerts
+
+    def _close_archive(self):
+        """Close the compressed rotated file"""
+        if self.archive is not None:
+            self.archive.close()
+            self.archive_raw.close()
+        self.archive = None
+        self.archive_raw = None
+        self.archive_position = 0
+        self.archive_partial = b''
+        self.archive_fingerprint = None
+        self._archive_parse_buffer = None
+
+    def checkpoint_state(self) -> Optional[Dict[str, Any]]:
+        """Current (inode, device, offset, partial line) of the file being read"""
+        if self.archive is not None:
+            st = os.fstat(self.archive_raw.fileno())
+            fingerprint, fingerprint_size = self.archive_fingerprint
+            offset, partial = self.archive_position, self.archive_partial
+        elif self.file_handle:
+            st = os.fstat(self.file_handle.fileno())
+            head = os.pread(self.file_handle.fileno(), self.FINGERPRINT_SIZE, 0)
+            fingerprint, fingerprint_size = hashlib.sha1(head).hexdigest(), len(head)
+            offset, partial = self.last_position, self.partial_line
+        else:
+            return None
+
+        return {
+            'path': self.alert_file,
+            'inode': st.st_ino,
+            'device': st.st_dev,
+            'offset': offset,
+            'partial': partial,
+            'fingerprint': fingerprint,
+            'fingerprint_size': fingerprint_size
+        }
+
+    def commit_checkpoint(self, state: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Durably record the current read position
+
+        Call once the alerts returned by read_new_alerts have been stored.
+        The checkpoint is written to a temporary file, fsynced and renamed
+        over the previous one, and skipped when nothing changed, so there
+        is at most one fsync per batch.
+
+        Args:
+            state: Position captured with checkpoint_state() right after the
+                batch was read, for callers that store batches on another
+                thread (default: the current position)
+
+        Returns:
+            True if a checkpoint was written
+        """
+        if not self.checkpoint_file:
+            return False
+
+        if state is None:
+            state = self.checkpoint_state()
+        if state is None or state == self._saved_checkpoint:
+            return False
+
+        try:
+            record = dict(state, partial=base64.b64encode(state['partial']).decode('ascii'))
+            directory = os.path.dirname(os.path.abspath(self.checkpoint_file))
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.checkpoint_file}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(record, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.checkpoint_file)
+            self._fsync_directory(directory)
+            self._saved_checkpoint = state
+            return True
+
+        except OSError as e:
+            logger.error(f"Failed to write collector checkpoint: {str(e)}")
+            return False
+
+    @staticmethod
+    def _fsync_directory(directory: str):
+        """Make a rename in directory durable (no-op where unsupported)"""
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def has_pending_data(self) -> bool:
+        """Check whether the file has grown, been rotated or been truncated"""
+        if self.archive is not None:
+            return True
+        if self.file_handle is None:
+            return False
+        try:
+            st = os.stat(self.alert_file)
+            current = os.fstat(self.file_handle.fileno())
+        except OSError:
+            return False
+        if (st.st_ino, st.st_dev) != (current.st_ino, current.st_dev):
+            return True
+        return st.st_size != self.last_position
+
+    def wait_for_alerts(self, timeout: float) -> bool:
+        """
+        Block until the alert file is written to or the timeout expires
+
+        Once a write wakes the collector, it keeps collecting further writes
+        for up to coalesce_delay seconds so that a burst is drained by a
+        single read_new_alerts call.
+
+        Args:
+            timeout: Maximum seconds to wait for the first write
+
+        Returns:
+            True if new data is ready to be read
+        """
+        if self.watcher is None:
+            time.sleep(timeout)
+            return self.has_pending_data()
+
+        if self.has_pending_data():
+            self.watcher.drain()
+            return True
+
+        if not self.watcher.wait(timeout):
+            return self.has_pending_data()
+
+        if self.coalesce_delay > 0:
+            time.sleep(self.coalesce_delay)
+            self.watcher.drain()
+
+        return True
+
+    async def wait_for_alerts_async(self, timeout: float) -> bool:
+        """
+        Wait for new alerts from a coroutine
+
+        Same behaviour as wait_for_alerts, but waits on the event loop
+        instead of blocking a thread; cancel the task to interrupt it.
+
+        Args:
+            timeout: Maximum seconds to wait for the first write
+
+        Returns:
+            True if new data is ready to be read
+        """
+        if self.watcher is None:
+            await asyncio.sleep(timeout)
+            return self.has_pending_data()
+
+        if self.has_pending_data():
+            self.watcher.drain()
+            return True
+
+        if not await self.watcher.wait_async(timeout):
+            return self.has_pending_data()
+
+        if self.coalesce_delay > 0:
+            await asyncio.sleep(self.coalesce_delay)
+            self.watcher.drain()
+
+        return True
+
+    def interrupt(self):
+        """Wake up a thread blocked in wait_for_alerts"""
+        if self.watcher:
+            self.watcher.wake()
+
+    def read_new_alerts(self) -> List[Alert]:
+        """
+        Read new alerts from the log file
+
+        Everything written since the last call, up to READ_CHUNK_SIZE bytes,
+        is read as one buffer and parsed in a single
+        SnortAlertParser.parse_buffer pass; a larger backlog is read over
+        successive calls, has_pending_data() staying True until it is done.
+        A trailing line without its newline is held back until it is
+        completed. If the file was rotated, the old file is read to the end
+        before switching to the new one; if it was truncated, reading
+        restarts at offset 0.
+        
+        Returns:
+            List of new Alert records
+        """
+        try:
+            if not self.file_handle:
+                if not self.start_collection():
+                    return []
+
+            if self.archive is not None:
+                return self._read_archive_chunk()
+
+            alerts = self._read_complete_lines()
+            rotated = self._check_rotation()
+            if rotated is not None:
+                alerts.extend(rotated)
+                alerts.extend(self._read_complete_lines())
 
             return alerts
 
@@ -197,8 +1014,119 @@ class AlertCollector:
             logger.error(f"Error reading alerts: {str(e)}")
             return []
 
+    def _read_complete_lines(self) -> List[Alert]:
+        """Read up to READ_CHUNK_SIZE bytes and parse every complete line"""
+        self.file_handle.seek(self.last_position)
+        data = self.file_handle.read(self.READ_CHUNK_SIZE)
+        if not data:
+            return []
+        self.last_position += len(data)
+
+        data = self.partial_line + data
+        end = data.rfind(b'\n') + 1
+        self.partial_line = data[end:]
+        if not end:
+            return []
+        return self._parse(data[:end])
+
+    def _open_source(self, path: str):
+        """Open a plain alert file and sniff its line format"""
+        handle = open(path, 'rb')
+        self._bind_format(os.pread(handle.fileno(), self.SNIFF_SIZE, 0))
+        return handle
+
+    def _bind_format(self, head: bytes):
+        """Detect the line format from leading bytes and bind its parser"""
+        fmt = self.parser.sniff_format(head) if head else None
+        self.line_format = fmt
+        self._parse_buffer = self.parser.buffer_parser(fmt)
+        if fmt:
+            logger.info(f"Detected {fmt} alert format in {self.alert_file}")
+
+    def _parse(self, data: bytes, parse_buffer=None) -> List[Alert]:
+        """Parse a buffer with the source's bound parser and update the counters"""
+        if not data:
+            return []
+
+        if parse_buffer is None:
+            # A file that was empty when opened is sniffed on its first lines
+            if self.line_format is None:
+                self._bind_format(data)
+            parse_buffer = self._parse_buffer
+
+        batch = parse_buffer(data)
+        self.stats['batches'] += 1
+        self.stats['lines_matched'] += batch['matched']
+        self.stats['lines_rejected'] += batch['rejected']
+
+        if batch['rejected']:
+            logger.debug(f"Batch of {batch['matched']} alerts, "
+                         f"{batch['rejected']} unparseable lines")
+
+        return batch['alerts']
+
+    def _check_rotation(self) -> Optional[List[Alert]]:
+        """
+        Switch files if the alert file was rotated or truncated
+
+        Returns:
+            None if nothing changed, otherwise the alerts from the tail of
+            the old file (including its unterminated last line)
+        """
+        try:
+            st = os.stat(self.alert_file)
+        except OSError:
+            # Renamed away and not recreated yet: keep reading the old file
+            return None
+
+        current = os.fstat(self.file_handle.fileno())
+        if (st.st_ino, st.st_dev) == (current.st_ino, current.st_dev):
+            if st.st_size >= self.last_position:
+                return None
+            logger.warning(f"{self.alert_file} was truncated, reading from the start")
+            self.last_position = 0
+            self.partial_line = b''
+            self.stats['rotations'] += 1
+            return []
+
+        # Rotated: finish anything written to the old file since the last
+        # read (one chunk per call), then treat its unterminated tail as a
+        # final line
+        if current.st_size > self.last_position:
+            return None
+        leftover = self.partial_line
+        if leftover and not leftover.endswith(b'\n'):
+            leftover += b'\n'
+        alerts = self._parse(leftover)
+
+        self.file_handle.close()
+        self.file_handle = self._open_source(self.alert_file)
+        self.last_position = 0
+        self.partial_line = b''
+        self.stats['rotations'] += 1
+        logger.info(f"{self.alert_file} was rotated, switching to the new file")
+
+        if self.watcher:
+            self.watcher.close()
+            self.watcher = create_watcher(self.alert_file, self.tail_mode, self.poll_interval)
+
+        return alerts
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cumulative parsing counters for this collector"""
+        stats = dict(self.stats)
+        stats['line_format'] = self.line_format
+        stats['parse_failures'] = dict(self.parser.failure_counts)
+        return stats
+
     def stop_collection(self):
         """Stop collection and close file"""
+        self._close_archive()
+
+        if self.watcher:
+            self.watcher.close()
+            self.watcher = None
+
         if self.file_handle:
             self.file_handle.close()
             self.file_handle = None
@@ -233,29 +1161,29 @@ class MockAlertGenerator:
     PROTOCOLS = ["TCP", "UDP", "ICMP", "HTTP", "HTTPS"]
 
     @classmethod
-    def generate_alert(cls) -> Dict[str, Any]:
+    def generate_alert(cls) -> Alert:
         """Generate a random mock alert"""
         import random
         
         base_ip = f"192.168.{random.randint(0, 255)}"
         
-        alert = {
-            'timestamp': datetime.now() - timedelta(seconds=random.randint(0, 3600)),
-            'signature': random.choice(cls.SIGNATURES),
-            'classification': 'Suspicious Activity',
-            'priority': str(random.randint(1, 3)),
-            'severity': random.choice(['HIGH', 'MEDIUM', 'LOW']),
-            'protocol': random.choice(cls.PROTOCOLS),
-            'src_ip': f"{base_ip}.{random.randint(1, 254)}",
-            'src_port': random.randint(1024, 65535),
-            'dst_ip': "10.0.0.1",
-            'dst_port': random.choice([22, 80, 443, 3306, 5432]),
-            'message': f"Mock alert for testing"
-        }
+        alert = Alert(
+            timestamp=datetime.now() - timedelta(seconds=random.randint(0, 3600)),
+            signature=random.choice(cls.SIGNATURES),
+            classification='Suspicious Activity',
+            priority=str(random.randint(1, 3)),
+            severity=random.choice(['HIGH', 'MEDIUM', 'LOW']),
+            protocol=random.choice(cls.PROTOCOLS),
+            src_ip=f"{base_ip}.{random.randint(1, 254)}",
+            src_port=random.randint(1024, 65535),
+            dst_ip="10.0.0.1",
+            dst_port=random.choice([22, 80, 443, 3306, 5432]),
+            message=f"Mock alert for testing"
+        )
 
         return alert
 
     @classmethod
-    def generate_batch(cls, count: int = 10) -> List[Dict[str, Any]]:
+    def generate_batch(cls, count: int = 10) -> List[Alert]:
         """Generate multiple mock alerts"""
         return [cls.generate_alert() for _ in range(count)]
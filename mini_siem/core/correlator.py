@@ -176,13 +176,13 @@ class CorrelationEngine:
             return None
 
         # Sort by timestamp
-        sorted_alerts = sorted(alerts, key=lambda x: x['timestamp'])
+        times = sorted(((self._alert_time(a), a) for a in alerts), key=lambda x: x[0])
+        sorted_alerts = [a for _, a in times]
         
         # Calculate time deltas between consecutive alerts
         rapid_attacks = []
         for i in range(1, len(sorted_alerts)):
-            time_delta = (sorted_alerts[i]['timestamp'] - 
-                         sorted_alerts[i-1]['timestamp']).total_seconds()
+            time_delta = (times[i][0] - times[i-1][0]).total_seconds()
             
             # If alerts are within 30 seconds, it's rapid
             if 0 < time_delta < 30:
@@ -209,20 +209,16 @@ class CorrelationEngine:
             'details': {
                 'reason': f"Detected {len(rapid_attacks)} rapid attack sequences",
                 'rapid_sequences': rapid_attacks[:5],
-                'total_sequence_time': (last_alert - first_alert).total_seconds()
+                'total_sequence_time': (times[-1][0] - times[0][0]).total_seconds()
             }
         }
 
         return detection
 
-    @staticmethod
-    def _is_recent(alert: Dict, minutes: int) -> bool:
+    @classmethod
+    def _is_recent(cls, alert: Dict, minutes: int) -> bool:
         """Check if alert is within time window"""
-        if isinstance(alert['timestamp'], str):
-            from datetime import datetime
-            alert_time = datetime.fromisoformat(alert['timestamp'])
-        else:
-            alert_time = alert['timestamp']
+        alert_time = cls._alert_time(alert)
 
         now = datetime.now()
         time_diff = (now - alert_time).total_seconds() / 60
@@ -256,6 +252,13 @@ class CorrelationEngine:
         """Set minimum signature count for detection"""
         self.signature_threshold = count
 
+    @classmethod
+    def _alert_time(cls, alert: Dict) -> datetime:
+        """Get an alert's time, from the epoch column of stored rows when present"""
+        if alert.get('timestamp_us') is not None:
+            return datetime.fromtimestamp(alert['timestamp_us'] / 1000000)
+        return cls._parse_timestamp(alert['timestamp'])
+
     @staticmethod
     def _parse_timestamp(ts) -> datetime:
         """Convert timestamp string or datetime to datetime object"""
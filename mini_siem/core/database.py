@@ -5,104 +5,256 @@ Handles SQLite database operations for alert storage and retrieval
 
 import sqlite3
 import json
-from datetime import datetime
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+from core.alert import Alert, assume_year
+from core.migrations import (MIGRATIONS, SCHEMA_VERSION, ALERT_COLUMNS, create_alert_partition,
+                             create_alert_partition_indexes, get_schema_version)
+from core.partitions import AlertPartitions
+
+logger = logging.getLogger(__name__)
 
 DB_PATH = Path(__file__).parent.parent / "data" / "siem.db"
 
+# Largest IN (...) list sent in one query (SQLite's default variable limit is 999)
+MAX_QUERY_PARAMS = 900
+
+# Most partitions combined in one UNION (SQLite's default compound SELECT limit is 500)
+MAX_COMPOUND_SELECT = 400
+
+
+def to_epoch_us(value) -> Optional[int]:
+    """
+    Convert an alert timestamp to integer epoch microseconds
+
+    Args:
+        value: datetime, ISO 8601 string ('T' or space separated, as
+            written by the collectors, the sqlite3 adapter and
+            generate_correlations.py) or epoch seconds. Naive times are
+            local time, like datetime.now().
+
+    Returns:
+        Epoch microseconds, or None if the value cannot be read
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip())
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        try:
+            return round(value.timestamp() * 1000000)
+        except (OverflowError, OSError, ValueError):
+            return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return round(value * 1000000)
+    return None
+
+
+def create_database_manager(settings, db_path: str = str(DB_PATH)) -> 'DatabaseManager':
+    """
+    Build the DatabaseManager used by every entry point
+
+    Args:
+        settings: Configuration module (config.py)
+        db_path: SQLite database file
+
+    Returns:
+        DatabaseManager partitioned as configured
+    """
+    return DatabaseManager(db_path, partition_hours=settings.ALERT_PARTITION_HOURS)
+
 
 class DatabaseManager:
-    """Manages SQLite database operations"""
+    """
+    Manages SQLite database operations
+
+    Connections are opened once, tuned, and reused: each operation checks
+    one out of a small pool and returns it afterwards, so any thread
+    (including per-request web server threads) skips connection setup and
+    keeps SQLite's page and prepared-statement caches warm. The database
+    runs in WAL mode, so readers are not blocked by the orchestrator's
+    writes. Call close() on shutdown.
+
+    Alerts are partitioned by time (see AlertPartitions): queries only read
+    the partitions overlapping their window, and apply_retention() drops
+    expired partitions whole.
+    """
+
+    # Enrichment records remembered per IP to skip the version lookup
+    ENRICHMENT_INDEX_SIZE = 100000
+
+    # Idle connections kept open for reuse
+    POOL_SIZE = 8
 
-    def __init__(self, db_path: str = str(DB_PATH)):
-        """Initialize database connection"""
+    # Seconds get_alert_stats() reuses its count of distinct source IPs,
+    # the one figure it still has to read every partition for
+    UNIQUE_IPS_TTL = 10.0
+    # Prepared statements cached per connection
+    STATEMENT_CACHE_SIZE = 256
+    # Seconds a connection waits for another writer's lock
+    BUSY_TIMEOUT = 30
+    # Applied to every new connection. WAL makes synchronous=NORMAL safe
+    # against corruption (a power cut can only lose the last commits)
+    CONNECTION_PRAGMAS = (
+        ('synchronous', 'NORMAL'),
+        ('cache_size', -32768),  # KiB: 32 MB of page cache per connection
+        ('mmap_size', 268435456),  # read through a 256 MB memory map
+        ('temp_store', 'MEMORY')
+    )
+
+    def __init__(self, db_path: str = str(DB_PATH), partition_hours: float = 24):
+        """
+        Initialize database connection
+
+        Args:
+            db_path: SQLite database file
+            partition_hours: Hours of alerts stored per partition table
+        """
         self.db_path = db_path
+        # The database itself is not versioned: create its directory on first use
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.partitions = AlertPartitions(partition_hours)
+        self._enrichment_index: Dict[str, tuple] = {}
+        self._enrichment_lock = threading.Lock()
+        self._unique_ips: Optional[Tuple[float, int]] = None  # (monotonic time, count)
+        self._unique_ips_lock = threading.Lock()
+        self._pool: List[sqlite3.Connection] = []
+        self._pool_lock = threading.Lock()
+        self._generation = 0  # bumped by close(): older connections are not pooled again
+        self.pool_stats = {'opened': 0, 'reused': 0}
         self._ensure_db_exists()
 
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open and tune a new connection"""
+        conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT,
+                               cached_statements=self.STATEMENT_CACHE_SIZE,
+                               check_same_thread=False)
+        for name, value in self.CONNECTION_PRAGMAS:
+            conn.execute(f"PRAGMA {name} = {value}")
+        with self._pool_lock:
+            self.pool_stats['opened'] += 1
+        return conn
+
+    @contextmanager
+    def _connect(self):
+        """
+        Check a pooled connection out for one operation
+
+        Used like sqlite3.connect(): the block's transaction is committed
+        when it succeeds and rolled back when it raises. The connection is
+        only ever used by one thread at a time.
+        """
+        with self._pool_lock:
+            generation = self._generation
+            conn = self._pool.pop() if self._pool else None
+            if conn is not None:
+                self.pool_stats['reused'] += 1
+        if conn is None:
+            conn = self._open_connection()
+
+        try:
+            with conn:
+                yield conn
+        finally:
+            with self._pool_lock:
+                if generation == self._generation and len(self._pool) < self.POOL_SIZE:
+                    self._pool.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def close(self):
+        """
+        Close every pooled connection
+
+        Connections checked out at the time are closed when returned. The
+        manager can still be used afterwards; it opens connections again.
+        """
+        with self._pool_lock:
+            self._generation += 1
+            pool, self._pool = self._pool, []
+        for conn in pool:
+            conn.close()
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get connection pool counters"""
+        with self._pool_lock:
+            return dict(self.pool_stats, idle=len(self._pool), pool_size=self.POOL_SIZE)
+
     def _ensure_db_exists(self):
-        """Create database and tables if they don't exist"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Create alerts table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS alerts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    signature TEXT NOT NULL,
-                    src_ip TEXT NOT NULL,
-                    dst_ip TEXT NOT NULL,
-                    src_port INTEGER,
-                    dst_port INTEGER,
-                    protocol TEXT,
-                    severity TEXT,
-                    message TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    enrichment_data TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Create correlations table for detected attacks
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS correlations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    attack_type TEXT NOT NULL,
-                    src_ip TEXT NOT NULL,
-                    alert_count INTEGER,
-                    unique_signatures INTEGER,
-                    first_alert_time DATETIME,
-                    last_alert_time DATETIME,
-                    details TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Create blocked IPs table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS blocked_ips (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ip_address TEXT UNIQUE NOT NULL,
-                    reason TEXT,
-                    blocked_by TEXT DEFAULT 'admin',
-                    blocked_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Create indices for better query performance
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_src_ip ON alerts(src_ip)
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_timestamp ON alerts(timestamp)
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_severity ON alerts(severity)
-            """)
-            
-            conn.commit()
+        """Create the database, or bring an older schema up to date"""
+        with self._connect() as conn:
+            version = get_schema_version(conn)
+        # Current databases stop here: no DDL runs on every construction
+        if version < SCHEMA_VERSION:
+            self.migrate(version)
 
-    def insert_alert(self, alert: Dict[str, Any]) -> int:
+    def migrate(self, version: int, target: int = SCHEMA_VERSION) -> int:
         """
-        Insert a single alert into the database
+        Apply schema migrations in order
+        
+        Each step runs its DDL, converts existing rows where needed and
+        then records its version, so an interrupted upgrade resumes at the
+        step it was in.
         
         Args:
-            alert: Dictionary containing alert data
+            version: Schema version the database is at
+            target: Version to stop at
             
         Returns:
-            Alert ID
+            Schema version reached
         """
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            enrichment_data = json.dumps(alert.get('enrichment', {}))
-            
-            cursor.execute("""
-                INSERT INTO alerts 
-                (signature, src_ip, dst_ip, src_port, dst_port, protocol, 
-                 severity, message, timestamp, enrichment_data)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
+        for number, description, apply, convert in MIGRATIONS[version:target]:
+            start = time.monotonic()
+            with self._connect() as conn:
+                apply(conn.cursor())
+            if convert:
+                getattr(self, convert)()
+            with self._connect() as conn:
+                conn.execute(f"PRAGMA user_version = {number}")
+            version = number
+            logger.info(f"Applied schema migration {number} ({description}) "
+                        f"in {time.monotonic() - start:.2f}s")
+        return version
+
+    # Formatted with the partition table name
+    INSERT_ALERT_SQL = """
+        INSERT INTO {table} 
+        (id, signature, src_ip, dst_ip, src_port, dst_port, protocol, 
+         severity, message, timestamp, timestamp_us, enrichment_pending,
+         src_enrichment_id, dst_enrichment_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    @staticmethod
+    def _is_pending(enrichment: Optional[Dict[str, Any]]) -> int:
+        """Flag alerts stored without (complete) enrichment for the backfill"""
+        return 1 if not enrichment or enrichment.get('status') == 'pending' else 0
+
+    @staticmethod
+    def _alert_row(alert: Union[Alert, Dict[str, Any]]) -> tuple:
+        """Build the INSERT parameters for an alert, up to the enrichment columns"""
+        if isinstance(alert, Alert):
+            row = (
+                alert.signature,
+                alert.src_ip,
+                alert.dst_ip,
+                alert.src_port,
+                alert.dst_port,
+                alert.protocol,
+                alert.severity,
+                alert.message,
+                alert.timestamp or datetime.now()
+            )
+        else:
+            row = (
                 alert.get('signature', ''),
                 alert.get('src_ip', ''),
                 alert.get('dst_ip', ''),
@@ -111,12 +263,250 @@ class DatabaseManager:
                 alert.get('protocol', ''),
                 alert.get('severity', 'INFO'),
                 alert.get('message', ''),
-                alert.get('timestamp', datetime.now()),
-                enrichment_data
-            ))
+                alert.get('timestamp') or datetime.now()
+            )
+        epoch = to_epoch_us(row[8])
+        # Unreadable timestamps count as received now
+        return row + (epoch if epoch is not None else round(time.time() * 1000000),)
+
+    def _enrichment_ids(self, conn: sqlite3.Connection, records: List[tuple]) -> Dict[str, int]:
+        """
+        Get ip_enrichment ids for (ip, record) pairs, storing new records
+
+        An IP's latest version is reused while its record is unchanged;
+        a changed record is stored as the next version. Records still
+        pending a lookup are not stored.
+
+        Args:
+            conn: Connection whose transaction the inserts join
+            records: (ip, enrichment record) pairs; the first record for
+                an IP wins
+
+        Returns:
+            Dictionary mapping each stored IP to its record id
+        """
+        ids = {}
+        with self._enrichment_lock:
+            index = self._enrichment_index
+            for ip, record in records:
+                if ip in ids or not record or record.get('pending'):
+                    continue
+
+                # Cached records are shared objects, so identity usually answers
+                known = index.get(ip)
+                if known is not None and known[0] is record:
+                    ids[ip] = known[2]
+                    continue
+                data = json.dumps(record, sort_keys=True)
+                if known is not None and known[1] == data:
+                    ids[ip] = known[2]
+                    index[ip] = (record, data, known[2])
+                    continue
+
+                row = conn.execute("""
+                    SELECT id, version, data FROM ip_enrichment
+                    WHERE ip = ? ORDER BY version DESC LIMIT 1
+                """, (ip,)).fetchone()
+                if row is not None and row[2] == data:
+                    record_id = row[0]
+                else:
+                    try:
+                        record_id = conn.execute("""
+                            INSERT INTO ip_enrichment (ip, version, data, created_at)
+                            VALUES (?, ?, ?, ?)
+                        """, (ip, row[1] + 1 if row else 1, data, time.time())).lastrowid
+                    except sqlite3.IntegrityError:
+                        # Another process stored a version first; use it
+                        record_id = conn.execute("""
+                            SELECT id FROM ip_enrichment WHERE ip = ? ORDER BY version DESC LIMIT 1
+                        """, (ip,)).fetchone()[0]
+
+                if len(index) >= self.ENRICHMENT_INDEX_SIZE:
+                    index.clear()
+                index[ip] = (record, data, record_id)
+                ids[ip] = record_id
+        return ids
+
+    def _insert_alerts(self, conn: sqlite3.Connection,
+                       alerts: List[Union[Alert, Dict[str, Any]]]) -> List[int]:
+        """Insert alerts and their enrichment records on an open connection, returning their ids"""
+        rows = []
+        records = []
+        for alert in alerts:
+            row = self._alert_row(alert)
+            enrichment = alert.get('enrichment') or {}
+            rows.append((row, enrichment))
+            records.append((row[1], enrichment.get('source')))
+            records.append((row[2], enrichment.get('destination')))
+
+        ids = self._enrichment_ids(conn, records)
+        # Reserve a block of ids; the write lock taken here is held until commit
+        conn.execute("UPDATE alert_sequence SET next_id = next_id + ?", (len(rows),))
+        first_id = conn.execute("SELECT next_id FROM alert_sequence").fetchone()[0] - len(rows)
+
+        by_table = {}
+        tables = self.partitions.assign(conn, [row[9] for row, _ in rows])
+        for alert_id, (row, enrichment), table in zip(range(first_id, first_id + len(rows)),
+                                                      rows, tables):
+            by_table.setdefault(table, []).append(
+                (alert_id,) + row + (self._is_pending(enrichment), ids.get(row[1]), ids.get(row[2])))
+        for table, params in by_table.items():
+            conn.executemany(self.INSERT_ALERT_SQL.format(table=table), params)
+            conn.execute("""
+                UPDATE alert_partitions
+                SET min_id = MIN(COALESCE(min_id, ?), ?), max_id = MAX(COALESCE(max_id, ?), ?),
+                    alert_count = alert_count + ?
+                WHERE name = ?
+            """, (params[0][0], params[0][0], params[-1][0], params[-1][0], len(params), table))
+        return list(range(first_id, first_id + len(rows)))
+
+    def _store_alerts(self, alerts: List[Union[Alert, Dict[str, Any]]]) -> List[int]:
+        """Insert alerts in a single transaction, returning their ids"""
+        try:
+            with self._connect() as conn:
+                return self._insert_alerts(conn, alerts)
+        except sqlite3.OperationalError as e:
+            if 'no such table' not in str(e):
+                raise
+        # Another process dropped a partition this one still had listed
+        self.partitions.forget()
+        with self._connect() as conn:
+            return self._insert_alerts(conn, alerts)
+
+    def insert_alert(self, alert: Union[Alert, Dict[str, Any]]) -> int:
+        """
+        Insert a single alert into the database
+        
+        Args:
+            alert: Alert record or dictionary containing alert data
+            
+        Returns:
+            Alert ID
+        """
+        return self._store_alerts([alert])[0]
+
+    def insert_alerts(self, alerts: List[Union[Alert, Dict[str, Any]]]) -> int:
+        """
+        Insert many alerts in a single transaction
+        
+        Each distinct IP's enrichment is stored once in ip_enrichment and
+        referenced from its alerts.
+        
+        Args:
+            alerts: List of Alert records or alert dictionaries
+            
+        Returns:
+            Number of alerts inserted
+        """
+        if not alerts:
+            return 0
+
+        return len(self._store_alerts(alerts))
+
+    def get_pending_enrichment(self, after_id: int = 0, limit: int = 1000) -> List[tuple]:
+        """
+        Get alerts waiting for enrichment, in id order
+        
+        Args:
+            after_id: Only return alerts with a larger id (to page through)
+            limit: Maximum alerts to return
             
+        Returns:
+            List of (id, src_ip, dst_ip, severity) tuples
+        """
+        with self._connect() as conn:
+            pending = []
+            for name, _, _, _, max_id in self._partitions(conn):
+                if max_id is None or max_id <= after_id:
+                    continue
+                pending.extend(conn.execute(f"""
+                    SELECT id, src_ip, dst_ip, severity FROM {name}
+                    WHERE enrichment_pending = 1 AND id > ?
+                    ORDER BY id
+                    LIMIT ?
+                """, (after_id, limit)).fetchall())
+            pending.sort()
+            return pending[:limit]
+
+    def count_pending_enrichment(self) -> int:
+        """Count alerts waiting for enrichment"""
+        with self._connect() as conn:
+            return sum(conn.execute(f"SELECT COUNT(*) FROM {name} WHERE enrichment_pending = 1")
+                       .fetchone()[0] for name, *_ in self._partitions(conn))
+
+    def update_enrichment(self, updates: List[tuple]) -> int:
+        """
+        Backfill alert enrichment in a single transaction
+        
+        Args:
+            updates: List of (alert id, src_ip, dst_ip, enrichment dictionary)
+                tuples; an enrichment whose status is 'pending' keeps the
+                alert queued
+            
+        Returns:
+            Number of alerts updated
+        """
+        if not updates:
+            return 0
+
+        with self._connect() as conn:
+            # Write lock first: retention cannot drop a partition under the update
+            conn.execute("BEGIN IMMEDIATE")
+            records = []
+            for _, src_ip, dst_ip, enrichment in updates:
+                records.append((src_ip, enrichment.get('source')))
+                records.append((dst_ip, enrichment.get('destination')))
+            ids = self._enrichment_ids(conn, records)
+
+            params = [(self._is_pending(enrichment), ids.get(src_ip), ids.get(dst_ip), alert_id)
+                      for alert_id, src_ip, dst_ip, enrichment in updates]
+            # Each partition's id range is known: only update those that may hold the ids
+            for name, _, _, min_id, max_id in self.partitions.overlapping(conn):
+                chunk = [p for p in params if min_id is not None and min_id <= p[3] <= max_id]
+                if chunk:
+                    conn.executemany(f"""
+                        UPDATE {name} SET enrichment_pending = ?, src_enrichment_id = ?,
+                            dst_enrichment_id = ?
+                        WHERE id = ?
+                    """, chunk)
             conn.commit()
-            return cursor.lastrowid
+            return len(updates)
+
+    def _attach_enrichment(self, conn: sqlite3.Connection, alerts: List[Dict[str, Any]]):
+        """
+        Set each alert row's 'enrichment' from its ip_enrichment references
+
+        Each distinct record is fetched and parsed once for the whole list,
+        and alerts referencing it share the parsed dictionary (do not modify).
+        """
+        ids = set()
+        for alert in alerts:
+            ids.add(alert.get('src_enrichment_id'))
+            ids.add(alert.get('dst_enrichment_id'))
+        ids.discard(None)
+
+        records = {}
+        ids = list(ids)
+        for i in range(0, len(ids), MAX_QUERY_PARAMS):
+            chunk = ids[i:i + MAX_QUERY_PARAMS]
+            for record_id, data, created_at in conn.execute(
+                    f"SELECT id, data, created_at FROM ip_enrichment "
+                    f"WHERE id IN ({','.join('?' * len(chunk))})", chunk):
+                records[record_id] = (json.loads(data), created_at)
+
+        for alert in alerts:
+            source = records.get(alert.get('src_enrichment_id'))
+            destination = records.get(alert.get('dst_enrichment_id'))
+            if source or destination:
+                alert['enrichment'] = {
+                    'source': source[0] if source else {},
+                    'destination': destination[0] if destination else {},
+                    'status': 'pending' if alert.get('enrichment_pending') else 'complete',
+                    'enriched_at': datetime.fromtimestamp(
+                        max(r[1] for r in (source, destination) if r)).isoformat()
+                }
+            else:
+                alert['enrichment'] = {}
 
     def get_recent_alerts(self, limit: int = 50) -> List[Dict[str, Any]]:
         """
@@ -128,31 +518,352 @@ class DatabaseManager:
         Returns:
             List of alert dictionaries
         """
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self._connect() as conn:
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             
-            cursor.execute("""
-                SELECT * FROM alerts 
-                ORDER BY timestamp DESC 
-                LIMIT ?
-            """, (limit,))
-            
-            rows = cursor.fetchall()
+            # Newest partition first, until enough alerts were read
             alerts = []
+            for name, *_ in self._partitions(conn):
+                if len(alerts) >= limit:
+                    break
+                cursor.execute(f"""
+                    SELECT * FROM {name} 
+                    ORDER BY timestamp_us DESC 
+                    LIMIT ?
+                """, (limit - len(alerts),))
+                alerts.extend(dict(row) for row in cursor.fetchall())
             
-            for row in rows:
-                alert_dict = dict(row)
-                # Parse enrichment data
-                if alert_dict['enrichment_data']:
-                    alert_dict['enrichment'] = json.loads(alert_dict['enrichment_data'])
-                else:
-                    alert_dict['enrichment'] = {}
-                
-                alerts.append(alert_dict)
-            
+            self._attach_enrichment(conn, alerts)
             return alerts
 
+    def migrate_enrichment(self, batch_size: int = 5000, vacuum: bool = True) -> int:
+        """
+        Move per-row enrichment JSON into ip_enrichment references
+        
+        Runs as part of schema migration 4; safe to re-run, and rows not
+        yet moved still read correctly.
+        
+        Args:
+            batch_size: Alerts converted per transaction
+            vacuum: Reclaim the freed space afterwards
+            
+        Returns:
+            Number of alerts converted
+        """
+        converted = 0
+        last_id = 0
+        start = time.monotonic()
+        with self._connect() as conn:
+            while True:
+                rows = conn.execute("""
+                    SELECT id, src_ip, dst_ip, enrichment_data FROM alerts
+                    WHERE id > ? AND enrichment_data IS NOT NULL
+                    ORDER BY id
+                    LIMIT ?
+                """, (last_id, batch_size)).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                updates = []
+                for alert_id, src_ip, dst_ip, data in rows:
+                    try:
+                        enrichment = json.loads(data) or {}
+                    except ValueError:
+                        enrichment = {}
+                    updates.append((alert_id, src_ip, dst_ip, enrichment))
+
+                records = []
+                for _, src_ip, dst_ip, enrichment in updates:
+                    records.append((src_ip, enrichment.get('source')))
+                    records.append((dst_ip, enrichment.get('destination')))
+                ids = self._enrichment_ids(conn, records)
+
+                conn.executemany("""
+                    UPDATE alerts SET src_enrichment_id = ?, dst_enrichment_id = ?,
+                        enrichment_data = NULL
+                    WHERE id = ?
+                """, [(ids.get(src_ip), ids.get(dst_ip), alert_id)
+                      for alert_id, src_ip, dst_ip, _ in updates])
+                conn.commit()
+                converted += len(rows)
+
+        if converted:
+            if vacuum:
+                self.vacuum()
+            logger.info(f"Moved enrichment of {converted:,} alerts into ip_enrichment "
+                        f"in {time.monotonic() - start:.1f}s")
+        return converted
+
+    def migrate_timestamps(self, batch_size: int = 5000) -> int:
+        """
+        Fill timestamp_us for alerts stored without it
+        
+        Runs as part of schema migration 6; safe to re-run. Timestamps
+        that cannot be read fall back to the row's created_at (UTC), or
+        the time of the migration, so retention does not drop them as
+        the oldest alerts stored.
+        
+        Args:
+            batch_size: Alerts converted per transaction
+            
+        Returns:
+            Number of alerts converted
+        """
+        converted = 0
+        last_id = 0
+        start = time.monotonic()
+        migrated_at = to_epoch_us(datetime.now())
+        with self._connect() as conn:
+            while True:
+                rows = conn.execute("""
+                    SELECT id, timestamp, created_at FROM alerts
+                    WHERE id > ? AND timestamp_us IS NULL
+                    ORDER BY id
+                    LIMIT ?
+                """, (last_id, batch_size)).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                updates = []
+                for alert_id, timestamp, created_at in rows:
+                    epoch = to_epoch_us(timestamp)
+                    if epoch is None and isinstance(created_at, str):
+                        try:
+                            epoch = to_epoch_us(datetime.fromisoformat(created_at)
+                                                .replace(tzinfo=timezone.utc))
+                        except ValueError:
+                            pass
+                    updates.append((epoch if epoch is not None else migrated_at, alert_id))
+
+                conn.executemany("UPDATE alerts SET timestamp_us = ? WHERE id = ?", updates)
+                conn.commit()
+                converted += len(rows)
+
+        if converted:
+            logger.info(f"Filled timestamp_us for {converted:,} alerts "
+                        f"in {time.monotonic() - start:.1f}s")
+        return converted
+
+    def migrate_yearless_timestamps(self, batch_size: int = 5000) -> int:
+        """
+        Date alerts stored with Snort's year-less timestamps as year 1900
+        
+        Each gets the year it was stored in (created_at), or the year
+        before where that would put it ahead of created_at (see
+        assume_year). Runs as part of schema migration 8, before the
+        alerts are partitioned; safe to re-run.
+        
+        Args:
+            batch_size: Alerts converted per transaction
+            
+        Returns:
+            Number of alerts converted
+        """
+        converted = 0
+        last = (-2 ** 63, 0)
+        cutoff = to_epoch_us(datetime(1901, 1, 1))
+        start = time.monotonic()
+        with self._connect() as conn:
+            while True:
+                # Walks idx_timestamp_us: converted rows leave the range
+                rows = conn.execute("""
+                    SELECT id, timestamp, created_at, timestamp_us FROM alerts
+                    WHERE (timestamp_us, id) > (?, ?) AND timestamp_us < ?
+                    ORDER BY timestamp_us, id
+                    LIMIT ?
+                """, last + (cutoff, batch_size)).fetchall()
+                if not rows:
+                    break
+                last = (rows[-1][3], rows[-1][0])
+
+                updates = []
+                for alert_id, timestamp, created_at, _ in rows:
+                    try:
+                        stored = datetime.fromisoformat(created_at).replace(
+                            tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+                        dated = assume_year(datetime.fromisoformat(str(timestamp)), stored)
+                    except (TypeError, ValueError):
+                        continue
+                    updates.append((str(dated), to_epoch_us(dated), alert_id))
+
+                conn.executemany("UPDATE alerts SET timestamp = ?, timestamp_us = ? WHERE id = ?",
+                                 updates)
+                conn.commit()
+                converted += len(updates)
+
+        if converted:
+            logger.info(f"Dated {converted:,} year-less alert timestamps "
+                        f"in {time.monotonic() - start:.1f}s")
+        return converted
+
+    def migrate_partitions(self, vacuum: bool = True) -> int:
+        """
+        Move alerts from the single alerts table into time partitions
+        
+        Runs as part of schema migration 8; safe to re-run. Each partition
+        is filled, indexed and listed in one transaction, so an interrupted
+        run skips the partitions it finished. Alert ids are kept. The
+        alerts table is dropped at the end.
+        
+        Args:
+            vacuum: Reclaim the freed space afterwards
+            
+        Returns:
+            Number of alerts moved
+        """
+        with self._connect() as conn:
+            tables = {row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if 'alerts' not in tables:
+            return 0
+        # Rows written by a process still running the old schema
+        self.migrate_timestamps()
+        # Dated 1900, they would land in a partition retention drops at once
+        self.migrate_yearless_timestamps()
+
+        moved = 0
+        start = time.monotonic()
+        columns = ', '.join(ALERT_COLUMNS)
+        with self._connect() as conn:
+            self.partitions.load(conn)
+            # New ids continue after the largest ever handed out
+            last_id = conn.execute("SELECT MAX(id) FROM alerts").fetchone()[0] or 0
+            if 'sqlite_sequence' in tables:
+                row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'alerts'").fetchone()
+                last_id = max(last_id, row[0] if row else 0)
+            conn.execute("UPDATE alert_sequence SET next_id = MAX(next_id, ?)", (last_id + 1,))
+            conn.commit()
+
+            done = {row[0] for row in conn.execute("SELECT name FROM alert_partitions")}
+            since = conn.execute("SELECT MIN(timestamp_us) FROM alerts").fetchone()[0]
+            while since is not None:
+                key = self.partitions.key(since)
+                name = self.partitions.name(key)
+                start_us, end_us = self.partitions.bounds(key)
+                if name not in done:
+                    conn.execute("BEGIN")
+                    # Indexes are built after the copy: one sorted pass each
+                    create_alert_partition(conn.cursor(), name, indexes=False)
+                    moved += conn.execute(f"""
+                        INSERT INTO {name} (id, {columns})
+                        SELECT id, {columns} FROM alerts
+                        WHERE timestamp_us >= ? AND timestamp_us < ?
+                        ORDER BY id
+                    """, (start_us, end_us)).rowcount
+                    create_alert_partition_indexes(conn.cursor(), name)
+                    conn.execute(f"""
+                        INSERT INTO alert_partitions (name, start_us, end_us, min_id, max_id)
+                        SELECT ?, ?, ?, MIN(id), MAX(id) FROM {name}
+                    """, (name, start_us, end_us))
+                    conn.commit()
+                since = conn.execute("SELECT MIN(timestamp_us) FROM alerts WHERE timestamp_us >= ?",
+                                     (end_us,)).fetchone()[0]
+
+            conn.execute("DROP TABLE alerts")
+            conn.commit()
+
+        if moved:
+            if vacuum:
+                self.vacuum()
+            logger.info(f"Moved {moved:,} alerts into time partitions "
+                        f"in {time.monotonic() - start:.1f}s")
+        return moved
+
+    def migrate_partition_counts(self) -> int:
+        """
+        Count the alerts of each partition into alert_partitions
+
+        Runs as part of schema migration 9; safe to re-run. Writers keep
+        the counts up to date from then on.
+
+        Returns:
+            Number of alerts counted
+        """
+        total = 0
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for name, *_ in self.partitions.overlapping(conn):
+                count = conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+                conn.execute("UPDATE alert_partitions SET alert_count = ? WHERE name = ?",
+                             (count, name))
+                total += count
+        return total
+
+    def vacuum(self):
+        """Rebuild the database file to release free pages"""
+        conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT)
+        try:
+            conn.execute("VACUUM")
+            # The rebuilt pages go through the WAL: copy them back and truncate it
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _cutoff_us(seconds: float) -> int:
+        """Epoch microseconds the given number of seconds ago"""
+        return round((time.time() - seconds) * 1000000)
+
+    def _partitions(self, conn: sqlite3.Connection, since_us: Optional[int] = None) -> List[tuple]:
+        """
+        List the partitions a read needs, newest first
+        
+        Starts a read transaction first, so the listed tables stay
+        readable until the block ends even if retention drops them.
+        
+        Args:
+            conn: Connection the read runs on
+            since_us: Only partitions holding alerts after this time
+            
+        Returns:
+            List of (name, start_us, end_us, min_id, max_id) tuples
+        """
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        return self.partitions.overlapping(conn, since_us)
+
+    def _fan_out(self, conn: sqlite3.Connection, sql: str, params: tuple,
+                 since_us: Optional[int] = None, row_factory=None) -> list:
+        """
+        Run a query on each partition overlapping a window
+        
+        Args:
+            conn: Connection to query on
+            sql: Query with a {table} placeholder
+            params: Query parameters
+            since_us: Only query partitions holding alerts after this time
+            row_factory: Row factory for the results
+            
+        Returns:
+            Rows of every partition, newest partition first
+        """
+        cursor = conn.cursor()
+        cursor.row_factory = row_factory
+        rows = []
+        for name, *_ in self._partitions(conn, since_us):
+            rows.extend(cursor.execute(sql.format(table=name), params).fetchall())
+        return rows
+
+    def _count_distinct(self, conn: sqlite3.Connection, column: str, where: str,
+                        params: tuple, since_us: Optional[int] = None) -> int:
+        """Count distinct values of a column across the partitions overlapping a window"""
+        names = [row[0] for row in self._partitions(conn, since_us)]
+        if len(names) <= MAX_COMPOUND_SELECT:
+            if not names:
+                return 0
+            union = ' UNION '.join(f"SELECT DISTINCT {column} FROM {name} WHERE {where}"
+                                   for name in names)
+            return conn.execute(f"SELECT COUNT(*) FROM ({union})", params * len(names)).fetchone()[0]
+
+        values = set()
+        for name in names:
+            values.update(row[0] for row in conn.execute(
+                f"SELECT DISTINCT {column} FROM {name} WHERE {where}", params))
+        return len(values)
+
     def get_alerts_by_ip(self, src_ip: str, minutes: int = 10) -> List[Dict[str, Any]]:
         """
         Get alerts from a specific IP within the last X minutes
@@ -164,45 +875,53 @@ class DatabaseManager:
         Returns:
             List of alert dictionaries
         """
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT * FROM alerts 
+        cutoff = self._cutoff_us(minutes * 60)
+        with self._connect() as conn:
+            rows = self._fan_out(conn, """
+                SELECT * FROM {table} 
                 WHERE src_ip = ? 
-                AND datetime(timestamp) > datetime('now', '-' || ? || ' minutes')
-                ORDER BY timestamp DESC
-            """, (src_ip, minutes))
+                AND timestamp_us > ?
+                ORDER BY timestamp_us DESC
+            """, (src_ip, cutoff), cutoff, sqlite3.Row)
+            return [dict(row) for row in rows]
+
+    def get_alerts_by_signature(self, signature: str, minutes: int = 10) -> List[Dict[str, Any]]:
+        """
+        Get alerts with a signature within the last X minutes
+        
+        Args:
+            signature: Exact alert signature
+            minutes: Time window in minutes
             
-            rows = cursor.fetchall()
+        Returns:
+            List of alert dictionaries, newest first
+        """
+        cutoff = self._cutoff_us(minutes * 60)
+        with self._connect() as conn:
+            rows = self._fan_out(conn, """
+                SELECT * FROM {table} 
+                WHERE signature = ? 
+                AND timestamp_us > ?
+                ORDER BY timestamp_us DESC
+            """, (signature, cutoff), cutoff, sqlite3.Row)
             return [dict(row) for row in rows]
 
     def get_alert_count_by_ip(self, src_ip: str, minutes: int = 10) -> int:
         """Count alerts from an IP in the last X minutes"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT COUNT(*) FROM alerts 
+        cutoff = self._cutoff_us(minutes * 60)
+        with self._connect() as conn:
+            return sum(row[0] for row in self._fan_out(conn, """
+                SELECT COUNT(*) FROM {table} 
                 WHERE src_ip = ? 
-                AND datetime(timestamp) > datetime('now', '-' || ? || ' minutes')
-            """, (src_ip, minutes))
-            
-            return cursor.fetchone()[0]
+                AND timestamp_us > ?
+            """, (src_ip, cutoff), cutoff))
 
     def get_unique_signatures_by_ip(self, src_ip: str, minutes: int = 10) -> int:
         """Count unique signatures from an IP in the last X minutes"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT COUNT(DISTINCT signature) FROM alerts 
-                WHERE src_ip = ? 
-                AND datetime(timestamp) > datetime('now', '-' || ? || ' minutes')
-            """, (src_ip, minutes))
-            
-            return cursor.fetchone()[0]
+        cutoff = self._cutoff_us(minutes * 60)
+        with self._connect() as conn:
+            return self._count_distinct(conn, 'signature', "src_ip = ? AND timestamp_us > ?",
+                                        (src_ip, cutoff), cutoff)
 
     def insert_correlation(self, correlation: Dict[str, Any]) -> int:
         """
@@ -214,7 +933,7 @@ class DatabaseManager:
         Returns:
             Correlation ID
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             details = json.dumps(correlation.get('details', {}))
@@ -239,9 +958,9 @@ class DatabaseManager:
 
     def get_correlations(self, limit: int = 20) -> List[Dict[str, Any]]:
         """Get recent correlation detections"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self._connect() as conn:
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             
             cursor.execute("""
                 SELECT * FROM correlations 
@@ -253,15 +972,20 @@ class DatabaseManager:
             return [dict(row) for row in rows]
 
     def get_alert_stats(self) -> Dict[str, Any]:
-        """Get database statistics"""
-        with sqlite3.connect(self.db_path) as conn:
+        """
+        Get database statistics
+
+        The alert total is summed from the per-partition counts the writers
+        keep; the distinct source IP count may be up to UNIQUE_IPS_TTL
+        seconds old.
+        """
+        with self._connect() as conn:
             cursor = conn.cursor()
             
-            cursor.execute("SELECT COUNT(*) FROM alerts")
+            cursor.execute("SELECT COALESCE(SUM(alert_count), 0) FROM alert_partitions")
             total_alerts = cursor.fetchone()[0]
             
-            cursor.execute("SELECT COUNT(DISTINCT src_ip) FROM alerts")
-            unique_ips = cursor.fetchone()[0]
+            unique_ips = self._count_unique_ips(conn)
             
             cursor.execute("SELECT COUNT(*) FROM correlations")
             correlations = cursor.fetchone()[0]
@@ -272,17 +996,138 @@ class DatabaseManager:
                 'correlations_detected': correlations
             }
 
+    def _count_unique_ips(self, conn: sqlite3.Connection) -> int:
+        """Count distinct source IPs, reading the partitions at most every UNIQUE_IPS_TTL seconds"""
+        with self._unique_ips_lock:
+            now = time.monotonic()
+            if self._unique_ips is None or now - self._unique_ips[0] >= self.UNIQUE_IPS_TTL:
+                self._unique_ips = (now, self._count_distinct(conn, 'src_ip', '1', ()))
+            return self._unique_ips[1]
+
     def clear_old_alerts(self, days: int = 7):
-        """Delete alerts older than X days"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        """
+        Delete alerts older than X days
+
+        Expired partitions are dropped whole; only the partition the cutoff
+        falls in has rows deleted. Use apply_retention() to drop whole
+        partitions only.
+        """
+        cutoff = self._cutoff_us(days * 86400)
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self.partitions.drop(conn, self.partitions.expired(conn, cutoff))
+            for name, start_us, *_ in self.partitions.overlapping(conn):
+                if start_us < cutoff:
+                    deleted = conn.execute(f"""
+                        DELETE FROM {name} 
+                        WHERE timestamp_us < ?
+                    """, (cutoff,)).rowcount
+                    conn.execute("UPDATE alert_partitions SET alert_count = alert_count - ? "
+                                 "WHERE name = ?", (deleted, name))
             
-            cursor.execute("""
-                DELETE FROM alerts 
-                WHERE datetime(timestamp) < datetime('now', '-' || ? || ' days')
-            """, (days,))
+            conn.commit()
+
+    def apply_retention(self, days: int) -> int:
+        """
+        Drop the alert partitions older than the retention period
+        
+        A partition is dropped once all of its period is older than the
+        cutoff, so alerts are kept for up to one partition period longer
+        than the given days. Dropping a table frees its pages without the
+        per-row index and journal work of a DELETE.
+        
+        Args:
+            days: Days of alerts to keep
             
+        Returns:
+            Number of partitions dropped
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            expired = self.partitions.expired(conn, self._cutoff_us(days * 86400))
+            self.partitions.drop(conn, expired)
+            conn.commit()
+
+        if expired:
+            logger.info(f"Dropped {len(expired)} expired alert partitions "
+                        f"({expired[0]} to {expired[-1]})")
+        return len(expired)
+
+    def get_partitions(self) -> List[Dict[str, Any]]:
+        """
+        Get the alert partitions, newest first
+        
+        Returns:
+            List of dictionaries with the table name, its start_us/end_us
+            epoch-microsecond range and min_id/max_id alert id range
+        """
+        with self._connect() as conn:
+            return [dict(zip(('name', 'start_us', 'end_us', 'min_id', 'max_id'), row))
+                    for row in self.partitions.overlapping(conn)]
+
+    def get_cached_enrichment(self, ip: str) -> Optional[tuple]:
+        """
+        Get a persisted enrichment entry
+        
+        Args:
+            ip: IP address
+            
+        Returns:
+            (enrichment data, expires_at epoch seconds), or None if absent or expired
+        """
+        with self._connect() as conn:
+            row = conn.execute("""
+                SELECT data, expires_at FROM enrichment_cache
+                WHERE ip = ? AND expires_at > ?
+            """, (ip, time.time())).fetchone()
+            return (json.loads(row[0]), row[1]) if row else None
+
+    def load_enrichment_cache(self, limit: Optional[int] = None) -> List[tuple]:
+        """
+        Get unexpired persisted enrichment entries, longest-lived first
+        
+        Args:
+            limit: Maximum entries to return
+            
+        Returns:
+            List of (ip, enrichment data, expires_at) tuples
+        """
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT ip, data, expires_at FROM enrichment_cache
+                WHERE expires_at > ?
+                ORDER BY expires_at DESC
+                LIMIT ?
+            """, (time.time(), -1 if limit is None else limit)).fetchall()
+            return [(ip, json.loads(data), expires_at) for ip, data, expires_at in rows]
+
+    def save_enrichment_cache(self, entries: List[tuple]) -> int:
+        """
+        Persist enrichment entries in a single transaction
+        
+        Args:
+            entries: List of (ip, enrichment data, expires_at) tuples
+            
+        Returns:
+            Number of entries written
+        """
+        if not entries:
+            return 0
+
+        with self._connect() as conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO enrichment_cache (ip, data, expires_at)
+                VALUES (?, ?, ?)
+            """, [(ip, json.dumps(data), expires_at) for ip, data, expires_at in entries])
+            conn.commit()
+            return len(entries)
+
+    def purge_enrichment_cache(self) -> int:
+        """Delete expired enrichment entries, returning how many were removed"""
+        with self._connect() as conn:
+            cursor = conn.execute("DELETE FROM enrichment_cache WHERE expires_at <= ?", (time.time(),))
             conn.commit()
+            return cursor.rowcount
 
     def block_ip(self, ip_address: str, reason: str = 'Manual block by admin') -> bool:
         """
@@ -296,7 +1141,7 @@ class DatabaseManager:
             True if successful, False if already blocked
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
@@ -320,7 +1165,7 @@ class DatabaseManager:
         Returns:
             True if successful
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -340,7 +1185,7 @@ class DatabaseManager:
         Returns:
             True if blocked, False otherwise
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -351,9 +1196,9 @@ class DatabaseManager:
 
     def get_blocked_ips(self) -> List[Dict[str, Any]]:
         """Get list of all blocked IPs"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self._connect() as conn:
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             
             cursor.execute("""
                 SELECT ip_address, reason, blocked_at FROM blocked_ips
@@ -0,0 +1,131 @@
+"""
+Deferred enrichment module for Mini SIEM
+Backfills enrichment for alerts that were stored before it was available
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+from core.ratelimit import PRIORITY_LOW
+
+logger = logging.getLogger(__name__)
+
+
+class DeferredEnricher:
+    """
+    Background worker that enriches alerts already in the database
+
+    Alerts stored without enrichment (deferred mode) or with lookups that
+    were still pending (provider down, rate limited) carry the
+    enrichment_pending flag. Each pass reads a batch of them, resolves the
+    distinct IPs of the batch once - most urgent alerts first, uncached IPs
+    concurrently - and writes the results back with one bulk UPDATE.
+    Alerts whose lookups are still pending keep the flag and are retried
+    on a later pass.
+    """
+
+    def __init__(self, ip_enricher, db_manager, batch_size: int = 1000, interval: float = 1.0):
+        """
+        Initialize deferred enricher
+
+        Args:
+            ip_enricher: IPEnricher used for the lookups
+            db_manager: DatabaseManager holding the alerts
+            batch_size: Alerts read and updated per pass
+            interval: Seconds to sleep when a pass finds nothing to do
+        """
+        self.ip_enricher = ip_enricher
+        self.db = db_manager
+        self.batch_size = batch_size
+        self.interval = interval
+
+        self._cursor = 0
+        self._stop_event = threading.Event()
+        self.thread = None
+        self.stats = {'passes': 0, 'alerts_scanned': 0, 'alerts_enriched': 0,
+                      'ips_resolved': 0, 'last_pass_seconds': 0.0}
+
+    def start(self):
+        """Start the background thread"""
+        if self.thread is not None:
+            return
+        self._stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name='deferred-enrich', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: Optional[float] = 10):
+        """Stop the background thread after the current pass"""
+        self._stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+
+    def _run(self):
+        """Thread target: run passes until stopped"""
+        while not self._stop_event.is_set():
+            try:
+                result = self.run_once()
+            except Exception as e:
+                logger.error(f"Deferred enrichment pass failed: {str(e)}")
+                result = {'scanned': 0, 'enriched': 0}
+
+            # A full, productive batch means more are waiting: go again at once
+            if result['scanned'] < self.batch_size or not result['enriched']:
+                self._stop_event.wait(self.interval)
+
+    def run_once(self) -> Dict[str, Any]:
+        """
+        Enrich one batch of pending alerts
+
+        Returns:
+            Dictionary with alerts scanned and enriched in this pass
+        """
+        start = time.monotonic()
+        rows = self.db.get_pending_enrichment(after_id=self._cursor, limit=self.batch_size)
+        # Page through the backlog; start over once the end is reached
+        self._cursor = rows[-1][0] if len(rows) == self.batch_size else 0
+        if not rows:
+            return {'scanned': 0, 'enriched': 0}
+
+        # Each IP is looked up once, at the priority of its most urgent alert
+        priorities: Dict[str, int] = {}
+        for _, src_ip, dst_ip, severity in rows:
+            priority = self.ip_enricher.alert_priority({'severity': severity})
+            for ip in (src_ip, dst_ip):
+                priorities[ip] = min(priority, priorities.get(ip, PRIORITY_LOW))
+
+        resolved: Dict[str, Dict[str, Any]] = {}
+        for priority in sorted(set(priorities.values())):
+            ips = [ip for ip, p in priorities.items() if p == priority]
+            resolved.update(self.ip_enricher.enrich_ips(ips, priority))
+
+        updates = []
+        for alert_id, src_ip, dst_ip, _ in rows:
+            enrichment = self.ip_enricher._build_enrichment(resolved[src_ip], resolved[dst_ip])
+            # Still pending: leave the row alone rather than rewrite it
+            if enrichment['status'] != 'pending':
+                updates.append((alert_id, src_ip, dst_ip, enrichment))
+        self.db.update_enrichment(updates)
+
+        elapsed = time.monotonic() - start
+        self.stats['passes'] += 1
+        self.stats['alerts_scanned'] += len(rows)
+        self.stats['alerts_enriched'] += len(updates)
+        self.stats['ips_resolved'] += len(resolved)
+        self.stats['last_pass_seconds'] = elapsed
+        if updates:
+            logger.info(f"Backfilled enrichment for {len(updates)} of {len(rows)} alerts "
+                        f"({len(resolved)} IPs) in {elapsed:.2f}s")
+        return {'scanned': len(rows), 'enriched': len(updates)}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get backfill counters and the number of alerts still pending"""
+        stats = dict(self.stats)
+        try:
+            stats['backlog'] = self.db.count_pending_enrichment()
+        except Exception as e:
+            logger.warning(f"Could not count pending enrichment: {str(e)}")
+            stats['backlog'] = None
+        return stats
@@ -3,185 +3,350 @@ IP Enrichment module for Mini SIEM
 Adds geolocation, ASN, and organization information to alerts
 """
 
-import json
+import asyncio
 import logging
-from typing import Dict, Any, Optional
-from functools import lru_cache
-import requests
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Union, Iterable
 from datetime import datetime, timedelta
 
+from core.alert import Alert
+from core.cache import EnrichmentCache, PersistentEnrichmentCache
+from core.breaker import CircuitBreaker
+from core.ratelimit import PriorityRateLimiter, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from core.geoip import GeoIPDatabase
+from core.networks import NetworkClassifier
+from core.providers import EnrichmentProvider, IPAPIProvider, IPWhoisProvider, create_provider
+
 logger = logging.getLogger(__name__)
 
-# Cache to store enrichment data for 24 hours
-enrichment_cache = {}
+# Default lifetime of cached enrichment data
 CACHE_DURATION = timedelta(hours=24)
 
 
 class IPEnricher:
-    """Enriches IP addresses with geolocation and network information"""
+    """
+    Enriches IP addresses with geolocation and network information
+
+    Failed lookups never block later alerts: the failing IP is remembered
+    for negative_ttl seconds and answered from memory, and a circuit
+    breaker stops calling the backend altogether after repeated failures.
+    Either way the IP gets a default record marked pending.
+
+    With a rate limiter, backend calls wait for a token in priority order:
+    IPs of HIGH/CRITICAL alerts and of active correlations first. Lookups
+    the limiter defers or drops are also returned as pending.
+
+    Addresses in HOME_NET or a special-use range are never looked up; they
+    get the internal record of their range straight from the classifier.
+
+    Lookups go to a pluggable EnrichmentProvider; with a batch-capable
+    provider, enrich_ips() resolves uncached IPs batch_size per request.
+    """
 
-    def __init__(self, use_free_api: bool = True):
+    # Lookup priority by alert severity (unlisted severities are LOW)
+    SEVERITY_PRIORITIES = {'CRITICAL': PRIORITY_HIGH, 'HIGH': PRIORITY_HIGH,
+                           'MEDIUM': PRIORITY_NORMAL}
+
+    def __init__(self, use_free_api: bool = True, cache: Optional[EnrichmentCache] = None,
+                 geoip: Optional[GeoIPDatabase] = None, lookup_workers: int = 8,
+                 negative_ttl: float = 60, breaker: Optional[CircuitBreaker] = None,
+                 rate_limiter: Optional[PriorityRateLimiter] = None,
+                 networks: Optional[NetworkClassifier] = None,
+                 provider: Optional[EnrichmentProvider] = None):
         """
         Initialize IP enricher
         
         Args:
-            use_free_api: Use free IP-API.com service (set to False for MaxMind)
+            use_free_api: Use the free IP-API.com service rather than ipwhois
+                when no provider is given
+            cache: Enrichment cache to use (default: a private cache holding
+                100,000 IPs for CACHE_DURATION)
+            geoip: Offline range database; when given, lookups never use
+                the network or the cache
+            lookup_workers: Threads resolving distinct IPs concurrently
+                (see enrich_ips)
+            negative_ttl: Seconds a failed IP is answered as pending
+                without retrying
+            breaker: Circuit breaker guarding the backend (default: opens
+                after 5 consecutive failures for 30 seconds)
+            rate_limiter: Limiter every backend call must pass (default:
+                none, calls are made as fast as they come)
+            networks: Classifier for internal addresses (default: RFC 1918
+                and fc00::/7 as HOME_NET, plus the special-use ranges)
+            provider: Backend for lookups (default: IP-API.com or ipwhois,
+                see use_free_api)
         """
-        self.use_free_api = use_free_api
-        self.session = requests.Session()
-        self.session.timeout = 5
+        self.geoip = geoip
+        if provider is None:
+            provider = IPAPIProvider() if use_free_api else IPWhoisProvider()
+        self.provider = provider
+        self.cache = cache if cache is not None else \
+            EnrichmentCache(ttl=CACHE_DURATION.total_seconds())
+
+        # Single flight: one backend lookup per IP, shared by concurrent callers
+        self.lookup_workers = lookup_workers
+        self._executor = None
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self.stats = {'coalesced': 0}
+
+        self.breaker = breaker if breaker is not None else CircuitBreaker('IP enrichment')
+        self.failures = EnrichmentCache(max_size=10000, ttl=negative_ttl)
+
+        self.rate_limiter = rate_limiter
+        self.priority_ips = frozenset()
+
+        self.networks = networks if networks is not None else NetworkClassifier()
 
     def _is_cached(self, ip: str) -> bool:
         """Check if IP enrichment is in cache and still valid"""
-        if ip in enrichment_cache:
-            cached_time = enrichment_cache[ip].get('cached_at')
-            if cached_time and datetime.now() - cached_time < CACHE_DURATION:
-                return True
-            else:
-                del enrichment_cache[ip]
-        return False
+        return ip in self.cache
 
     def _get_from_cache(self, ip: str) -> Optional[Dict[str, Any]]:
-        """Get cached enrichment data"""
-        if self._is_cached(ip):
-            cached_data = enrichment_cache[ip].copy()
-            cached_data.pop('cached_at', None)
-            return cached_data
-        return None
+        """Get cached enrichment data (shared, not copied: do not modify)"""
+        return self.cache.get(ip)
 
     def _cache_enrichment(self, ip: str, data: Dict[str, Any]):
         """Cache enrichment data"""
-        data['cached_at'] = datetime.now()
-        enrichment_cache[ip] = data
+        self.cache.set(ip, data)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get enrichment cache statistics"""
+        return self.cache.get_stats()
 
-    def enrich_ip_free_api(self, ip: str) -> Dict[str, Any]:
+    def get_lookup_stats(self) -> Dict[str, Any]:
+        """Get lookup concurrency statistics"""
+        with self._inflight_lock:
+            stats = {
+                'coalesced': self.stats['coalesced'],
+                'in_flight': len(self._inflight),
+                'lookup_workers': self.lookup_workers
+            }
+        stats['provider'] = self.provider.name
+        stats['batch_size'] = self.provider.batch_size
+        stats['negative_cached'] = len(self.failures)
+        stats['negative_hits'] = self.failures.get_stats()['hits']
+        stats['breaker'] = self.breaker.get_stats()
+        if self.rate_limiter is not None:
+            stats['rate_limiter'] = self.rate_limiter.get_stats()
+        return stats
+
+    def set_priority_ips(self, ips: Iterable[str]):
         """
-        Enrich IP using free IP-API.com service
-        
+        Set the IPs involved in active correlations
+
+        Lookups of these IPs are made at high priority whatever the alert.
+
         Args:
-            ip: IP address to enrich
-            
-        Returns:
-            Dictionary with enrichment data
+            ips: IP addresses (replaces the previous set)
         """
-        # Check cache first
-        cached = self._get_from_cache(ip)
-        if cached:
-            return cached
+        self.priority_ips = frozenset(ips)
 
-        try:
-            url = f"http://ip-api.com/json/{ip}"
-            response = self.session.get(url, timeout=5)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            enrichment = {
-                'country': data.get('country', 'Unknown'),
-                'country_code': data.get('countryCode', 'XX'),
-                'city': data.get('city', 'Unknown'),
-                'region': data.get('region', 'Unknown'),
-                'latitude': data.get('lat', None),
-                'longitude': data.get('lon', None),
-                'org': data.get('org', 'Unknown'),
-                'asn': data.get('as', 'Unknown'),
-                'isp': data.get('isp', 'Unknown'),
-                'timezone': data.get('timezone', 'Unknown'),
-                'is_vpn': data.get('proxy', False)
-            }
-            
-            self._cache_enrichment(ip, enrichment)
-            return enrichment
-            
-        except Exception as e:
-            logger.warning(f"Failed to enrich IP {ip} from free API: {str(e)}")
-            return self._get_default_enrichment()
+    def alert_priority(self, alert: Union[Alert, Dict[str, Any]]) -> int:
+        """Get the lookup priority for an alert's IPs from its severity"""
+        return self.SEVERITY_PRIORITIES.get(str(alert.get('severity', '')).upper(), PRIORITY_LOW)
+
+    def _admit(self, priority: int) -> bool:
+        """Check the breaker, then wait for a rate-limit token before a backend call"""
+        if not self.breaker.allow():
+            return False
+        if self.rate_limiter is not None and not self.rate_limiter.acquire(priority):
+            # Not calling after all: a half-open breaker may trial the next caller
+            self.breaker.release()
+            return False
+        return True
 
-    def enrich_ip_ipwhois(self, ip: str) -> Dict[str, Any]:
+    def _record_failure(self, ip: str):
+        """Count a backend failure and stop retrying the IP for a while"""
+        self.breaker.record_failure()
+        self.failures.set(ip, True)
+
+    def _fetch(self, ips: List[str], priority: int = PRIORITY_NORMAL) -> Dict[str, Dict[str, Any]]:
         """
-        Enrich IP using ipwhois library
-        
+        Resolve IPs with one provider request
+
         Args:
-            ip: IP address to enrich
-            
+            ips: Public IP addresses, at most provider.batch_size
+            priority: Rate limiter priority of the request
+
         Returns:
-            Dictionary with enrichment data
+            Dictionary mapping each IP to its enrichment data; IPs the
+            provider failed on or the breaker/limiter held back are pending
         """
-        # Check cache first
-        cached = self._get_from_cache(ip)
-        if cached:
-            return cached
+        results = {}
+        missing = []
+        for ip in ips:
+            cached = self._get_from_cache(ip)
+            if cached:
+                results[ip] = cached
+            else:
+                missing.append(ip)
+        if not missing:
+            return results
+
+        if not self._admit(priority):
+            results.update((ip, self._get_pending_enrichment()) for ip in missing)
+            return results
 
         try:
-            from ipwhois import IPWhois
-            
-            obj = IPWhois(ip)
-            results = obj.lookup(ip_version=4)
-            
-            enrichment = {
-                'country': results.get('country', 'Unknown'),
-                'country_code': results.get('country_code', 'XX'),
-                'city': 'Unknown',
-                'region': results.get('asn_description', 'Unknown'),
-                'latitude': None,
-                'longitude': None,
-                'org': results.get('asn_description', 'Unknown'),
-                'asn': results.get('asn', 'Unknown'),
-                'isp': results.get('nets', [{}])[0].get('description', 'Unknown'),
-                'timezone': 'Unknown',
-                'is_vpn': False
-            }
-            
-            self._cache_enrichment(ip, enrichment)
-            return enrichment
-            
+            found = self.provider.lookup_many(missing)
         except Exception as e:
-            logger.warning(f"Failed to enrich IP {ip} using ipwhois: {str(e)}")
-            return self._get_default_enrichment()
+            target = f"IP {missing[0]}" if len(missing) == 1 else f"{len(missing)} IPs"
+            logger.warning(f"Failed to enrich {target} from {self.provider.name}: {str(e)}")
+            self.breaker.record_failure()
+            for ip in missing:
+                self.failures.set(ip, True)
+                results[ip] = self._get_pending_enrichment()
+            return results
+
+        self.breaker.record_success()
+        for ip in missing:
+            enrichment = found.get(ip)
+            if enrichment is None:
+                # Answered without this IP: retry later, the provider itself is fine
+                self.failures.set(ip, True)
+                results[ip] = self._get_pending_enrichment()
+            else:
+                self._cache_enrichment(ip, enrichment)
+                results[ip] = enrichment
+        return results
 
-    def enrich_ip(self, ip: str) -> Dict[str, Any]:
+    def enrich_ip(self, ip: str, priority: int = PRIORITY_NORMAL) -> Dict[str, Any]:
         """
         Enrich IP address with geolocation and network data
         
         Args:
             ip: IP address to enrich
+            priority: Rate limiter priority (raised to PRIORITY_HIGH for
+                IPs in active correlations)
             
         Returns:
             Dictionary with enrichment data
         """
-        # Skip private IPs
-        if self._is_private_ip(ip):
-            return self._get_private_ip_enrichment()
+        # Internal and special-use addresses have nothing to look up
+        internal = self.networks.internal_record(ip)
+        if internal is not None:
+            return internal
 
-        if self.use_free_api:
-            return self.enrich_ip_free_api(ip)
-        else:
-            return self.enrich_ip_ipwhois(ip)
+        # The offline database is faster than the cache, so it is not cached
+        if self.geoip is not None:
+            return self.geoip.lookup(ip) or self._get_default_enrichment()
 
-    @staticmethod
-    def _is_private_ip(ip: str) -> bool:
-        """Check if IP is private"""
-        try:
-            parts = ip.split('.')
-            if len(parts) != 4:
-                return False
-            
-            octets = [int(p) for p in parts]
-            
-            # RFC 1918 private ranges
-            if octets[0] == 10:
-                return True
-            if octets[0] == 172 and 16 <= octets[1] <= 31:
-                return True
-            if octets[0] == 192 and octets[1] == 168:
-                return True
-            # Loopback
-            if octets[0] == 127:
-                return True
-            
-            return False
-        except:
-            return False
+        # Recently failed: answer at once rather than wait on the backend again
+        if self.failures.get(ip) is not None:
+            return self._get_pending_enrichment()
+
+        if ip in self.priority_ips:
+            priority = PRIORITY_HIGH
+        return self._lookup(ip, priority)
+
+    def _lookup(self, ip: str, priority: int = PRIORITY_NORMAL) -> Dict[str, Any]:
+        """Look one IP up through the provider, sharing any lookup in flight"""
+        return self._lookup_many([ip], priority)[ip]
+
+    def _lookup_many(self, ips: List[str], priority: int = PRIORITY_NORMAL) -> Dict[str, Dict[str, Any]]:
+        """
+        Look IPs up through the provider, one request per IP at a time
+
+        IPs already being looked up by another caller are not requested
+        again: their callers wait for and share the result in flight. The
+        rest go to the provider in a single request.
+        """
+        mine: Dict[str, Future] = {}
+        waiting: Dict[str, Future] = {}
+        with self._inflight_lock:
+            for ip in ips:
+                future = self._inflight.get(ip)
+                if future is None:
+                    mine[ip] = self._inflight[ip] = Future()
+                else:
+                    waiting[ip] = future
+                    self.stats['coalesced'] += 1
+
+        results = {}
+        if mine:
+            try:
+                results = self._fetch(list(mine), priority)
+                for ip, future in mine.items():
+                    future.set_result(results[ip])
+            except BaseException as e:
+                for future in mine.values():
+                    if not future.done():
+                        future.set_exception(e)
+                raise
+            finally:
+                with self._inflight_lock:
+                    for ip in mine:
+                        del self._inflight[ip]
+
+        for ip, future in waiting.items():
+            results[ip] = future.result()
+        return results
+
+    def _lookup_group(self, ips: List[str], priority: int) -> Dict[str, Dict[str, Any]]:
+        """_lookup_many at high priority if any of the IPs is in a correlation"""
+        if not self.priority_ips.isdisjoint(ips):
+            priority = PRIORITY_HIGH
+        return self._lookup_many(ips, priority)
+
+    def _needs_lookup(self, ip: str) -> bool:
+        """Check whether enriching an IP would go to a backend"""
+        return (self.geoip is None and not self.networks.is_internal(ip) and not self._is_cached(ip)
+                and ip not in self.failures)
+
+    def enrich_ips(self, ips: Iterable[str], priority: int = PRIORITY_NORMAL) -> Dict[str, Dict[str, Any]]:
+        """
+        Enrich several IP addresses, resolving uncached ones concurrently
+
+        Uncached IPs are split into provider.batch_size groups (single IPs
+        for providers without batching) spread over the lookup pool, with
+        the calling thread taking one itself, so a slow backend costs one
+        round trip rather than one per IP or batch.
+
+        Args:
+            ips: IP addresses to enrich (duplicates are looked up once)
+            priority: Rate limiter priority of the lookups
+
+        Returns:
+            Dictionary mapping each IP to its enrichment data
+        """
+        distinct = list(dict.fromkeys(ips))
+        pending = [ip for ip in distinct if self._needs_lookup(ip)]
+
+        results = {}
+        if len(pending) > 1:
+            size = self.provider.batch_size
+            groups = [pending[i:i + size] for i in range(0, len(pending), size)]
+            futures = []
+            if len(groups) > 1:
+                executor = self._get_executor()
+                futures = [executor.submit(self._lookup_group, group, priority) for group in groups[1:]]
+            results.update(self._lookup_group(groups[0], priority))
+            for future in futures:
+                results.update(future.result())
+
+        for ip in distinct:
+            if ip not in results:
+                results[ip] = self.enrich_ip(ip, priority)
+        return results
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Create the lookup pool on first use"""
+        with self._inflight_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.lookup_workers,
+                                                    thread_name_prefix='ip-lookup')
+            return self._executor
+
+    def close(self):
+        """Shut the lookup pool down after lookups in flight finish"""
+        with self._inflight_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        self.provider.close()
 
     @staticmethod
     def _get_default_enrichment() -> Dict[str, Any]:
@@ -200,6 +365,24 @@ class IPEnricher:
             'is_vpn': False
         }
 
+    @staticmethod
+    def _get_pending_enrichment() -> Dict[str, Any]:
+        """Get default enrichment data for a lookup that failed or was skipped"""
+        enrichment = IPEnricher._get_default_enrichment()
+        enrichment['pending'] = True
+        return enrichment
+
+    @staticmethod
+    def _build_enrichment(source: Dict[str, Any], destination: Dict[str, Any]) -> Dict[str, Any]:
+        """Combine src and dst results into an alert's enrichment field"""
+        pending = source.get('pending') or destination.get('pending')
+        return {
+            'source': source,
+            'destination': destination,
+            'status': 'pending' if pending else 'complete',
+            'enriched_at': datetime.now().isoformat()
+        }
+
     @staticmethod
     def _get_private_ip_enrichment() -> Dict[str, Any]:
         """Get enrichment data for private IPs"""
@@ -217,24 +400,227 @@ class IPEnricher:
             'is_vpn': False
         }
 
-    def enrich_alert(self, alert: Dict[str, Any]) -> Dict[str, Any]:
+    def enrich_alert(self, alert: Union[Alert, Dict[str, Any]]) -> Union[Alert, Dict[str, Any]]:
         """
         Enrich an entire alert with IP information
         
         Args:
-            alert: Alert dictionary
+            alert: Alert record or dictionary
             
         Returns:
-            Enriched alert dictionary
+            The same alert with its enrichment set; enrichment['status'] is
+            'pending' when an IP could not be looked up
         """
-        src_ip = alert.get('src_ip', '')
-        dst_ip = alert.get('dst_ip', '')
-        
-        enrichment_data = {
-            'source': self.enrich_ip(src_ip),
-            'destination': self.enrich_ip(dst_ip),
-            'enriched_at': datetime.now().isoformat()
-        }
+        if isinstance(alert, Alert):
+            src_ip, dst_ip = alert.src_ip, alert.dst_ip
+        else:
+            src_ip = alert.get('src_ip', '')
+            dst_ip = alert.get('dst_ip', '')
         
-        alert['enrichment'] = enrichment_data
+        # Destinations are usually our own hosts: classify both, look up the rest
+        src_class, dst_class = self.networks.classify_pair(src_ip, dst_ip)
+        external = [ip for ip, name in ((src_ip, src_class), (dst_ip, dst_class)) if name is None]
+        resolved = self.enrich_ips(external, self.alert_priority(alert)) if external else {}
+
+        source = resolved[src_ip] if src_class is None else self.networks.records[src_class]
+        destination = resolved[dst_ip] if dst_class is None else self.networks.records[dst_class]
+        alert['enrichment'] = self._build_enrichment(source, destination)
         return alert
+
+
+class AsyncIPEnricher:
+    """
+    asyncio front end to IPEnricher
+
+    Lookups go through the wrapped IPEnricher's provider with
+    lookup_async(): IP-API.com lookups are made with asyncio streams, so
+    thousands can be in flight without a thread each, while providers
+    without an async client run in the event loop's default executor.
+    max_concurrency bounds how many are open at once. Concurrent lookups of
+    the same IP share one request. The cache, network classification and
+    failure handling are the wrapped IPEnricher's.
+
+    Only the memory tier of the cache is read on the event loop. A slower
+    tier (the database of a PersistentEnrichmentCache) is read on
+    db_executor before going to the provider, or not at all without one.
+    """
+
+    def __init__(self, ip_enricher: IPEnricher, max_concurrency: int = 100, timeout: float = 5,
+                 db_executor: Optional[Executor] = None):
+        """
+        Initialize async enricher
+
+        Args:
+            ip_enricher: IPEnricher whose cache and settings are used
+            max_concurrency: Maximum lookups in flight at once
+            timeout: Seconds allowed for one lookup
+            db_executor: Executor for reads of the cache's database tier
+                (default: the tier is skipped; warm() the cache instead)
+        """
+        self.enricher = ip_enricher
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.db_executor = db_executor
+        self._semaphore = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {'lookups': 0, 'failures': 0, 'in_flight': 0, 'coalesced': 0}
+
+    async def enrich_ip(self, ip: str, priority: int = PRIORITY_NORMAL) -> Dict[str, Any]:
+        """
+        Enrich IP address with geolocation and network data
+
+        Args:
+            ip: IP address to enrich
+            priority: Rate limiter priority (see IPEnricher.enrich_ip)
+
+        Returns:
+            Dictionary with enrichment data
+        """
+        internal = self.enricher.networks.internal_record(ip)
+        if internal is not None:
+            return internal
+        if self.enricher.geoip is not None:
+            return self.enricher.enrich_ip(ip)
+
+        cached = self.enricher.cache.get_memory(ip)
+        if cached:
+            return cached
+
+        if self.enricher.failures.get(ip) is not None:
+            return self.enricher._get_pending_enrichment()
+
+        task = self._inflight.get(ip)
+        if task is None:
+            if ip in self.enricher.priority_ips:
+                priority = PRIORITY_HIGH
+            task = self._inflight[ip] = asyncio.ensure_future(self._lookup(ip, priority))
+            task.add_done_callback(lambda _: self._inflight.pop(ip, None))
+        else:
+            self.stats['coalesced'] += 1
+
+        # A cancelled caller must not cancel the lookup the others wait on
+        return await asyncio.shield(task)
+
+    async def _lookup(self, ip: str, priority: int) -> Dict[str, Any]:
+        """Look an IP missing from memory up in the database tier, then the provider"""
+        if self.db_executor is not None:
+            cached = await asyncio.get_running_loop().run_in_executor(
+                self.db_executor, self.enricher.cache.load, ip)
+            if cached:
+                return cached
+
+        if not await self._admit(priority):
+            return self.enricher._get_pending_enrichment()
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        try:
+            async with self._semaphore:
+                self.stats['lookups'] += 1
+                self.stats['in_flight'] += 1
+                try:
+                    enrichment = await asyncio.wait_for(self.enricher.provider.lookup_async(ip),
+                                                        self.timeout)
+                finally:
+                    self.stats['in_flight'] -= 1
+
+        except Exception as e:
+            self.stats['failures'] += 1
+            logger.warning(f"Failed to enrich IP {ip} from {self.enricher.provider.name}: "
+                           f"{str(e) or type(e).__name__}")
+            self.enricher._record_failure(ip)
+            return self.enricher._get_pending_enrichment()
+
+        except BaseException:
+            # Cancelled (e.g. on shutdown): the breaker admitted this call,
+            # and a half-open one never closes again unless told it ended
+            self.enricher.breaker.record_failure()
+            raise
+
+        self.enricher.breaker.record_success()
+        self.enricher._cache_enrichment(ip, enrichment)
+        return enrichment
+
+    async def enrich_alert(self, alert: Union[Alert, Dict[str, Any]]) -> Union[Alert, Dict[str, Any]]:
+        """
+        Enrich an entire alert with IP information
+
+        Args:
+            alert: Alert record or dictionary
+
+        Returns:
+            The same alert with its enrichment set
+        """
+        priority = self.enricher.alert_priority(alert)
+        source, destination = await asyncio.gather(self.enrich_ip(alert.get('src_ip', ''), priority),
+                                                   self.enrich_ip(alert.get('dst_ip', ''), priority))
+
+        alert['enrichment'] = self.enricher._build_enrichment(source, destination)
+        return alert
+
+    async def _admit(self, priority: int) -> bool:
+        """IPEnricher._admit for coroutines"""
+        breaker = self.enricher.breaker
+        if not breaker.allow():
+            return False
+        limiter = self.enricher.rate_limiter
+        if limiter is None:
+            return True
+        try:
+            granted = await limiter.acquire_async(priority)
+        except BaseException:
+            breaker.release()
+            raise
+        if not granted:
+            breaker.release()
+        return granted
+
+
+def build_enricher(settings, db_manager, process: str) -> IPEnricher:
+    """
+    Build the IP enricher every entry point uses, from configuration
+
+    Args:
+        settings: Configuration module (IP_ENRICHMENT_* and HOME_NET)
+        db_manager: Database holding the persistent enrichment cache
+        process: Key of IP_ENRICHMENT_RATE_SHARES naming the calling
+            process; its limiter gets that share of the provider quota
+
+    Returns:
+        Enricher over a PersistentEnrichmentCache (its .cache); callers
+        warm() the cache on start and close() both on exit
+    """
+    shares = settings.IP_ENRICHMENT_RATE_SHARES
+    if process not in shares:
+        raise ValueError(f"No enrichment rate share for {process} (choose from {', '.join(shares)})")
+    share = shares[process]
+
+    cache = PersistentEnrichmentCache(
+        db_manager,
+        max_size=settings.IP_ENRICHMENT_CACHE_SIZE,
+        ttl=settings.IP_ENRICHMENT_CACHE_DURATION * 3600,
+        flush_interval=settings.IP_ENRICHMENT_CACHE_FLUSH_INTERVAL
+    )
+    geoip = None
+    if settings.IP_ENRICHMENT_GEOIP_DB:
+        # Relative paths are taken from the project root, like the database
+        geoip = GeoIPDatabase.from_csv(str(Path(__file__).parent.parent / settings.IP_ENRICHMENT_GEOIP_DB))
+    return IPEnricher(
+        cache=cache,
+        geoip=geoip,
+        lookup_workers=settings.IP_ENRICHMENT_LOOKUP_WORKERS,
+        negative_ttl=settings.IP_ENRICHMENT_NEGATIVE_TTL,
+        breaker=CircuitBreaker('IP enrichment',
+                               failure_threshold=settings.IP_ENRICHMENT_BREAKER_THRESHOLD,
+                               cooldown=settings.IP_ENRICHMENT_BREAKER_COOLDOWN),
+        rate_limiter=PriorityRateLimiter(settings.IP_ENRICHMENT_RATE_PER_MINUTE * share / 60,
+                                         burst=max(1, round(settings.IP_ENRICHMENT_RATE_BURST * share)),
+                                         max_wait=settings.IP_ENRICHMENT_MAX_WAIT,
+                                         shed_depth=settings.IP_ENRICHMENT_SHED_DEPTH),
+        networks=NetworkClassifier(settings.HOME_NET),
+        provider=create_provider(settings.IP_ENRICHMENT_PROVIDER,
+                                 base_url=settings.IP_ENRICHMENT_PROVIDER_URL,
+                                 batch_size=settings.IP_ENRICHMENT_BATCH_SIZE,
+                                 timeout=settings.IP_ENRICHMENT_TIMEOUT)
+    )
@@ -0,0 +1,252 @@
+"""
+Offline GeoIP module for Mini SIEM
+Looks IP addresses up in a local range dataset without network access
+"""
+
+import csv
+import gzip
+import socket
+import logging
+import ipaddress
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Accepted CSV column names for each field, first match wins
+COLUMN_ALIASES = {
+    'start': ('start', 'start_ip', 'ip_start', 'range_start', 'ip_from'),
+    'end': ('end', 'end_ip', 'ip_end', 'range_end', 'ip_to'),
+    'network': ('network', 'cidr', 'prefix'),
+    'country': ('country', 'country_name'),
+    'country_code': ('country_code', 'countrycode', 'country_iso_code'),
+    'city': ('city', 'city_name'),
+    'region': ('region', 'region_name', 'subdivision_1_name'),
+    'latitude': ('latitude', 'lat'),
+    'longitude': ('longitude', 'lon'),
+    'org': ('org', 'organization', 'as_org', 'autonomous_system_organization'),
+    'asn': ('asn', 'as', 'autonomous_system_number'),
+    'isp': ('isp',),
+    'timezone': ('timezone', 'time_zone')
+}
+
+# Fields of an enrichment record, in IPEnricher._get_default_enrichment order
+RECORD_FIELDS = ('country', 'country_code', 'city', 'region', 'latitude', 'longitude',
+                 'org', 'asn', 'isp', 'timezone')
+
+
+class GeoIPDatabase:
+    """
+    In-memory IP range table searched with bisect
+
+    Ranges are kept as parallel sorted arrays of (start, end, record id);
+    IPv4 uses compact unsigned 32-bit arrays and IPv6 plain integer lists.
+    A 65,536-entry index on the top 16 bits of IPv4 addresses narrows each
+    bisect to the ranges starting in that /16.
+    Each distinct location/network record is stored once and shared by
+    every range that points to it, so lookups return an existing dict
+    without allocating one. Records must be treated as read-only.
+    """
+
+    def __init__(self):
+        """Initialize an empty database (see from_csv)"""
+        code = 'I' if array('I').itemsize >= 4 else 'L'
+        self.v4_starts = array(code)
+        self.v4_ends = array(code)
+        self.v4_ids = array(code)
+        self.v4_index = array(code)
+        self.v6_starts: List[int] = []
+        self.v6_ends: List[int] = []
+        self.v6_ids: List[int] = []
+        self.records: List[Dict[str, Any]] = []
+        self.source = None
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'GeoIPDatabase':
+        """
+        Load a range dataset from a CSV file (optionally .gz)
+
+        The header must name either a network column (CIDR prefixes, as in
+        GeoLite2/IPinfo CSV exports) or start/end columns (addresses or
+        integers, as in DB-IP/IP2Location exports), plus any of country,
+        country_code, city, region, latitude, longitude, org, asn, isp and
+        timezone. Missing fields get the same defaults as a failed lookup.
+
+        Args:
+            path: CSV file to load
+
+        Returns:
+            Loaded GeoIPDatabase
+        """
+        db = cls()
+        db.source = path
+        record_ids: Dict[Tuple, int] = {}
+        v4, v6 = [], []
+        skipped = 0
+
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = [name.strip().lower() for name in next(reader)]
+            columns = {}
+            for field, aliases in COLUMN_ALIASES.items():
+                for alias in aliases:
+                    if alias in header:
+                        columns[field] = header.index(alias)
+                        break
+
+            if 'network' not in columns and not ('start' in columns and 'end' in columns):
+                raise ValueError(f"{path}: need a network column or start and end columns")
+
+            for row in reader:
+                try:
+                    start, end, is_v6 = cls._parse_range(row, columns)
+                except (ValueError, IndexError):
+                    skipped += 1
+                    continue
+
+                key = tuple(row[columns[field]] if field in columns and columns[field] < len(row)
+                            else None for field in RECORD_FIELDS)
+                record_id = record_ids.get(key)
+                if record_id is None:
+                    record_id = record_ids[key] = len(db.records)
+                    db.records.append(cls._make_record(key))
+
+                (v6 if is_v6 else v4).append((start, end, record_id))
+
+        v4.sort()
+        v6.sort()
+        for start, end, record_id in v4:
+            db.v4_starts.append(start)
+            db.v4_ends.append(end)
+            db.v4_ids.append(record_id)
+        db._build_index()
+        db.v6_starts = [r[0] for r in v6]
+        db.v6_ends = [r[1] for r in v6]
+        db.v6_ids = [r[2] for r in v6]
+
+        if skipped:
+            logger.warning(f"Skipped {skipped} malformed rows in {path}")
+        logger.info(f"Loaded {len(v4):,} IPv4 and {len(v6):,} IPv6 ranges "
+                    f"({len(db.records):,} records) from {path}")
+        return db
+
+    def _build_index(self):
+        """Record where the ranges starting in each IPv4 /16 begin"""
+        starts = self.v4_starts
+        self.v4_index = array(starts.typecode,
+                              [bisect_left(starts, prefix << 16) for prefix in range(65536)])
+        self.v4_index.append(len(starts))
+
+    @staticmethod
+    def _parse_range(row: List[str], columns: Dict[str, int]) -> Tuple[int, int, bool]:
+        """Get (start, end, is_ipv6) from a CSV row"""
+        if 'network' in columns:
+            network = ipaddress.ip_network(row[columns['network']].strip(), strict=False)
+            return (int(network.network_address), int(network.broadcast_address),
+                    network.version == 6)
+
+        bounds = []
+        for field in ('start', 'end'):
+            value = row[columns[field]].strip()
+            if value.isdigit():
+                bounds.append((int(value), None))
+            else:
+                address = ipaddress.ip_address(value)
+                bounds.append((int(address), address.version == 6))
+
+        (start, start_v6), (end, end_v6) = bounds
+        if end < start:
+            raise ValueError("range ends before it starts")
+        is_v6 = bool(start_v6 or end_v6) or end > 0xFFFFFFFF
+        return start, end, is_v6
+
+    @staticmethod
+    def _make_record(values: Tuple) -> Dict[str, Any]:
+        """Build an enrichment record in the IPEnricher result shape"""
+        fields = dict(zip(RECORD_FIELDS, values))
+
+        def text(name: str, default: str = 'Unknown') -> str:
+            value = fields.get(name)
+            return value.strip() if value and value.strip() else default
+
+        def number(name: str) -> Optional[float]:
+            try:
+                return float(fields[name])
+            except (TypeError, ValueError, KeyError):
+                return None
+
+        asn = text('asn')
+        if asn != 'Unknown' and asn.isdigit():
+            asn = f"AS{asn}"
+
+        return {
+            'country': text('country'),
+            'country_code': text('country_code', 'XX'),
+            'city': text('city'),
+            'region': text('region'),
+            'latitude': number('latitude'),
+            'longitude': number('longitude'),
+            'org': text('org'),
+            'asn': asn,
+            'isp': text('isp', text('org')),
+            'timezone': text('timezone'),
+            'is_vpn': False
+        }
+
+    def lookup_int(self, value: int, ipv6: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Find the record for an address given as an integer
+
+        Args:
+            value: Address as an integer
+            ipv6: Search the IPv6 table
+
+        Returns:
+            Shared enrichment record, or None if no range contains it
+        """
+        if ipv6:
+            starts, ends, ids = self.v6_starts, self.v6_ends, self.v6_ids
+            i = bisect_right(starts, value) - 1
+        else:
+            starts, ends, ids = self.v4_starts, self.v4_ends, self.v4_ids
+            prefix = value >> 16
+            index = self.v4_index
+            # Ranges before the /16 all start lower, so the local result is exact
+            i = bisect_right(starts, value, index[prefix], index[prefix + 1]) - 1
+
+        if i >= 0 and value <= ends[i]:
+            return self.records[ids[i]]
+        return None
+
+    def lookup(self, ip: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the record for an address
+
+        Args:
+            ip: IPv4 or IPv6 address
+
+        Returns:
+            Shared enrichment record, or None if unknown or invalid
+        """
+        try:
+            if ':' in ip:
+                return self.lookup_int(int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big'),
+                                       ipv6=True)
+            return self.lookup_int(int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big'))
+        except (OSError, TypeError, ValueError):
+            return None
+
+    def __len__(self) -> int:
+        return len(self.v4_starts) + len(self.v6_starts)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get dataset size information"""
+        return {
+            'source': self.source,
+            'ipv4_ranges': len(self.v4_starts),
+            'ipv6_ranges': len(self.v6_starts),
+            'records': len(self.records),
+            'array_bytes': self.v4_starts.itemsize * (len(self.v4_starts) * 3 + len(self.v4_index))
+        }
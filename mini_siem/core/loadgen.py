@@ -0,0 +1,335 @@
+"""
+Load generation module for Mini SIEM
+Writes realistic Snort alert lines at a target rate and replays captured logs
+"""
+
+import re
+import time
+import bisect
+import random
+import logging
+import itertools
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Iterator, Iterable
+
+from core.alert import Alert
+from core.collector import SnortAlertParser, MockAlertGenerator, open_alert_stream
+
+logger = logging.getLogger(__name__)
+
+# First octets never used for synthetic attackers (private, loopback, link-local,
+# shared and documentation ranges); multicast and above are excluded by range
+_RESERVED_OCTETS = {0, 10, 100, 127, 169, 172, 192, 198, 203}
+
+# Leading timestamps used to pace replays
+FAST_TIMESTAMP_REGEX = re.compile(r"^(\d{2})/(\d{2})-(\d{2}):(\d{2}):(\d{2})\.(\d{1,6})")
+CSV_TIMESTAMP_REGEX = re.compile(r'^"?(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:\.\d{1,6})?)')
+
+
+class LoadGenerator:
+    """
+    Seeded generator of synthetic alerts with realistic traffic shape
+
+    Source addresses follow a Zipf distribution over a fixed attacker pool,
+    so a few attackers produce most alerts. Scan bursts - one attacker
+    sweeping the ports of a single target - are mixed in at random. The
+    same seed and start time always give the same alerts.
+    """
+
+    SCAN_SIGNATURE = "Port Scanning Detected"
+    TARGET_PORTS = [22, 23, 25, 53, 80, 110, 143, 443, 445, 3306, 3389, 5432, 8080]
+
+    def __init__(self, seed: int = 42, attackers: int = 1000, zipf_exponent: float = 1.1,
+                 targets: int = 50, scan_probability: float = 0.001, scan_length: int = 200,
+                 signatures: Optional[List[str]] = None):
+        """
+        Initialize load generator
+
+        Args:
+            seed: Random seed; equal seeds give equal output
+            attackers: Size of the source address pool
+            zipf_exponent: Skew of attacker activity (0 is uniform)
+            targets: Number of internal destination hosts (10.0.x.y)
+            scan_probability: Chance that any alert starts a scan burst
+            scan_length: Alerts (ports probed) per scan burst
+            signatures: Signature names to draw from (default: MockAlertGenerator's)
+        """
+        self.rng = random.Random(seed)
+        self.scan_probability = scan_probability
+        self.scan_length = scan_length
+
+        self.signatures = list(signatures or MockAlertGenerator.SIGNATURES)
+        self.priorities = {sig: str(self.rng.randint(1, 3)) for sig in self.signatures}
+        self.priorities.setdefault(self.SCAN_SIGNATURE, '2')
+
+        self.attackers = [self._public_ip() for _ in range(attackers)]
+        self.targets = [f"10.0.{i // 254}.{i % 254 + 1}" for i in range(targets)]
+
+        # Cumulative Zipf weights for rank 1..attackers, sampled with bisect
+        weights = [1.0 / (rank ** zipf_exponent) for rank in range(1, attackers + 1)]
+        self._cumulative = list(itertools.accumulate(weights))
+
+        self._scan = None  # (attacker, target, next port, remaining) while scanning
+
+    def _public_ip(self) -> str:
+        """Random address outside the reserved ranges"""
+        while True:
+            first = self.rng.randint(1, 223)
+            if first not in _RESERVED_OCTETS:
+                return (f"{first}.{self.rng.randint(0, 255)}."
+                        f"{self.rng.randint(0, 255)}.{self.rng.randint(1, 254)}")
+
+    def _attacker(self) -> str:
+        """Draw a source address from the Zipf distribution"""
+        point = self.rng.random() * self._cumulative[-1]
+        return self.attackers[bisect.bisect_left(self._cumulative, point)]
+
+    def generate_alert(self, timestamp: datetime) -> Alert:
+        """Generate the next alert in the sequence"""
+        if self._scan is None and self.rng.random() < self.scan_probability:
+            self._scan = (self._attacker(), self.rng.choice(self.targets), 1, self.scan_length)
+
+        if self._scan is not None:
+            src_ip, dst_ip, dst_port, remaining = self._scan
+            self._scan = (src_ip, dst_ip, dst_port + 1, remaining - 1) if remaining > 1 else None
+            signature, protocol = self.SCAN_SIGNATURE, 'TCP'
+        else:
+            src_ip = self._attacker()
+            dst_ip = self.rng.choice(self.targets)
+            dst_port = self.rng.choice(self.TARGET_PORTS)
+            signature = self.rng.choice(self.signatures)
+            protocol = self.rng.choice(('TCP', 'TCP', 'TCP', 'UDP', 'ICMP'))
+
+        priority = self.priorities[signature]
+        src_port = self.rng.randint(1024, 65535)
+        return Alert(
+            timestamp=timestamp,
+            signature=signature,
+            classification=signature,
+            priority=priority,
+            severity=SnortAlertParser.SEVERITY_MAP.get(priority, 'INFO'),
+            protocol=protocol,
+            src_ip=src_ip,
+            src_port=src_port,
+            dst_ip=dst_ip,
+            dst_port=dst_port,
+            message=f"{signature} - {src_ip}:{src_port} -> {dst_ip}:{dst_port}"
+        )
+
+    def alerts(self, count: Optional[int] = None, rate: float = 1000,
+               start_time: Optional[datetime] = None) -> Iterator[Alert]:
+        """
+        Generate alerts timestamped as if they arrived at a steady rate
+
+        Args:
+            count: Alerts to generate (None for an endless stream)
+            rate: Alerts per second used to space the timestamps
+            start_time: Timestamp of the first alert (default: now)
+
+        Yields:
+            Alert records
+        """
+        start = start_time or datetime.now()
+        step = 1.0 / rate if rate > 0 else 0.0
+        counter = itertools.count() if count is None else range(count)
+        for i in counter:
+            yield self.generate_alert(start + timedelta(seconds=i * step))
+
+    def lines(self, count: Optional[int] = None, rate: float = 1000, fmt: str = 'fast',
+              start_time: Optional[datetime] = None) -> Iterator[str]:
+        """
+        Generate alert log lines (see alerts() for the arguments)
+
+        Args:
+            fmt: 'fast' (alert_fast) or 'csv' (alert_csv)
+
+        Yields:
+            Newline-terminated lines
+        """
+        formatter = {'fast': format_fast, 'csv': format_csv}[fmt]
+        for alert in self.alerts(count, rate, start_time):
+            yield formatter(alert)
+
+
+def format_fast(alert: Alert) -> str:
+    """Format an alert as a Snort alert_fast line"""
+    ts = alert.timestamp
+    return (f"{ts.month:02d}/{ts.day:02d}-{ts.hour:02d}:{ts.minute:02d}:{ts.second:02d}."
+            f"{ts.microsecond:06d}  [Classification: {alert.classification}] "
+            f"[Priority: {alert.priority}] {{{alert.protocol}}} "
+            f"{alert.src_ip}:{alert.src_port} -> {alert.dst_ip}:{alert.dst_port}\n")
+
+
+def format_csv(alert: Alert) -> str:
+    """Format an alert as a Snort alert_csv line"""
+    return (f"{alert.timestamp.isoformat()},1,1000001,1,{alert.signature},{alert.protocol},"
+            f"{alert.src_ip},{alert.src_port},{alert.dst_ip},{alert.dst_port},,"
+            f"{alert.classification},{alert.priority}\n")
+
+
+def write_lines(path: str, lines: Iterable[str], rate: float = 0,
+                duration: Optional[float] = None, tick: float = 0.05) -> Dict[str, Any]:
+    """
+    Append lines to a file at a target rate
+
+    Lines are written in one write() per tick, so a reader tailing the file
+    sees a steady stream rather than one line per syscall.
+
+    Args:
+        path: File to append to
+        lines: Lines to write (newline-terminated)
+        rate: Target lines per second (0 writes as fast as possible)
+        duration: Stop after this many seconds (None runs until lines end)
+        tick: Seconds of lines written per write() when rate-limited
+
+    Returns:
+        Dictionary with lines written, elapsed seconds and achieved rate
+    """
+    chunk_size = max(1, int(rate * tick)) if rate > 0 else 10000
+    lines = iter(lines)
+    written = 0
+    start = time.monotonic()
+
+    with open(path, 'a') as f:
+        while True:
+            chunk = list(itertools.islice(lines, chunk_size))
+            if not chunk:
+                break
+            f.write(''.join(chunk))
+            f.flush()
+            written += len(chunk)
+
+            now = time.monotonic()
+            if duration is not None and now - start >= duration:
+                break
+            if rate > 0:
+                delay = start + written / rate - now
+                if delay > 0:
+                    time.sleep(delay)
+
+    elapsed = time.monotonic() - start
+    return {
+        'lines': written,
+        'elapsed': elapsed,
+        'lines_per_sec': written / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def line_timestamp(line: str) -> Optional[datetime]:
+    """Read the leading fast or CSV timestamp of a line (None if absent)"""
+    match = FAST_TIMESTAMP_REGEX.match(line)
+    if match:
+        month, day, hour, minute, second, fraction = match.groups()
+        try:
+            return datetime(1900, int(month), int(day), int(hour), int(minute), int(second),
+                            int(fraction.ljust(6, '0')))
+        except ValueError:
+            return None
+
+    match = CSV_TIMESTAMP_REGEX.match(line)
+    if match:
+        try:
+            return datetime.fromisoformat(match.group(1))
+        except ValueError:
+            return None
+    return None
+
+
+def retime_line(line: str, timestamp: datetime) -> str:
+    """Replace the leading fast or CSV timestamp of a line"""
+    match = FAST_TIMESTAMP_REGEX.match(line)
+    if match:
+        return (f"{timestamp.month:02d}/{timestamp.day:02d}-{timestamp.hour:02d}:"
+                f"{timestamp.minute:02d}:{timestamp.second:02d}.{timestamp.microsecond:06d}"
+                f"{line[match.end():]}")
+
+    match = CSV_TIMESTAMP_REGEX.match(line)
+    if match:
+        quote = '"' if line.startswith('"') else ''
+        return f"{quote}{timestamp.isoformat()}{line[match.end():]}"
+    return line
+
+
+def replay_log(source: str, destination: str, speed: float = 1.0, retime: bool = False,
+               tick: float = 0.05) -> Dict[str, Any]:
+    """
+    Replay a captured alert log into another file at N times real speed
+
+    Gaps between the original timestamps are divided by speed; lines
+    without a readable timestamp are written with the line before them.
+    Compressed captures (.gz/.zst/.bz2) are read directly.
+
+    Args:
+        source: Captured alert log
+        destination: File to append to (e.g. the collector's alert file)
+        speed: Replay speed multiplier (0 replays as fast as possible)
+        retime: Rewrite timestamps to the replay time, so time-window
+            correlation sees the alerts as current
+        tick: Lines due within this many seconds are written together,
+            so at most this early
+
+    Returns:
+        Dictionary with lines written, elapsed seconds, achieved rate and
+        the span of the original capture
+    """
+    written = 0
+    first_ts = last_ts = None
+    pending: List[str] = []
+    start = last_flush = time.monotonic()
+    wall_start = datetime.now()
+
+    with open_alert_stream(source) as stream, open(destination, 'a') as out:
+        def flush():
+            nonlocal last_flush
+            out.write(''.join(pending))
+            out.flush()
+            pending.clear()
+            last_flush = time.monotonic()
+
+        for raw in stream:
+            line = raw.decode('utf-8', errors='ignore')
+            if not line.strip():
+                continue
+            if not line.endswith('\n'):
+                line += '\n'
+
+            ts = line_timestamp(line)
+            if ts is not None:
+                if first_ts is None:
+                    first_ts = ts
+                # Clock steps backwards (or a year boundary) do not wait
+                last_ts = max(ts, last_ts or ts)
+
+                if speed > 0:
+                    delay = start + (last_ts - first_ts).total_seconds() / speed - time.monotonic()
+                    if delay > tick:
+                        if pending:
+                            flush()
+                        time.sleep(delay)
+
+            if retime:
+                offset = (last_ts - first_ts) / speed if (last_ts and speed > 0) else timedelta(0)
+                line = retime_line(line, wall_start + offset)
+
+            pending.append(line)
+            written += 1
+            if len(pending) >= 10000 or time.monotonic() - last_flush >= tick:
+                flush()
+
+        if pending:
+            flush()
+
+    elapsed = time.monotonic() - start
+    return {
+        'lines': written,
+        'elapsed': elapsed,
+        'lines_per_sec': written / elapsed if elapsed > 0 else 0.0,
+        'capture_seconds': (last_ts - first_ts).total_seconds() if first_ts else 0.0
+    }
+
+
+def parse_rate(text: str) -> float:
+    """Parse a rate such as '50000', '50k' or '1.5m' lines per second"""
+    text = text.strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return float(text[:-1] if multiplier > 1 else text) * multiplier
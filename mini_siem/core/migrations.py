@@ -0,0 +1,268 @@
+"""
+Schema migration module for Mini SIEM
+Versioned schema changes for the SIEM database, tracked in PRAGMA user_version
+"""
+
+import sqlite3
+from typing import Set
+
+
+def _columns(cursor: sqlite3.Cursor, table: str) -> Set[str]:
+    """Get the column names of a table"""
+    return {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_column(cursor: sqlite3.Cursor, table: str, column: str, definition: str):
+    """Add a column unless an interrupted run already did"""
+    if column not in _columns(cursor, table):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _initial_schema(cursor: sqlite3.Cursor):
+    """Alerts, correlations and blocked IPs"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            signature TEXT NOT NULL,
+            src_ip TEXT NOT NULL,
+            dst_ip TEXT NOT NULL,
+            src_port INTEGER,
+            dst_port INTEGER,
+            protocol TEXT,
+            severity TEXT,
+            message TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            enrichment_data TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS correlations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            attack_type TEXT NOT NULL,
+            src_ip TEXT NOT NULL,
+            alert_count INTEGER,
+            unique_signatures INTEGER,
+            first_alert_time DATETIME,
+            last_alert_time DATETIME,
+            details TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS blocked_ips (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ip_address TEXT UNIQUE NOT NULL,
+            reason TEXT,
+            blocked_by TEXT DEFAULT 'admin',
+            blocked_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_src_ip ON alerts(src_ip)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_timestamp ON alerts(timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_severity ON alerts(severity)")
+
+
+def _enrichment_cache(cursor: sqlite3.Cursor):
+    """Persistent IP enrichment cache (see PersistentEnrichmentCache)"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS enrichment_cache (
+            ip TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_enrichment_expires ON enrichment_cache(expires_at)")
+
+
+def _enrichment_pending(cursor: sqlite3.Cursor):
+    """Flag for alerts stored before their enrichment (see DeferredEnricher)"""
+    _add_column(cursor, 'alerts', 'enrichment_pending', "INTEGER NOT NULL DEFAULT 0")
+    # Partial index: only the (few) alerts still waiting for enrichment
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_enrichment_pending ON alerts(id)
+        WHERE enrichment_pending = 1
+    """)
+
+
+def _ip_enrichment(cursor: sqlite3.Cursor):
+    """One row per distinct record of an IP, referenced by alerts"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ip_enrichment (
+            id INTEGER PRIMARY KEY,
+            ip TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            UNIQUE (ip, version)
+        )
+    """)
+    _add_column(cursor, 'alerts', 'src_enrichment_id', "INTEGER REFERENCES ip_enrichment(id)")
+    _add_column(cursor, 'alerts', 'dst_enrichment_id', "INTEGER REFERENCES ip_enrichment(id)")
+
+
+def _write_ahead_log(cursor: sqlite3.Cursor):
+    """WAL journal: readers no longer wait for writers (and vice versa)"""
+    cursor.execute("PRAGMA journal_mode = WAL").fetchone()
+
+
+def _epoch_timestamps(cursor: sqlite3.Cursor):
+    """Integer epoch-microsecond timestamps, filled by migrate_timestamps"""
+    _add_column(cursor, 'alerts', 'timestamp_us', "INTEGER")
+    # Only ever served exact-format comparisons of the text column
+    cursor.execute("DROP INDEX IF EXISTS idx_timestamp")
+
+
+def _window_indexes(cursor: sqlite3.Cursor):
+    """Composite and covering indexes for the window queries and ORDER BY clauses"""
+    # Built after the timestamp backfill: one sorted pass instead of an
+    # index update per row
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_timestamp_us ON alerts(timestamp_us)")
+    # Per-IP windows: counts and distinct signatures are answered from the
+    # index alone. Supersedes idx_src_ip (and idx_src_ip_timestamp_us of
+    # unversioned databases), which are its prefixes
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_src_ip_window ON alerts(src_ip, timestamp_us, signature)
+    """)
+    cursor.execute("DROP INDEX IF EXISTS idx_src_ip_timestamp_us")
+    cursor.execute("DROP INDEX IF EXISTS idx_src_ip")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_signature_window ON alerts(signature, timestamp_us)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_correlations_created_at ON correlations(created_at)
+    """)
+    # get_blocked_ips reads every column it returns from the index
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_blocked_at ON blocked_ips(blocked_at, ip_address, reason)
+    """)
+
+
+def _alert_partitions(cursor: sqlite3.Cursor):
+    """Catalog of per-period alert tables and the alert id sequence"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS alert_partitions (
+            name TEXT PRIMARY KEY,
+            start_us INTEGER NOT NULL,
+            end_us INTEGER NOT NULL,
+            min_id INTEGER,
+            max_id INTEGER
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_alert_partitions_start ON alert_partitions(start_us)")
+    # Alert ids stay unique across partitions: writers reserve them here
+    cursor.execute("CREATE TABLE IF NOT EXISTS alert_sequence (next_id INTEGER NOT NULL)")
+    cursor.execute("""
+        INSERT INTO alert_sequence (next_id)
+        SELECT 1 WHERE NOT EXISTS (SELECT 1 FROM alert_sequence)
+    """)
+
+
+def _partition_counts(cursor: sqlite3.Cursor):
+    """Alert count of each partition, kept up to date by the writers"""
+    _add_column(cursor, 'alert_partitions', 'alert_count', "INTEGER NOT NULL DEFAULT 0")
+
+
+# Columns of an alert partition, in INSERT order after id
+ALERT_COLUMNS = ('signature', 'src_ip', 'dst_ip', 'src_port', 'dst_port', 'protocol', 'severity',
+                 'message', 'timestamp', 'timestamp_us', 'enrichment_pending',
+                 'src_enrichment_id', 'dst_enrichment_id')
+
+
+def create_alert_partition(cursor: sqlite3.Cursor, name: str, indexes: bool = True):
+    """
+    Create one period's alert table (the alerts schema as of version 7)
+
+    Args:
+        cursor: Cursor of the connection to create it on
+        name: Table name (see AlertPartitions)
+        indexes: Also create its indexes; bulk loads create them after
+    """
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY,
+            signature TEXT NOT NULL,
+            src_ip TEXT NOT NULL,
+            dst_ip TEXT NOT NULL,
+            src_port INTEGER,
+            dst_port INTEGER,
+            protocol TEXT,
+            severity TEXT,
+            message TEXT,
+            timestamp DATETIME,
+            timestamp_us INTEGER NOT NULL,
+            enrichment_pending INTEGER NOT NULL DEFAULT 0,
+            src_enrichment_id INTEGER REFERENCES ip_enrichment(id),
+            dst_enrichment_id INTEGER REFERENCES ip_enrichment(id),
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    if indexes:
+        create_alert_partition_indexes(cursor, name)
+
+
+def create_alert_partition_indexes(cursor: sqlite3.Cursor, name: str):
+    """Create the indexes of an alert partition (those of alerts as of version 7)"""
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {name}_timestamp_us ON {name}(timestamp_us)")
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS {name}_src_ip_window ON {name}(src_ip, timestamp_us, signature)
+    """)
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS {name}_signature_window ON {name}(signature, timestamp_us)
+    """)
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS {name}_pending ON {name}(id) WHERE enrichment_pending = 1
+    """)
+
+
+# (version, description, DDL function, DatabaseManager method converting
+# existing rows afterwards). Append only: a released version never changes,
+# and every step must be safe to re-run after an interruption.
+MIGRATIONS = (
+    (1, 'Initial schema', _initial_schema, None),
+    (2, 'Persistent enrichment cache', _enrichment_cache, None),
+    (3, 'Deferred enrichment flag', _enrichment_pending, None),
+    (4, 'Normalized IP enrichment', _ip_enrichment, 'migrate_enrichment'),
+    (5, 'Write-ahead log', _write_ahead_log, None),
+    (6, 'Epoch timestamps', _epoch_timestamps, 'migrate_timestamps'),
+    (7, 'Window indexes', _window_indexes, None),
+    (8, 'Time-partitioned alerts', _alert_partitions, 'migrate_partitions'),
+    (9, 'Partition alert counts', _partition_counts, 'migrate_partition_counts'),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """
+    Get the schema version of a database
+
+    Databases created before versioning have user_version 0; their
+    version is inferred from the newest column or table they have. One
+    missing any initial table is migrated from the start (every step is
+    safe to re-run).
+
+    Args:
+        conn: Connection to the database
+
+    Returns:
+        Last migration applied (0 for an empty database)
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version:
+        return version
+
+    cursor = conn.cursor()
+    tables = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if not {'alerts', 'correlations', 'blocked_ips'} <= tables:
+        return 0
+    columns = _columns(cursor, 'alerts')
+    if 'timestamp_us' in columns:
+        return 6
+    if 'src_enrichment_id' in columns:
+        return 4
+    if 'enrichment_pending' in columns:
+        return 3
+    if 'enrichment_cache' in tables:
+        return 2
+    return 1
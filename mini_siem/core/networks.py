@@ -0,0 +1,207 @@
+"""
+Network classification module for Mini SIEM
+Tells internal and special-use addresses apart from external ones
+"""
+
+import socket
+import logging
+import ipaddress
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Label given to addresses in HOME_NET
+HOME_NETWORK = 'Home Network'
+
+# Ranges that are never routed on the public Internet (RFC 6890 and friends).
+# The documentation and benchmarking blocks (192.0.2.0/24, 198.51.100.0/24,
+# 203.0.113.0/24, 198.18.0.0/15, 2001:db8::/32) are left out: lab and replayed
+# traffic uses them as stand-ins for public addresses. List them in HOME_NET
+# to skip them.
+SPECIAL_USE_NETWORKS = (
+    ('0.0.0.0/8', 'This Network'),
+    ('10.0.0.0/8', 'Private Range'),
+    ('100.64.0.0/10', 'Shared Address Space'),
+    ('127.0.0.0/8', 'Loopback'),
+    ('169.254.0.0/16', 'Link-Local'),
+    ('172.16.0.0/12', 'Private Range'),
+    ('192.0.0.0/24', 'Protocol Assignments'),
+    ('192.168.0.0/16', 'Private Range'),
+    ('224.0.0.0/4', 'Multicast'),
+    ('240.0.0.0/4', 'Reserved'),
+    ('255.255.255.255/32', 'Broadcast'),
+    ('::/128', 'Unspecified'),
+    ('::1/128', 'Loopback'),
+    ('100::/64', 'Discard-Only'),
+    ('fc00::/7', 'Private Range'),
+    ('fe80::/10', 'Link-Local'),
+    ('ff00::/8', 'Multicast')
+)
+
+# IPv4-mapped IPv6 addresses (::ffff:a.b.c.d) are classified as IPv4
+_V4_MAPPED_PREFIX = 0xFFFF
+
+
+class NetworkClassifier:
+    """
+    Longest-prefix matcher over HOME_NET and the special-use ranges
+
+    Prefixes are compiled into one dictionary per prefix length keyed by
+    the masked network integer, so a lookup is a shift and a dict probe
+    per length. IPv4 goes through a 256-entry table on the first octet
+    first: most octets are decided outright (public, or wholly inside one
+    range) and only the few holding longer prefixes are searched.
+    HOME_NET wins over a special-use range of the same length.
+    """
+
+    def __init__(self, home_net: Iterable[str] = ('10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16',
+                                                  'fc00::/7')):
+        """
+        Initialize classifier
+
+        Args:
+            home_net: CIDR prefixes of the monitored networks (Snort's
+                HOME_NET); they may include public blocks
+        """
+        networks: List[Tuple[ipaddress._BaseNetwork, str]] = [
+            (ipaddress.ip_network(cidr), name) for cidr, name in SPECIAL_USE_NETWORKS]
+        home = []
+        for cidr in home_net:
+            try:
+                home.append(ipaddress.ip_network(cidr.strip(), strict=False))
+            except ValueError:
+                logger.warning(f"Ignoring invalid HOME_NET entry: {cidr}")
+        self.home_net = tuple(str(network) for network in home)
+        networks.extend((network, HOME_NETWORK) for network in home)
+
+        # prefix length -> {network >> (bits - length): label}
+        v4: Dict[int, Dict[int, str]] = {}
+        v6: Dict[int, Dict[int, str]] = {}
+        for network, name in networks:
+            table, bits = (v4, 32) if network.version == 4 else (v6, 128)
+            shift = bits - network.prefixlen
+            table.setdefault(network.prefixlen, {})[int(network.network_address) >> shift] = name
+
+        self.prefix_count = len(networks)
+        self._v6 = tuple((128 - length, v6[length]) for length in sorted(v6, reverse=True))
+        self._v4_octets = self._compile_v4(v4)
+        self.records = {name: self._make_record(name)
+                        for name in {name for _, name in networks}}
+
+    @staticmethod
+    def _compile_v4(prefixes: Dict[int, Dict[int, str]]) -> List[Any]:
+        """
+        Build the first-octet table
+
+        Each entry is a label (the whole /8 has one answer), None (the whole
+        /8 is external) or (longer prefixes longest first, fallback label).
+        """
+        table = []
+        for octet in range(256):
+            fallback = None
+            for length in sorted(length for length in prefixes if length <= 8):
+                fallback = prefixes[length].get(octet >> (8 - length), fallback)
+
+            longer = []
+            for length in sorted((length for length in prefixes if length > 8), reverse=True):
+                shift = 32 - length
+                inside = {network: name for network, name in prefixes[length].items()
+                          if network >> (length - 8) == octet}
+                if inside:
+                    longer.append((shift, inside))
+
+            table.append((tuple(longer), fallback) if longer else fallback)
+        return table
+
+    @staticmethod
+    def _make_record(name: str) -> Dict[str, Any]:
+        """Build the enrichment record for a range, in the IPEnricher result shape"""
+        return {
+            'country': 'Private',
+            'country_code': 'XX',
+            'city': 'Internal Network',
+            'region': name,
+            'latitude': None,
+            'longitude': None,
+            'org': 'Internal',
+            'asn': 'Internal',
+            'isp': 'Internal',
+            'timezone': 'Unknown',
+            'is_vpn': False
+        }
+
+    def _classify_v4(self, value: int) -> Optional[str]:
+        """Classify an IPv4 address given as an integer"""
+        entry = self._v4_octets[value >> 24]
+        if entry is None or entry.__class__ is str:
+            return entry
+        longer, fallback = entry
+        for shift, networks in longer:
+            name = networks.get(value >> shift)
+            if name is not None:
+                return name
+        return fallback
+
+    def classify(self, ip: str) -> Optional[str]:
+        """
+        Find the range an address belongs to
+
+        Args:
+            ip: IPv4 or IPv6 address
+
+        Returns:
+            HOME_NETWORK, a special-use range name, or None for external
+            (and invalid) addresses
+        """
+        try:
+            if ':' not in ip:
+                value = int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+                # _classify_v4 inlined: this is the per-alert hot path
+                entry = self._v4_octets[value >> 24]
+                if entry is None or entry.__class__ is str:
+                    return entry
+                return self._classify_v4(value)
+            value = int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big')
+        except (OSError, TypeError, ValueError):
+            return None
+
+        if value >> 32 == _V4_MAPPED_PREFIX:
+            return self._classify_v4(value & 0xFFFFFFFF)
+        for shift, networks in self._v6:
+            name = networks.get(value >> shift)
+            if name is not None:
+                return name
+        return None
+
+    def classify_pair(self, src_ip: str, dst_ip: str) -> Tuple[Optional[str], Optional[str]]:
+        """Classify an alert's source and destination together"""
+        if src_ip == dst_ip:
+            name = self.classify(src_ip)
+            return name, name
+        return self.classify(src_ip), self.classify(dst_ip)
+
+    def is_internal(self, ip: str) -> bool:
+        """Check whether an address is in HOME_NET or a special-use range"""
+        return self.classify(ip) is not None
+
+    def is_home(self, ip: str) -> bool:
+        """Check whether an address is in HOME_NET"""
+        return self.classify(ip) == HOME_NETWORK
+
+    def internal_record(self, ip: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the enrichment record of an internal address
+
+        Returns:
+            Shared read-only record, or None if the address is external
+        """
+        name = self.classify(ip)
+        return None if name is None else self.records[name]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the configured networks"""
+        return {
+            'home_net': list(self.home_net),
+            'prefixes': self.prefix_count,
+            'ipv6_prefix_lengths': len(self._v6)
+        }
@@ -0,0 +1,159 @@
+"""
+Alert partition module for Mini SIEM
+Routes alerts to per-period tables so retention can drop whole periods
+"""
+
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from core.migrations import create_alert_partition
+
+logger = logging.getLogger(__name__)
+
+
+class AlertPartitions:
+    """
+    Catalog of time-partitioned alert tables
+
+    Alerts are stored in one table per period (a UTC day by default),
+    named after the period's start (alerts_YYYYMMDDHHMM) and listed in
+    alert_partitions with their time and id ranges. Writers route each
+    alert by its timestamp_us; readers only open the partitions whose
+    range overlaps the window they ask for; retention drops a whole
+    expired partition instead of deleting its rows one by one.
+
+    A database keeps the period its partitions were created with: a
+    different configured period takes effect once they have all expired.
+    """
+
+    PREFIX = 'alerts_'
+    # Shortest period accepted (table names have minute resolution)
+    MIN_PERIOD_US = 60 * 1000000
+
+    def __init__(self, period_hours: float = 24):
+        """
+        Initialize partition catalog
+
+        Args:
+            period_hours: Hours of alerts stored per partition
+        """
+        self.period_us = round(period_hours * 3600 * 1000000)
+        if self.period_us < self.MIN_PERIOD_US:
+            raise ValueError(f"Partition period too short: {period_hours} hours")
+        self._known = {}  # partition key -> table name, for tables known to exist
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def key(self, timestamp_us: int) -> int:
+        """Get the partition key (period number since the epoch) of a timestamp"""
+        return timestamp_us // self.period_us
+
+    def bounds(self, key: int) -> Tuple[int, int]:
+        """Get the [start, end) epoch-microsecond range of a partition"""
+        return key * self.period_us, (key + 1) * self.period_us
+
+    def name(self, key: int) -> str:
+        """Get the table name of a partition"""
+        start = datetime.fromtimestamp(key * self.period_us / 1000000, timezone.utc)
+        return f"{self.PREFIX}{start:%Y%m%d%H%M}"
+
+    def load(self, conn: sqlite3.Connection):
+        """Adopt the period of existing partitions, once"""
+        with self._lock:
+            self._load(conn)
+
+    def _load(self, conn: sqlite3.Connection):
+        """load() with the lock held"""
+        if self._loaded:
+            return
+        row = conn.execute("SELECT end_us - start_us FROM alert_partitions LIMIT 1").fetchone()
+        if row and row[0] != self.period_us:
+            logger.warning(f"Keeping the existing {row[0] / 3600000000:g}-hour alert partitions "
+                           f"(configured: {self.period_us / 3600000000:g} hours)")
+            self.period_us = row[0]
+        self._loaded = True
+
+    def assign(self, conn: sqlite3.Connection, timestamps) -> List[str]:
+        """
+        Get the partition of each timestamp, creating missing partitions
+
+        Args:
+            conn: Connection to create them on (joins its transaction)
+            timestamps: Epoch-microsecond timestamps
+
+        Returns:
+            Table name for each timestamp, in order
+        """
+        with self._lock:
+            self._load(conn)
+            names = []
+            for timestamp_us in timestamps:
+                key = timestamp_us // self.period_us
+                name = self._known.get(key)
+                if name is None:
+                    name = self.name(key)
+                    start, end = self.bounds(key)
+                    create_alert_partition(conn.cursor(), name)
+                    conn.execute("""
+                        INSERT OR IGNORE INTO alert_partitions (name, start_us, end_us)
+                        VALUES (?, ?, ?)
+                    """, (name, start, end))
+                    self._known[key] = name
+                names.append(name)
+            return names
+
+    def forget(self, names: Optional[List[str]] = None):
+        """
+        Stop assuming partitions exist (after they were dropped)
+
+        Args:
+            names: Table names to forget; all of them if None
+        """
+        with self._lock:
+            if names is None:
+                self._known.clear()
+                self._loaded = False
+                return
+            names = set(names)
+            for key in [k for k, name in self._known.items() if name in names]:
+                del self._known[key]
+
+    @staticmethod
+    def overlapping(conn: sqlite3.Connection, since_us: Optional[int] = None) -> List[tuple]:
+        """
+        List partitions, newest first
+
+        Args:
+            conn: Connection to read the catalog on
+            since_us: Only partitions holding alerts after this time
+
+        Returns:
+            List of (name, start_us, end_us, min_id, max_id) tuples
+        """
+        return conn.execute("""
+            SELECT name, start_us, end_us, min_id, max_id FROM alert_partitions
+            WHERE end_us > ?
+            ORDER BY start_us DESC
+        """, (-2 ** 63 if since_us is None else since_us,)).fetchall()
+
+    @staticmethod
+    def expired(conn: sqlite3.Connection, cutoff_us: int) -> List[str]:
+        """List partitions holding only alerts before the cutoff"""
+        return [row[0] for row in conn.execute(
+            "SELECT name FROM alert_partitions WHERE end_us <= ? ORDER BY start_us", (cutoff_us,))]
+
+    def drop(self, conn: sqlite3.Connection, names: List[str]):
+        """
+        Drop partitions and their catalog entries
+
+        Args:
+            conn: Connection to drop them on (joins its transaction)
+            names: Table names, from overlapping() or expired()
+        """
+        for name in names:
+            conn.execute(f"DROP TABLE IF EXISTS {name}")
+            conn.execute("DELETE FROM alert_partitions WHERE name = ?", (name,))
+        self.forget(names)
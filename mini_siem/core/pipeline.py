@@ -0,0 +1,626 @@
+"""
+Processing pipeline module for Mini SIEM
+Runs enrichment and storage as stages joined by bounded queues, on worker
+threads (AlertPipeline) or on an asyncio event loop (AsyncAlertPipeline)
+"""
+
+import time
+import queue
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# Queue marker telling one worker to exit
+_STOP = object()
+
+
+class Stage:
+    """One pipeline stage: a bounded input queue drained by worker threads"""
+
+    def __init__(self, name: str, handler: Callable[[List[Any]], Optional[List[Any]]],
+                 workers: int = 1, queue_size: int = 1000, batch_size: int = 1,
+                 max_latency: float = 0.0):
+        """
+        Initialize stage
+
+        Args:
+            name: Stage name used in thread names, logs and metrics
+            handler: Called with a list of up to batch_size items; returns
+                the items to pass to the next stage (or None)
+            workers: Worker threads draining the queue
+            queue_size: Maximum queued items before put() blocks
+            batch_size: Maximum items handed to one handler call
+            max_latency: Seconds a partial batch waits for more items after
+                its first one arrived (0: hand over whatever is queued)
+        """
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.batch_size = max(1, batch_size)
+        self.max_latency = max_latency
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.output = None
+        self.threads = []
+
+        self._lock = threading.Lock()
+        self.stats = {
+            'processed': 0,
+            'errors': 0,
+            'batches': 0,
+            'blocked_puts': 0,
+            'blocked_seconds': 0.0,
+            'high_water': 0
+        }
+
+    def start(self):
+        """Start the worker threads"""
+        self.threads = [
+            threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def put(self, item):
+        """
+        Queue an item, blocking while the queue is full
+
+        Time spent blocked is the backpressure this stage applies to the
+        one feeding it, and is recorded in the stage metrics.
+        """
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            start = time.monotonic()
+            self.queue.put(item)
+            with self._lock:
+                self.stats['blocked_puts'] += 1
+                self.stats['blocked_seconds'] += time.monotonic() - start
+
+        depth = self.queue.qsize()
+        if depth > self.stats['high_water']:
+            self.stats['high_water'] = depth
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Process everything already queued, then stop the workers
+
+        Args:
+            timeout: Maximum seconds to wait for each worker
+        """
+        for _ in self.threads:
+            self.queue.put(_STOP)
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    def _worker(self):
+        """Take batches off the queue and hand them to the handler"""
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+
+            items = [item]
+            stopping = False
+            deadline = time.monotonic() + self.max_latency
+            while len(items) < self.batch_size:
+                try:
+                    wait = deadline - time.monotonic()
+                    item = self.queue.get(timeout=wait) if wait > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                items.append(item)
+
+            self._handle(items)
+            if stopping:
+                return
+
+    def _handle(self, items: List[Any]):
+        """Run the handler on a batch and forward its results"""
+        try:
+            results = self.handler(items)
+        except Exception as e:
+            logger.error(f"Error in {self.name} stage: {str(e)}")
+            with self._lock:
+                self.stats['errors'] += len(items)
+            return
+
+        with self._lock:
+            self.stats['processed'] += len(items)
+            self.stats['batches'] += 1
+
+        if self.output is not None and results:
+            for result in results:
+                self.output.put(result)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get queue-depth gauges and counters for this stage"""
+        with self._lock:
+            metrics = dict(self.stats)
+        metrics['avg_batch'] = round(metrics['processed'] / metrics['batches'], 1) \
+            if metrics['batches'] else 0.0
+        metrics.update({
+            'workers': self.workers,
+            'queue_depth': self.queue.qsize(),
+            'queue_size': self.queue_size
+        })
+        return metrics
+
+
+class GroupCommitWriter(Stage):
+    """
+    Alert writer that commits in groups
+
+    Alerts written from any thread are queued and stored by one
+    insert_alerts() transaction per group: as soon as batch_size alerts
+    are waiting, or max_latency seconds after the oldest one arrived,
+    whichever comes first. Under load every commit (and its fsync) covers
+    a full batch; when idle an alert waits at most max_latency.
+    """
+
+    def __init__(self, db_manager, batch_size: int = 500, max_latency: float = 0.05,
+                 queue_size: int = 5000, workers: int = 1,
+                 on_commit: Optional[Callable[[List[tuple]], Any]] = None):
+        """
+        Initialize group-commit writer
+
+        Args:
+            db_manager: DatabaseManager to insert into
+            batch_size: Alerts that trigger a commit at once
+            max_latency: Longest seconds an alert waits for a commit
+            queue_size: Maximum queued alerts before write() blocks
+            workers: Writer threads (SQLite has one writer: keep 1)
+            on_commit: Called with the (token, alert) items of each group
+                after its transaction, even a failed one
+        """
+        super().__init__('persist', self._commit, workers=workers, queue_size=queue_size,
+                         batch_size=batch_size, max_latency=max_latency)
+        self.db = db_manager
+        self.on_commit = on_commit
+        self.stats.update({'commit_seconds': 0.0, 'max_commit_seconds': 0.0})
+        self._written = 0
+        self._finished = 0
+        self._idle = threading.Condition()
+
+    def write(self, alert, token: Any = None):
+        """
+        Queue an alert for the next group commit, blocking while the queue is full
+
+        Args:
+            alert: Alert record or dictionary
+            token: Passed back to on_commit with the alert
+        """
+        with self._idle:
+            self._written += 1
+        self.put((token, alert))
+
+    def write_many(self, alerts: List[Any], token: Any = None):
+        """Queue several alerts (see write)"""
+        for alert in alerts:
+            self.write(alert, token)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every alert written so far is committed
+
+        Returns:
+            False if the timeout expired first
+        """
+        with self._idle:
+            target = self._written
+            return self._idle.wait_for(lambda: self._finished >= target, timeout)
+
+    def _commit(self, items: List[tuple]) -> None:
+        """Store one group in a single transaction"""
+        start = time.monotonic()
+        try:
+            store_alerts(self.db, None, items)
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self.stats['commit_seconds'] += elapsed
+                if elapsed > self.stats['max_commit_seconds']:
+                    self.stats['max_commit_seconds'] = elapsed
+        finally:
+            if self.on_commit is not None:
+                self.on_commit(items)
+            with self._idle:
+                self._finished += len(items)
+                self._idle.notify_all()
+
+
+class BatchTracker:
+    """Commits read positions once every alert read before them is stored"""
+
+    def __init__(self, commit: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        """
+        Initialize batch tracker
+
+        Args:
+            commit: Called with a batch's read position once it and all
+                earlier batches are stored (e.g. AlertCollector.commit_checkpoint)
+        """
+        self.commit = commit
+        self._lock = threading.Lock()
+        self._pending = deque()
+
+    def open(self, count: int, state: Optional[Dict[str, Any]] = None) -> list:
+        """
+        Register a batch of alerts read from the collector
+
+        Args:
+            count: Alerts in the batch
+            state: Read position after the batch (None if nothing to commit)
+
+        Returns:
+            Batch handle to pass to done()
+        """
+        batch = [count, state]
+        with self._lock:
+            self._pending.append(batch)
+        if count == 0:
+            self.done(batch, 0)
+        return batch
+
+    def done(self, batch: list, count: int = 1):
+        """
+        Mark alerts of a batch as stored (or given up on)
+
+        Batches can finish out of order when several workers are running;
+        the position is only committed up to the oldest unfinished batch.
+        """
+        with self._lock:
+            batch[0] -= count
+            state = None
+            while self._pending and self._pending[0][0] <= 0:
+                finished = self._pending.popleft()
+                if finished[1] is not None:
+                    state = finished[1]
+
+            # Committed under the lock so positions are written in order
+            if state is not None and self.commit:
+                try:
+                    self.commit(state)
+                except Exception as e:
+                    logger.error(f"Failed to commit read position: {str(e)}")
+
+    def in_flight(self) -> int:
+        """Number of batches not yet fully stored"""
+        with self._lock:
+            return len(self._pending)
+
+
+def store_alerts(db_manager, tracker: Optional[BatchTracker], items: List[tuple]):
+    """
+    Store (batch, alert) items in one transaction and mark them done
+
+    Args:
+        db_manager: DatabaseManager to insert into
+        tracker: BatchTracker the batches were opened on (None: nothing
+            to mark)
+        items: (batch, alert) pairs from the enrich stage
+    """
+    alerts = [alert for _, alert in items]
+    try:
+        db_manager.insert_alerts(alerts)
+        # Runs for every group commit: build no messages unless DEBUG is on
+        if logger.isEnabledFor(logging.DEBUG):
+            for alert in alerts:
+                logger.debug("Alert stored: %s from %s [Severity: %s]",
+                             alert['signature'], alert['src_ip'], alert['severity'])
+            logger.debug("Stored %d alerts", len(alerts))
+
+    finally:
+        if tracker is not None:
+            mark_stored(tracker, items)
+
+
+def mark_stored(tracker: BatchTracker, items: List[tuple]):
+    """
+    Mark (batch, alert) items as done on their batches
+
+    Failed alerts are given up on, as before, so callers mark them too:
+    they must not hold back the read position of later batches.
+    """
+    counts = {}
+    for batch, _ in items:
+        key = id(batch)
+        if key in counts:
+            counts[key][1] += 1
+        else:
+            counts[key] = [batch, 1]
+    for batch, count in counts.values():
+        tracker.done(batch, count)
+
+
+class AlertPipeline:
+    """
+    Enrich and persist stages fed by the collector
+
+    The persist stage is a GroupCommitWriter: alerts are committed in
+    groups of persist_batch_size, or persist_max_latency seconds after the
+    oldest one arrived. Without an enricher the pipeline is persist-only:
+    alerts are stored as soon as they are collected, flagged for the
+    DeferredEnricher.
+    """
+
+    def __init__(self, ip_enricher, db_manager, enrich_workers: int = 8,
+                 persist_workers: int = 1, queue_size: int = 5000,
+                 persist_batch_size: int = 500, persist_max_latency: float = 0.05,
+                 on_checkpoint: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        """
+        Initialize alert pipeline
+
+        Args:
+            ip_enricher: IPEnricher instance used by the enrich stage
+                (None to store alerts unenriched)
+            db_manager: DatabaseManager instance used by the persist stage
+            enrich_workers: Threads running enrichment lookups
+            persist_workers: Threads writing to the database
+            queue_size: Capacity of each stage's input queue, in alerts
+            persist_batch_size: Maximum alerts stored per transaction
+            persist_max_latency: Longest seconds an alert waits for its
+                transaction to fill up
+            on_checkpoint: Called with the collector read position once
+                every alert read before it is stored
+        """
+        self.ip_enricher = ip_enricher
+        self.db = db_manager
+        self.tracker = BatchTracker(on_checkpoint)
+
+        self.persist_stage = GroupCommitWriter(
+            db_manager, batch_size=persist_batch_size, max_latency=persist_max_latency,
+            queue_size=queue_size, workers=persist_workers,
+            on_commit=lambda items: mark_stored(self.tracker, items))
+        self.stages = [self.persist_stage]
+        self.enrich_stage = None
+        if ip_enricher is not None:
+            self.enrich_stage = Stage('enrich', self._enrich, workers=enrich_workers,
+                                      queue_size=queue_size)
+            self.enrich_stage.output = self.persist_stage
+            self.stages.insert(0, self.enrich_stage)
+        self.running = False
+
+    def start(self):
+        """Start all stage workers"""
+        for stage in reversed(self.stages):
+            stage.start()
+        self.running = True
+
+    def stop(self, timeout: Optional[float] = 10):
+        """Drain the queues stage by stage and stop the workers"""
+        if not self.running:
+            return
+        self.running = False
+        for stage in self.stages:
+            stage.stop(timeout)
+
+    def submit(self, alerts: List[Any], checkpoint: Optional[Dict[str, Any]] = None):
+        """
+        Hand a batch of collected alerts to the first stage
+
+        Blocks while its queue is full, which in turn holds the collector
+        back when enrichment or the database falls behind.
+
+        Args:
+            alerts: Alerts returned by the collector
+            checkpoint: Collector read position after this batch
+        """
+        batch = self.tracker.open(len(alerts), checkpoint)
+        first = self.stages[0]
+        for alert in alerts:
+            first.put((batch, alert))
+
+    def _enrich(self, items: List[tuple]) -> List[tuple]:
+        """Enrich stage handler"""
+        for batch, alert in items:
+            try:
+                self.ip_enricher.enrich_alert(alert)
+            except Exception as e:
+                # Store the alert unenriched rather than lose it
+                logger.error(f"Failed to enrich alert: {str(e)}")
+        return items
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get per-stage gauges and the number of batches in flight"""
+        metrics = {stage.name: stage.get_metrics() for stage in self.stages}
+        breaker = getattr(self.ip_enricher, 'breaker', None)
+        if self.enrich_stage is not None and breaker is not None:
+            metrics['enrich']['breaker'] = breaker.state
+        metrics['batches_in_flight'] = self.tracker.in_flight()
+        return metrics
+
+
+class AsyncStage(Stage):
+    """Stage whose workers are coroutines on the running event loop"""
+
+    def __init__(self, name: str, handler, workers: int = 1, queue_size: int = 1000,
+                 batch_size: int = 1, max_latency: float = 0.0):
+        """
+        Initialize async stage
+
+        Args:
+            name: Stage name used in logs and metrics
+            handler: Coroutine function called with a list of up to
+                batch_size items; returns the items for the next stage
+            workers: Worker coroutines draining the queue
+            queue_size: Maximum queued items before put() waits
+            batch_size: Maximum items handed to one handler call
+            max_latency: Seconds a partial batch waits for more items
+        """
+        super().__init__(name, handler, workers, queue_size, batch_size, max_latency)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.tasks = []
+
+    def start(self):
+        """Start the worker coroutines on the running loop"""
+        self.tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def put(self, item):
+        """Queue an item, waiting while the queue is full"""
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            start = time.monotonic()
+            await self.queue.put(item)
+            self.stats['blocked_puts'] += 1
+            self.stats['blocked_seconds'] += time.monotonic() - start
+
+        depth = self.queue.qsize()
+        if depth > self.stats['high_water']:
+            self.stats['high_water'] = depth
+
+    async def stop(self):
+        """Process everything already queued, then stop the workers"""
+        for _ in self.tasks:
+            await self.queue.put(_STOP)
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def _worker(self):
+        """Take batches off the queue and hand them to the handler"""
+        while True:
+            item = await self.queue.get()
+            if item is _STOP:
+                return
+
+            items = [item]
+            stopping = False
+            deadline = time.monotonic() + self.max_latency
+            while len(items) < self.batch_size:
+                try:
+                    wait = deadline - time.monotonic()
+                    item = await asyncio.wait_for(self.queue.get(), wait) if wait > 0 \
+                        else self.queue.get_nowait()
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                items.append(item)
+
+            await self._handle(items)
+            if stopping:
+                return
+
+    async def _handle(self, items: List[Any]):
+        """Run the handler on a batch and forward its results"""
+        try:
+            results = await self.handler(items)
+        except Exception as e:
+            logger.error(f"Error in {self.name} stage: {str(e)}")
+            self.stats['errors'] += len(items)
+            return
+
+        self.stats['processed'] += len(items)
+        self.stats['batches'] += 1
+
+        if self.output is not None and results:
+            for result in results:
+                await self.output.put(result)
+
+
+class AsyncAlertPipeline:
+    """asyncio counterpart of AlertPipeline for the asyncio runtime"""
+
+    def __init__(self, async_enricher, db_manager, db_executor, enrich_concurrency: int = 100,
+                 queue_size: int = 5000, persist_batch_size: int = 500,
+                 persist_max_latency: float = 0.05,
+                 on_checkpoint: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        """
+        Initialize async alert pipeline
+
+        Must be created and started from a coroutine on the loop it runs on.
+
+        Args:
+            async_enricher: AsyncIPEnricher used by the enrich stage (None
+                to store alerts unenriched)
+            db_manager: DatabaseManager used by the persist stage
+            db_executor: Executor that runs all database calls
+            enrich_concurrency: Alerts being enriched at once
+            queue_size: Capacity of each stage's input queue, in alerts
+            persist_batch_size: Maximum alerts stored per transaction
+            persist_max_latency: Longest seconds an alert waits for its
+                transaction to fill up (group commit, as in AlertPipeline)
+            on_checkpoint: Called with the collector read position once
+                every alert read before it is stored
+        """
+        self.enricher = async_enricher
+        self.db = db_manager
+        self.db_executor = db_executor
+        self.tracker = BatchTracker(on_checkpoint)
+
+        self.persist_stage = AsyncStage('persist', self._persist, workers=1,
+                                        queue_size=queue_size, batch_size=persist_batch_size,
+                                        max_latency=persist_max_latency)
+        self.stages = [self.persist_stage]
+        self.enrich_stage = None
+        if async_enricher is not None:
+            self.enrich_stage = AsyncStage('enrich', self._enrich, workers=enrich_concurrency,
+                                           queue_size=queue_size)
+            self.enrich_stage.output = self.persist_stage
+            self.stages.insert(0, self.enrich_stage)
+        self.running = False
+
+    def start(self):
+        """Start all stage workers"""
+        for stage in reversed(self.stages):
+            stage.start()
+        self.running = True
+
+    async def stop(self):
+        """Drain the queues stage by stage and stop the workers"""
+        if not self.running:
+            return
+        self.running = False
+        for stage in self.stages:
+            await stage.stop()
+
+    async def submit(self, alerts: List[Any], checkpoint: Optional[Dict[str, Any]] = None):
+        """
+        Hand a batch of collected alerts to the first stage
+
+        Waits while its queue is full, which holds the collector back when
+        enrichment or the database falls behind.
+
+        Args:
+            alerts: Alerts returned by the collector
+            checkpoint: Collector read position after this batch
+        """
+        batch = self.tracker.open(len(alerts), checkpoint)
+        first = self.stages[0]
+        for alert in alerts:
+            await first.put((batch, alert))
+
+    async def _enrich(self, items: List[tuple]) -> List[tuple]:
+        """Enrich stage handler"""
+        for batch, alert in items:
+            try:
+                await self.enricher.enrich_alert(alert)
+            except Exception as e:
+                # Store the alert unenriched rather than lose it
+                logger.error(f"Failed to enrich alert: {str(e)}")
+        return items
+
+    async def _persist(self, items: List[tuple]) -> None:
+        """Persist stage handler"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.db_executor, store_alerts, self.db, self.tracker, items)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get per-stage gauges and the number of batches in flight"""
+        metrics = {stage.name: stage.get_metrics() for stage in self.stages}
+        if self.enrich_stage is not None:
+            metrics['enrich']['lookups_in_flight'] = self.enricher.stats['in_flight']
+            metrics['enrich']['lookups_coalesced'] = self.enricher.stats['coalesced']
+            metrics['enrich']['breaker'] = self.enricher.enricher.breaker.state
+        metrics['batches_in_flight'] = self.tracker.in_flight()
+        return metrics
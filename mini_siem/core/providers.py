@@ -0,0 +1,216 @@
+"""
+Enrichment provider module for Mini SIEM
+Backends that resolve public IP addresses to enrichment records
+"""
+
+import abc
+import json
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class EnrichmentProvider(abc.ABC):
+    """
+    Base class for IP enrichment backends
+
+    lookup() resolves one address and raises on any failure; IPEnricher
+    handles caching, rate limiting and failure accounting around it.
+    Providers that accept several addresses per request set batch_size
+    above 1 and override lookup_many(). lookup_async() is used by
+    AsyncIPEnricher; by default it runs lookup() in the event loop's
+    executor.
+    """
+
+    name = 'provider'
+    batch_size = 1
+
+    @abc.abstractmethod
+    def lookup(self, ip: str) -> Dict[str, Any]:
+        """
+        Resolve one IP address
+
+        Args:
+            ip: Public IP address
+
+        Returns:
+            Enrichment record in the IPEnricher result shape
+        """
+
+    def lookup_many(self, ips: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Resolve several IP addresses, in one request where supported
+
+        Args:
+            ips: Public IP addresses, at most batch_size
+
+        Returns:
+            Dictionary mapping IPs to records; IPs the backend had no
+            answer for are left out
+        """
+        return {ip: self.lookup(ip) for ip in ips}
+
+    async def lookup_async(self, ip: str) -> Dict[str, Any]:
+        """lookup() for coroutines"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.lookup, ip)
+
+    def close(self):
+        """Release connections"""
+
+
+class IPAPIProvider(EnrichmentProvider):
+    """
+    IP-API.com JSON API, or anything speaking its format
+
+    Single lookups are GET {base_url}/json/{ip}; with batch_size above 1,
+    lookup_many() POSTs the addresses as a JSON list to {base_url}/batch
+    (IP-API.com takes up to 100 per request). Point base_url at a local
+    stub server (see core.stub_provider) to run without the Internet.
+    """
+
+    name = 'ip-api'
+    DEFAULT_URL = 'http://ip-api.com'
+    MAX_BATCH_SIZE = 100
+
+    def __init__(self, base_url: Optional[str] = None, batch_size: int = 1, timeout: float = 5):
+        """
+        Initialize provider
+
+        Args:
+            base_url: Service root (default: http://ip-api.com)
+            batch_size: Addresses per request (1 disables /batch)
+            timeout: Seconds allowed for one request
+        """
+        self.base_url = (base_url or self.DEFAULT_URL).rstrip('/')
+        self.batch_size = max(1, min(batch_size, self.MAX_BATCH_SIZE))
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def lookup(self, ip: str) -> Dict[str, Any]:
+        """Resolve one IP with GET /json/{ip}"""
+        response = self.session.get(f"{self.base_url}/json/{ip}", timeout=self.timeout)
+        response.raise_for_status()
+        return self.from_ip_api(response.json())
+
+    def lookup_many(self, ips: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Resolve several IPs with one POST /batch"""
+        if len(ips) == 1:
+            return {ips[0]: self.lookup(ips[0])}
+
+        response = self.session.post(f"{self.base_url}/batch", json=list(ips), timeout=self.timeout)
+        response.raise_for_status()
+        wanted = set(ips)
+        return {item['query']: self.from_ip_api(item) for item in response.json()
+                if isinstance(item, dict) and item.get('query') in wanted}
+
+    async def lookup_async(self, ip: str) -> Dict[str, Any]:
+        """Resolve one IP over asyncio streams, without a thread"""
+        return self.from_ip_api(await get_json_async(f"{self.base_url}/json/{ip}"))
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
+
+    @staticmethod
+    def from_ip_api(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Map an IP-API.com response to enrichment data"""
+        return {
+            'country': data.get('country', 'Unknown'),
+            'country_code': data.get('countryCode', 'XX'),
+            'city': data.get('city', 'Unknown'),
+            'region': data.get('region', 'Unknown'),
+            'latitude': data.get('lat', None),
+            'longitude': data.get('lon', None),
+            'org': data.get('org', 'Unknown'),
+            'asn': data.get('as', 'Unknown'),
+            'isp': data.get('isp', 'Unknown'),
+            'timezone': data.get('timezone', 'Unknown'),
+            'is_vpn': data.get('proxy', False)
+        }
+
+
+class IPWhoisProvider(EnrichmentProvider):
+    """RDAP/whois lookups through the ipwhois package (imported on first use)"""
+
+    name = 'ipwhois'
+
+    def lookup(self, ip: str) -> Dict[str, Any]:
+        """Resolve one IP with an ipwhois lookup"""
+        from ipwhois import IPWhois
+
+        results = IPWhois(ip).lookup(ip_version=4)
+        return {
+            'country': results.get('country', 'Unknown'),
+            'country_code': results.get('country_code', 'XX'),
+            'city': 'Unknown',
+            'region': results.get('asn_description', 'Unknown'),
+            'latitude': None,
+            'longitude': None,
+            'org': results.get('asn_description', 'Unknown'),
+            'asn': results.get('asn', 'Unknown'),
+            'isp': results.get('nets', [{}])[0].get('description', 'Unknown'),
+            'timezone': 'Unknown',
+            'is_vpn': False
+        }
+
+
+# Provider names accepted by create_provider (config.IP_ENRICHMENT_PROVIDER)
+PROVIDERS = {
+    IPAPIProvider.name: IPAPIProvider,
+    IPWhoisProvider.name: IPWhoisProvider
+}
+
+
+def create_provider(name: str = IPAPIProvider.name, base_url: Optional[str] = None,
+                    batch_size: int = 1, timeout: float = 5) -> EnrichmentProvider:
+    """
+    Build a provider from configuration
+
+    Args:
+        name: Key of PROVIDERS
+        base_url: Service root for HTTP providers
+        batch_size: Addresses per request, where supported
+        timeout: Seconds allowed for one request
+
+    Returns:
+        Configured provider
+    """
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown enrichment provider: {name} (choose from {', '.join(PROVIDERS)})")
+    if name == IPAPIProvider.name:
+        return IPAPIProvider(base_url, batch_size=batch_size, timeout=timeout)
+    return PROVIDERS[name]()
+
+
+async def get_json_async(url: str) -> Any:
+    """Fetch a JSON document over plain HTTP/1.0"""
+    parts = urlsplit(url)
+    if parts.scheme != 'http':
+        raise ValueError(f"Unsupported URL scheme: {parts.scheme}")
+
+    path = parts.path or '/'
+    if parts.query:
+        path = f"{path}?{parts.query}"
+
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    try:
+        writer.write(f"GET {path} HTTP/1.0\r\nHost: {parts.netloc}\r\n"
+                     f"Accept: application/json\r\nConnection: close\r\n\r\n".encode('ascii'))
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+
+    head, _, body = response.partition(b'\r\n\r\n')
+    status_line = head.split(b'\r\n', 1)[0].split()
+    status = int(status_line[1]) if len(status_line) > 1 else 0
+    if not 200 <= status < 300:
+        raise IOError(f"HTTP {status} from {parts.netloc}")
+
+    return json.loads(body)
@@ -0,0 +1,203 @@
+"""
+Rate limiting module for Mini SIEM
+Token bucket with priority scheduling for calls to quota-limited services
+"""
+
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+import threading
+from typing import Dict, Any, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Lookup priorities, most urgent first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+PRIORITY_NAMES = ('high', 'normal', 'low')
+
+
+class TokenBucket:
+    """
+    Token bucket: rate tokens per second, holding at most burst
+
+    Not thread-safe on its own; PriorityRateLimiter calls it under its lock.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Initialize token bucket
+
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity (calls allowed back to back)
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        """Add the tokens earned since the last refill"""
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is)"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> bool:
+        """Take a token if one is available"""
+        if self.wait_time(now) > 0:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class PriorityRateLimiter:
+    """
+    Token bucket whose waiting callers are served in priority order
+
+    Callers queue by priority (then arrival) and the head of the queue gets
+    the next token. Each priority waits at most its max_wait before the call
+    is deferred (acquire returns False); under pressure lower priorities are
+    dropped without waiting: LOW once shed_depth callers are queued, and
+    everything but HIGH once max_queue are.
+    """
+
+    def __init__(self, rate: float, burst: int = 1,
+                 max_wait: Sequence[float] = (10.0, 2.0, 0.0),
+                 shed_depth: int = 100, max_queue: int = 1000):
+        """
+        Initialize rate limiter
+
+        Args:
+            rate: Calls allowed per second
+            burst: Calls allowed back to back after an idle period
+            max_wait: Longest seconds a caller waits, per priority
+                (HIGH, NORMAL, LOW)
+            shed_depth: Queue length at which LOW calls are dropped
+            max_queue: Queue length at which NORMAL calls are dropped too
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.max_wait = tuple(max_wait)
+        self.shed_depth = shed_depth
+        self.max_queue = max_queue
+
+        self._queue = []  # heap of (priority, sequence)
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self.stats = {name: {'granted': 0, 'deferred': 0, 'dropped': 0,
+                             'wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+                      for name in PRIORITY_NAMES}
+
+    def _enqueue(self, priority: int) -> Optional[Tuple[int, int, float, float]]:
+        """Queue a caller, or drop it if the queue is too long (under the lock)"""
+        depth = len(self._queue)
+        if priority != PRIORITY_HIGH and (
+                depth >= self.max_queue or (priority == PRIORITY_LOW and depth >= self.shed_depth)):
+            self.stats[PRIORITY_NAMES[priority]]['dropped'] += 1
+            return None
+
+        now = time.monotonic()
+        entry = (priority, next(self._sequence))
+        heapq.heappush(self._queue, entry)
+        return entry + (now, now + self.max_wait[priority])
+
+    def _poll(self, ticket: Tuple[int, int, float, float]) -> Tuple[Optional[bool], float]:
+        """
+        Try to grant a queued caller a token (under the lock)
+
+        Returns:
+            (True, 0) when granted, (False, 0) when deferred, or
+            (None, seconds to wait before polling again)
+        """
+        priority, sequence, queued_at, deadline = ticket
+        now = time.monotonic()
+        wait = self.bucket.wait_time(now)
+
+        if self._queue[0] == (priority, sequence) and self.bucket.take(now):
+            heapq.heappop(self._queue)
+            self._record(priority, 'granted', now - queued_at)
+            self._cond.notify_all()
+            return True, 0.0
+
+        if now >= deadline:
+            self._queue.remove((priority, sequence))
+            heapq.heapify(self._queue)
+            self._record(priority, 'deferred', now - queued_at)
+            self._cond.notify_all()
+            return False, 0.0
+
+        return None, max(0.001, min(wait or 0.05, deadline - now))
+
+    def _record(self, priority: int, outcome: str, waited: float):
+        """Count an outcome and its queue wait"""
+        stats = self.stats[PRIORITY_NAMES[priority]]
+        stats[outcome] += 1
+        stats['wait_seconds'] += waited
+        if waited > stats['max_wait_seconds']:
+            stats['max_wait_seconds'] = waited
+
+    def acquire(self, priority: int = PRIORITY_NORMAL) -> bool:
+        """
+        Wait for permission to make one call
+
+        Args:
+            priority: PRIORITY_HIGH, PRIORITY_NORMAL or PRIORITY_LOW
+
+        Returns:
+            True if the call may be made, False if it was deferred or dropped
+        """
+        with self._cond:
+            ticket = self._enqueue(priority)
+            if ticket is None:
+                return False
+            while True:
+                granted, delay = self._poll(ticket)
+                if granted is not None:
+                    return granted
+                self._cond.wait(delay)
+
+    async def acquire_async(self, priority: int = PRIORITY_NORMAL) -> bool:
+        """acquire() for coroutines: waits without blocking the event loop"""
+        with self._cond:
+            ticket = self._enqueue(priority)
+        if ticket is None:
+            return False
+        while True:
+            with self._cond:
+                granted, delay = self._poll(ticket)
+            if granted is not None:
+                return granted
+            # Thread waiters are notified; coroutines re-check at least every 50ms
+            await asyncio.sleep(min(delay, 0.05))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get limiter statistics
+
+        Returns:
+            Dictionary with the rate, tokens left, queue depth and, per
+            priority, granted/deferred/dropped counts and queue wait times
+        """
+        with self._cond:
+            now = time.monotonic()
+            self.bucket.wait_time(now)
+            by_priority = {}
+            for name, stats in self.stats.items():
+                stats = dict(stats)
+                waited = stats['granted'] + stats['deferred']
+                stats['avg_wait_seconds'] = stats['wait_seconds'] / waited if waited else 0.0
+                by_priority[name] = stats
+            return {
+                'rate': self.bucket.rate,
+                'burst': self.bucket.burst,
+                'tokens': round(self.bucket.tokens, 3),
+                'queue_depth': len(self._queue),
+                'priorities': by_priority
+            }
@@ -0,0 +1,182 @@
+"""
+Stub enrichment provider module for Mini SIEM
+Local IP-API.com stand-in with configurable latency and error injection
+"""
+
+import json
+import time
+import zlib
+import random
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Made-up locations handed out by address hash
+STUB_LOCATIONS = (
+    ('Testland', 'TL', 'Test City', 'North', 10.0, 20.0, 'Europe/Test'),
+    ('Mockovia', 'MV', 'Mockburg', 'Central', -12.5, 48.25, 'Africa/Mock'),
+    ('Stubistan', 'SS', 'Stub Town', 'East', 35.75, 101.5, 'Asia/Stub'),
+    ('Fakeland', 'FK', 'Fakesville', 'West', 44.0, -93.0, 'America/Fake')
+)
+
+
+class StubProviderServer:
+    """
+    HTTP server answering IP-API.com requests without the Internet
+
+    Serves GET /json/{ip} and POST /batch (a JSON list of addresses) with
+    deterministic records derived from each address, so IPAPIProvider can
+    be pointed at it for tests, benchmarks and load tests. Every request
+    waits latency seconds (plus up to jitter more) and fails with
+    error_status at error_rate probability.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, error_status: int = 503,
+                 max_batch: int = 100, seed: Optional[int] = None):
+        """
+        Initialize stub server
+
+        Args:
+            host: Address to listen on
+            port: Port to listen on (0 picks a free one)
+            latency: Seconds every request waits before answering
+            jitter: Extra random delay, up to this many seconds
+            error_rate: Fraction of requests answered with error_status
+            error_status: HTTP status of injected errors (429 mimics a
+                rate-limited provider)
+            max_batch: Largest batch accepted (IP-API.com allows 100)
+            seed: Random seed for jitter and error injection
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.max_batch = max_batch
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'batch_requests': 0, 'ips': 0, 'errors': 0}
+
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        """Base URL to give IPAPIProvider"""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'StubProviderServer':
+        """Serve requests on a background thread"""
+        self.thread = threading.Thread(target=self.server.serve_forever, name='stub-provider',
+                                       daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        if self.thread is not None:
+            self.server.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.server.server_close()
+
+    def serve_forever(self):
+        """Serve requests on the calling thread until interrupted"""
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+
+    @staticmethod
+    def make_record(ip: str) -> Dict[str, Any]:
+        """Build the IP-API.com style response for an address"""
+        digest = zlib.crc32(ip.encode())
+        country, code, city, region, lat, lon, timezone = STUB_LOCATIONS[digest % len(STUB_LOCATIONS)]
+        asn = 64512 + digest % 1000
+        return {
+            'status': 'success',
+            'country': country,
+            'countryCode': code,
+            'region': region,
+            'city': city,
+            'lat': lat,
+            'lon': lon,
+            'timezone': timezone,
+            'isp': f"Stub ISP {asn}",
+            'org': f"Stub Org {asn}",
+            'as': f"AS{asn} Stub Networks",
+            'proxy': False,
+            'query': ip
+        }
+
+    def _answer(self, ips: int) -> Optional[int]:
+        """Sleep for the configured latency; return an error status to inject, if any"""
+        with self._lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.error_rate and self._random.random() < self.error_rate
+            self.stats['requests'] += 1
+            self.stats['ips'] += ips
+            if ips > 1:
+                self.stats['batch_requests'] += 1
+            if fail:
+                self.stats['errors'] += 1
+        if delay:
+            time.sleep(delay)
+        return self.error_status if fail else None
+
+    def _make_handler(self):
+        """Build the request handler class bound to this server"""
+        stub = self
+
+        class StubHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes: without this, keep-alive
+            # clients wait on delayed ACKs and every request looks 40ms slower
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if not self.path.startswith('/json/'):
+                    return self._send(404, {'status': 'fail', 'message': 'invalid query'})
+                ip = self.path[len('/json/'):].split('?', 1)[0]
+                status = stub._answer(1)
+                if status:
+                    return self._send(status, {'status': 'fail', 'message': 'injected error'})
+                self._send(200, stub.make_record(ip))
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    ips = json.loads(self.rfile.read(length))
+                except ValueError:
+                    ips = None
+                if self.path.split('?', 1)[0] != '/batch' or not isinstance(ips, list):
+                    return self._send(400, {'status': 'fail', 'message': 'invalid request'})
+                if len(ips) > stub.max_batch:
+                    return self._send(422, {'status': 'fail', 'message': 'too many queries'})
+                status = stub._answer(len(ips))
+                if status:
+                    return self._send(status, {'status': 'fail', 'message': 'injected error'})
+                self._send(200, [stub.make_record(str(ip)) for ip in ips])
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return StubHandler
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get request counters"""
+        with self._lock:
+            return dict(self.stats)
@@ -0,0 +1,306 @@
+"""
+File tailing module for Mini SIEM
+Wakes the collector up when the alert log is written to
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import asyncio
+import struct
+import ctypes
+import ctypes.util
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class PollingWatcher:
+    """Portable watcher that polls the file size and modification time"""
+
+    def __init__(self, path: str, interval: float = 0.25):
+        """
+        Initialize polling watcher
+
+        Args:
+            path: File to watch
+            interval: Seconds between stat() calls while waiting
+        """
+        self.path = path
+        self.interval = interval
+        self._wake = threading.Event()
+        self._last_stat = self._stat()
+
+    def _stat(self):
+        """Get the (size, mtime, inode) triple of the watched file"""
+        try:
+            st = os.stat(self.path)
+            return (st.st_size, st.st_mtime_ns, st.st_ino)
+        except OSError:
+            return None
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Block until the file changes or the timeout expires
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if the file changed, False on timeout or wake()
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self._stat()
+            if current != self._last_stat:
+                self._last_stat = current
+                return True
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self._wake.wait(min(self.interval, remaining)):
+                self._wake.clear()
+                return False
+
+    async def wait_async(self, timeout: float) -> bool:
+        """
+        Wait for the file to change without blocking the event loop
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if the file changed, False on timeout
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self._stat()
+            if current != self._last_stat:
+                self._last_stat = current
+                return True
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(self.interval, remaining))
+
+    def drain(self):
+        """Forget changes seen so far"""
+        self._last_stat = self._stat()
+
+    def wake(self):
+        """Interrupt a blocked wait() from another thread"""
+        self._wake.set()
+
+    def close(self):
+        """Release watcher resources"""
+        self.wake()
+
+
+class InotifyWatcher:
+    """Linux watcher that blocks on inotify events instead of polling"""
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_NONBLOCK = os.O_NONBLOCK
+    IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+
+    WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_DELETE_SELF | IN_MOVE_SELF
+    DIR_WATCH_MASK = IN_CREATE | IN_MOVED_TO
+
+    # struct inotify_event header: wd, mask, cookie, len
+    EVENT_HEADER = struct.Struct('iIII')
+
+    _libc = None
+
+    def __init__(self, path: str):
+        """
+        Initialize inotify watcher
+
+        Args:
+            path: File to watch
+
+        Raises:
+            OSError: If inotify is unavailable or the watch cannot be added
+        """
+        libc = self._load_libc()
+        if libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+
+        self.path = path
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+        self.file_wd = libc.inotify_add_watch(self.fd, os.fsencode(path), self.WATCH_MASK)
+        if self.file_wd < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, os.strerror(err), path)
+
+        # The parent directory is watched too, so that a new file created in
+        # place of a rotated one wakes us up. Only events naming our file count.
+        self.name = os.fsencode(os.path.basename(path))
+        self.dir_wd = libc.inotify_add_watch(
+            self.fd, os.fsencode(os.path.dirname(os.path.abspath(path))), self.DIR_WATCH_MASK)
+
+        # Self-pipe so that wake() can interrupt a blocked select()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+
+    @classmethod
+    def _load_libc(cls):
+        """Load libc and check that it exports the inotify calls"""
+        if cls._libc is None and sys.platform.startswith('linux'):
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+                libc.inotify_init1.argtypes = [ctypes.c_int]
+                libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+                cls._libc = libc
+            except (OSError, AttributeError):
+                cls._libc = None
+        return cls._libc
+
+    @classmethod
+    def available(cls) -> bool:
+        """Check whether inotify can be used on this system"""
+        return cls._load_libc() is not None
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Block until the file is written to or the timeout expires
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if an inotify event arrived, False on timeout or wake()
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = max(deadline - time.monotonic(), 0)
+            try:
+                readable, _, _ = select.select([self.fd, self._wake_r], [], [], remaining)
+            except InterruptedError:
+                return False
+
+            if self._wake_r in readable:
+                self._read_all(self._wake_r)
+                return False
+            if self.fd in readable and self._read_events():
+                return True
+            if remaining <= 0:
+                return False
+
+    async def wait_async(self, timeout: float) -> bool:
+        """
+        Wait for the file to be written to without blocking the event loop
+
+        The inotify descriptor is registered with the running loop, so no
+        thread is parked in select() while waiting.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if an inotify event arrived, False on timeout
+        """
+        loop = asyncio.get_running_loop()
+        readable = asyncio.Event()
+        loop.add_reader(self.fd, readable.set)
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(readable.wait(), remaining)
+                except asyncio.TimeoutError:
+                    return False
+                readable.clear()
+                if self._read_events():
+                    return True
+        finally:
+            loop.remove_reader(self.fd)
+
+    def _read_events(self) -> bool:
+        """Read queued events and report whether any concern the watched file"""
+        relevant = False
+        try:
+            while True:
+                buf = os.read(self.fd, 4096)
+                if not buf:
+                    break
+                offset = 0
+                while offset + self.EVENT_HEADER.size <= len(buf):
+                    wd, mask, cookie, length = self.EVENT_HEADER.unpack_from(buf, offset)
+                    offset += self.EVENT_HEADER.size
+                    name = buf[offset:offset + length].rstrip(b'\0')
+                    offset += length
+                    if wd != self.dir_wd or name == self.name:
+                        relevant = True
+        except (BlockingIOError, OSError):
+            pass
+        return relevant
+
+    def drain(self):
+        """Discard events that are already queued"""
+        self._read_all(self.fd)
+
+    @staticmethod
+    def _read_all(fd: int):
+        """Read a non-blocking descriptor until it is empty"""
+        try:
+            while os.read(fd, 4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def wake(self):
+        """Interrupt a blocked wait() from another thread"""
+        try:
+            os.write(self._wake_w, b'\0')
+        except OSError:
+            pass
+
+    def close(self):
+        """Release the inotify descriptor"""
+        for fd in (self.fd, self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def create_watcher(path: str, mode: str = 'auto', poll_interval: float = 0.25):
+    """
+    Create a file watcher for the requested tail mode
+
+    Args:
+        path: File to watch
+        mode: 'inotify', 'poll' or 'auto' (inotify when available)
+        poll_interval: Seconds between checks for the polling watcher
+
+    Returns:
+        InotifyWatcher or PollingWatcher instance
+    """
+    if mode in ('auto', 'inotify'):
+        try:
+            return InotifyWatcher(path)
+        except OSError as e:
+            if mode == 'inotify':
+                raise
+            logger.info(f"inotify unavailable ({str(e)}), falling back to polling")
+
+    return PollingWatcher(path, interval=poll_interval)
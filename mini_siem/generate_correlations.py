@@ -3,7 +3,8 @@
 Generate test data for correlation detection
 """
 
-from core.database import DatabaseManager
+import config
+from core.database import create_database_manager
 from core.correlator import CorrelationEngine
 from datetime import datetime, timedelta
 import random
@@ -11,7 +12,7 @@ import sys
 
 def generate_test_correlations():
     """Generate alerts that will trigger correlation patterns"""
-    db = DatabaseManager()
+    db = create_database_manager(config)
     
     print("🔄 Generating correlated alert data...")
     
@@ -20,6 +21,7 @@ def generate_test_correlations():
     signatures = ['Port Scan', 'SQL Injection', 'Buffer Overflow', 'Malware C&C', 'DDoS Attack']
     
     print(f"\n📊 Creating 25 alerts from {test_ip_1} (High Volume Attack)...")
+    alerts = []
     for i in range(25):
         alert = {
             'timestamp': (datetime.now() - timedelta(minutes=random.randint(0, 8))).strftime('%Y-%m-%d %H:%M:%S'),
@@ -30,12 +32,14 @@ def generate_test_correlations():
             'severity': random.choice(['HIGH', 'HIGH', 'MEDIUM']),
             'details': f'Alert {i+1} for correlation test'
         }
-        db.insert_alert(alert)
+        alerts.append(alert)
+    db.insert_alerts(alerts)
     print(f"   ✓ {25} alerts created")
     
     # Pattern 2: Multi-signature attack from another IP
     test_ip_2 = '203.0.113.50'
     print(f"\n📊 Creating 18 alerts from {test_ip_2} (Multi-Signature Attack)...")
+    alerts = []
     for i in range(18):
         alert = {
             'timestamp': (datetime.now() - timedelta(minutes=random.randint(0, 8))).strftime('%Y-%m-%d %H:%M:%S'),
@@ -46,7 +50,8 @@ def generate_test_correlations():
             'severity': random.choice(['MEDIUM', 'HIGH']),
             'details': f'Multi-sig alert {i+1}'
         }
-        db.insert_alert(alert)
+        alerts.append(alert)
+    db.insert_alerts(alerts)
     print(f"   ✓ {18} alerts created")
     
     # Analyze and report
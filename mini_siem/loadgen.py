@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Mini SIEM Load Generator
+Writes synthetic Snort alerts to a file at a target rate, or replays a
+captured alert log at N times real speed, to load-test the collector
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.loadgen import LoadGenerator, write_lines, replay_log, parse_rate
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Mini SIEM load generator')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate = commands.add_parser('generate', help='Write synthetic alerts at a target rate')
+    generate.add_argument('output', help='Alert file to append to (e.g. the collector\'s SNORT_ALERT_FILE)')
+    generate.add_argument('--rate', type=parse_rate, default=1000.0,
+                          help='Lines per second, e.g. 50k (0 = as fast as possible)')
+    generate.add_argument('--count', type=int, default=None, help='Lines to write')
+    generate.add_argument('--duration', type=float, default=None, help='Seconds to run')
+    generate.add_argument('--format', choices=['fast', 'csv'], default='fast', help='Line format')
+    generate.add_argument('--seed', type=int, default=42, help='Random seed')
+    generate.add_argument('--attackers', type=int, default=1000, help='Source address pool size')
+    generate.add_argument('--zipf', type=float, default=1.1,
+                          help='Attacker skew exponent (0 = uniform)')
+    generate.add_argument('--targets', type=int, default=50, help='Internal destination hosts')
+    generate.add_argument('--scan-probability', type=float, default=0.001,
+                          help='Chance per alert of starting a port scan burst')
+    generate.add_argument('--scan-length', type=int, default=200, help='Ports probed per scan burst')
+
+    replay = commands.add_parser('replay', help='Replay a captured alert log at N times speed')
+    replay.add_argument('source', help='Captured alert log (.gz/.zst/.bz2 accepted)')
+    replay.add_argument('output', help='Alert file to append to')
+    replay.add_argument('--speed', type=float, default=1.0,
+                        help='Speed multiplier (0 = as fast as possible)')
+    replay.add_argument('--retime', action='store_true',
+                        help='Rewrite timestamps to the replay time')
+
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        if args.count is None and args.duration is None:
+            parser.error('generate needs --count or --duration')
+
+        generator = LoadGenerator(seed=args.seed, attackers=args.attackers, zipf_exponent=args.zipf,
+                                  targets=args.targets, scan_probability=args.scan_probability,
+                                  scan_length=args.scan_length)
+        pace = f"{args.rate:,.0f} lines/sec" if args.rate else "full speed"
+        print(f"→ Writing {args.format} alerts to {args.output} at {pace}")
+        result = write_lines(args.output, generator.lines(args.count, args.rate or 10000, args.format),
+                             rate=args.rate, duration=args.duration)
+    else:
+        print(f"→ Replaying {args.source} into {args.output} at {args.speed:g}x")
+        result = replay_log(args.source, args.output, speed=args.speed, retime=args.retime)
+
+    print(f"✓ {result['lines']:,} lines in {result['elapsed']:.2f}s "
+          f"({result['lines_per_sec']:,.0f} lines/sec)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,7 +5,9 @@ Coordinates data collection, enrichment, storage, and correlation
 
 import logging
 import time
+import asyncio
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
@@ -13,10 +15,13 @@ from datetime import datetime
 import sys
 sys.path.insert(0, str(Path(__file__).parent))
 
-from core.database import DatabaseManager
-from core.enricher import IPEnricher
+import config
+from core.database import create_database_manager
+from core.enricher import AsyncIPEnricher, build_enricher
 from core.collector import AlertCollector, MockAlertGenerator
 from core.correlator import CorrelationEngine
+from core.pipeline import AlertPipeline, AsyncAlertPipeline
+from core.deferred import DeferredEnricher
 
 # Setup logging
 logging.basicConfig(
@@ -34,28 +39,105 @@ logger = logging.getLogger(__name__)
 class SIEMOrchestrator:
     """Main SIEM system orchestrator"""
 
-    def __init__(self, use_mock_alerts: bool = False):
+    RUNTIMES = ('thread', 'asyncio')
+    ENRICHMENT_MODES = ('inline', 'deferred')
+
+    def __init__(self, use_mock_alerts: bool = False, runtime: str = None,
+                 enrichment_mode: str = None):
         """
         Initialize SIEM orchestrator
         
         Args:
             use_mock_alerts: Use mock alerts for testing (True) or real Snort alerts (False)
+            runtime: 'thread' (worker threads per stage) or 'asyncio' (one
+                event loop); defaults to config.ORCHESTRATOR_RUNTIME
+            enrichment_mode: 'inline' (enrich, then store) or 'deferred'
+                (store at once, enrich in the background); defaults to
+                config.IP_ENRICHMENT_MODE
         """
+        self.runtime = runtime or config.ORCHESTRATOR_RUNTIME
+        if self.runtime not in self.RUNTIMES:
+            raise ValueError(f"Unknown runtime: {self.runtime}")
+
         self.use_mock_alerts = use_mock_alerts
-        self.db_manager = DatabaseManager()
-        self.ip_enricher = IPEnricher(use_free_api=True)
+        self.db_manager = create_database_manager(config)
+        self.ip_enricher = build_enricher(config, self.db_manager, process='orchestrator')
+        self.enrichment_cache = self.ip_enricher.cache
         self.correlation_engine = CorrelationEngine(self.db_manager)
-        self.alert_collector = AlertCollector()
+        self.alert_collector = AlertCollector(
+            alert_file=config.SNORT_ALERT_FILE,
+            tail_mode=config.COLLECTION_TAIL_MODE,
+            coalesce_delay=config.COLLECTION_COALESCE_DELAY,
+            poll_interval=config.COLLECTION_POLL_INTERVAL,
+            checkpoint_file=str(Path(__file__).parent / config.COLLECTION_CHECKPOINT_FILE)
+        )
+        self.enrichment_mode = enrichment_mode or config.IP_ENRICHMENT_MODE
+        if self.enrichment_mode not in self.ENRICHMENT_MODES:
+            raise ValueError(f"Unknown enrichment mode: {self.enrichment_mode}")
+        # Deferred mode stores alerts unenriched; the backfill also retries
+        # lookups that were left pending in inline mode
+        self.inline_enrichment = self.enrichment_mode == 'inline'
+        self.deferred_enricher = DeferredEnricher(
+            self.ip_enricher,
+            self.db_manager,
+            batch_size=config.IP_ENRICHMENT_BACKFILL_BATCH_SIZE,
+            interval=config.IP_ENRICHMENT_BACKFILL_INTERVAL
+        )
+
+        # The asyncio pipeline is created on its event loop in _async_main
+        self.pipeline = None
+        if self.runtime == 'thread':
+            self.pipeline = AlertPipeline(
+                self.ip_enricher if self.inline_enrichment else None,
+                self.db_manager,
+                enrich_workers=config.PIPELINE_ENRICH_WORKERS,
+                persist_workers=config.PIPELINE_PERSIST_WORKERS,
+                queue_size=config.PIPELINE_QUEUE_SIZE,
+                persist_batch_size=config.PIPELINE_PERSIST_BATCH_SIZE,
+                persist_max_latency=config.PIPELINE_PERSIST_MAX_LATENCY,
+                on_checkpoint=self.alert_collector.commit_checkpoint
+            )
         self.running = False
         self.thread = None
+        self.correlation_thread = None
+        self._stop_event = threading.Event()
+        self._loop = None
+        self._async_stop = None
+        self.last_correlation = None
+        self.last_retention = None
+        self.stats = {
+            'batches_collected': 0,
+            'alerts_collected': 0,
+            'correlation_runs': 0,
+            'last_correlation_seconds': 0.0,
+            'partitions_dropped': 0
+        }
 
     def start(self):
         """Start the SIEM system"""
         logger.info("Starting Mini SIEM...")
         self.running = True
 
-        # Start collection thread
-        self.thread = threading.Thread(target=self._collection_loop, daemon=True)
+        warmed = self.enrichment_cache.warm()
+        if warmed:
+            logger.info(f"Loaded {warmed:,} cached IP enrichments")
+        self._stop_event.clear()
+        self.deferred_enricher.start()
+
+        if self.runtime == 'asyncio':
+            self.thread = threading.Thread(target=self._run_async, name='asyncio', daemon=True)
+            self.thread.start()
+            logger.info("Mini SIEM started successfully (asyncio runtime)")
+            return
+
+        # Stages are started downstream first so nothing is queued unconsumed
+        self.pipeline.start()
+
+        self.correlation_thread = threading.Thread(target=self._correlation_loop,
+                                                   name='correlate', daemon=True)
+        self.correlation_thread.start()
+
+        self.thread = threading.Thread(target=self._collection_loop, name='collect', daemon=True)
         self.thread.start()
 
         logger.info("Mini SIEM started successfully")
@@ -64,17 +146,39 @@ class SIEMOrchestrator:
         """Stop the SIEM system"""
         logger.info("Stopping Mini SIEM...")
         self.running = False
+        self._stop_event.set()
+        self.alert_collector.interrupt()
+
+        if self.runtime == 'asyncio':
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._async_stop.set)
+            if self.thread:
+                self.thread.join(timeout=15)
+        else:
+            if self.thread:
+                self.thread.join(timeout=5)
+
+            # Store what was already collected before shutting down
+            self.pipeline.stop()
 
-        if self.thread:
-            self.thread.join(timeout=5)
+            if self.correlation_thread:
+                self.correlation_thread.join(timeout=5)
 
         if self.alert_collector:
             self.alert_collector.stop_collection()
 
+        self.deferred_enricher.stop()
+
+        # Write out enrichment results still queued for the persistent cache,
+        # then close the pooled database connections
+        self.ip_enricher.close()
+        self.enrichment_cache.close()
+        self.db_manager.close()
+
         logger.info("Mini SIEM stopped")
 
     def _collection_loop(self):
-        """Main collection and processing loop"""
+        """Collect stage: read alerts and hand them to the pipeline"""
         
         if not self.use_mock_alerts:
             # Try to start real alert collection
@@ -87,44 +191,165 @@ class SIEMOrchestrator:
                 # Collect new alerts
                 if self.use_mock_alerts:
                     alerts = MockAlertGenerator.generate_batch(count=2)
+                    checkpoint = None
                 else:
-                    alerts = self.alert_collector.read_new_alerts()
+                    alerts, checkpoint = self._read_batch()
 
-                if alerts:
-                    self._process_alerts(alerts)
+                # Blocks while the enrich queue is full; the read position is
+                # committed by the persist stage once the batch is stored
+                self.pipeline.submit(alerts, checkpoint)
+                self.stats['batches_collected'] += 1
+                self.stats['alerts_collected'] += len(alerts)
 
-                # Run correlation analysis every 30 seconds
-                if time.time() % 30 < 1:
-                    self._analyze_correlations()
-
-                # Sleep before next collection
-                time.sleep(5)
+                self._wait_for_next_batch()
 
             except Exception as e:
                 logger.error(f"Error in collection loop: {str(e)}")
-                time.sleep(10)
+                self._stop_event.wait(10)
+
+    def _read_batch(self):
+        """Read new alerts along with the read position after them"""
+        alerts = self.alert_collector.read_new_alerts()
+        return alerts, self.alert_collector.checkpoint_state()
+
+    def _wait_for_next_batch(self):
+        """Sleep until new alerts are available"""
+        if self.use_mock_alerts:
+            self._stop_event.wait(config.MOCK_ALERT_INTERVAL)
+            return
+
+        # Block on the tailer rather than a fixed sleep: writes wake us up
+        # immediately, and an idle file is rechecked every COLLECTION_INTERVAL
+        self.alert_collector.wait_for_alerts(timeout=config.COLLECTION_INTERVAL)
+
+    def _correlation_loop(self):
+        """Correlate stage: analyze stored alerts on a fixed interval"""
+        while self.running:
+            self._run_correlation()
+            if self._stop_event.wait(config.CORRELATION_ANALYSIS_INTERVAL):
+                break
+
+    def _run_correlation(self):
+        """Run one correlation pass and record its timing"""
+        start = time.monotonic()
+        self._analyze_correlations()
+        self.last_correlation = datetime.now()
+        self.stats['correlation_runs'] += 1
+        self.stats['last_correlation_seconds'] = time.monotonic() - start
+        self._apply_retention()
+
+    def _apply_retention(self):
+        """Drop expired alert partitions, at most every ALERT_RETENTION_INTERVAL"""
+        now = time.monotonic()
+        if self.last_retention is not None and now - self.last_retention < config.ALERT_RETENTION_INTERVAL:
+            return
+        self.last_retention = now
+        try:
+            self.stats['partitions_dropped'] += self.db_manager.apply_retention(
+                config.ALERT_RETENTION_DAYS)
+        except Exception as e:
+            logger.error(f"Error applying alert retention: {str(e)}")
+
+    def _run_async(self):
+        """Thread target running the asyncio runtime to completion"""
+        try:
+            asyncio.run(self._async_main())
+        except Exception as e:
+            logger.error(f"asyncio runtime failed: {str(e)}")
+
+    async def _async_main(self):
+        """
+        asyncio runtime: collect, enrich, persist and correlate on one loop
+
+        Enrichment lookups are coroutines (bounded by
+        ASYNC_ENRICH_CONCURRENCY) instead of threads, file reads run in the
+        loop's default executor, and all database work runs on a dedicated
+        executor so SQLite never blocks the loop.
+        """
+        self._async_stop = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        if self._stop_event.is_set():
+            self._async_stop.set()
+
+        db_executor = ThreadPoolExecutor(max_workers=config.ASYNC_DB_WORKERS,
+                                         thread_name_prefix='siem-db')
+        async_enricher = None
+        if self.inline_enrichment:
+            async_enricher = AsyncIPEnricher(self.ip_enricher,
+                                             max_concurrency=config.ASYNC_ENRICH_CONCURRENCY,
+                                             timeout=config.IP_ENRICHMENT_TIMEOUT,
+                                             db_executor=db_executor)
+        self.pipeline = AsyncAlertPipeline(
+            async_enricher,
+            self.db_manager,
+            db_executor,
+            enrich_concurrency=config.ASYNC_ENRICH_CONCURRENCY,
+            queue_size=config.PIPELINE_QUEUE_SIZE,
+            persist_batch_size=config.PIPELINE_PERSIST_BATCH_SIZE,
+            persist_max_latency=config.PIPELINE_PERSIST_MAX_LATENCY,
+            on_checkpoint=self.alert_collector.commit_checkpoint
+        )
+        self.pipeline.start()
+
+        collect = asyncio.ensure_future(self._collect_async())
+        correlate = asyncio.ensure_future(self._correlate_async(db_executor))
+        try:
+            await self._async_stop.wait()
+        finally:
+            # Stop reading, store what was already collected, then stop
+            # correlation; an interrupted batch is re-read after a restart
+            collect.cancel()
+            await asyncio.gather(collect, return_exceptions=True)
+            await self.pipeline.stop()
+            correlate.cancel()
+            await asyncio.gather(correlate, return_exceptions=True)
+            db_executor.shutdown(wait=True)
+
+    async def _collect_async(self):
+        """Collect stage for the asyncio runtime"""
+        loop = asyncio.get_running_loop()
 
-    def _process_alerts(self, alerts):
-        """Process collected alerts"""
-        for alert in alerts:
+        if not self.use_mock_alerts:
+            if not await loop.run_in_executor(None, self.alert_collector.start_collection):
+                logger.warning("Could not start real alert collection, falling back to mock alerts")
+                self.use_mock_alerts = True
+
+        while True:
             try:
-                # Enrich alert with IP information
-                enriched_alert = self.ip_enricher.enrich_alert(alert)
+                if self.use_mock_alerts:
+                    alerts = MockAlertGenerator.generate_batch(count=2)
+                    checkpoint = None
+                else:
+                    alerts, checkpoint = await loop.run_in_executor(None, self._read_batch)
 
-                # Store in database
-                alert_id = self.db_manager.insert_alert(enriched_alert)
+                await self.pipeline.submit(alerts, checkpoint)
+                self.stats['batches_collected'] += 1
+                self.stats['alerts_collected'] += len(alerts)
 
-                logger.info(f"Alert stored: {alert['signature']} from {alert['src_ip']} "
-                           f"[ID: {alert_id}, Severity: {alert['severity']}]")
+                if self.use_mock_alerts:
+                    await asyncio.sleep(config.MOCK_ALERT_INTERVAL)
+                else:
+                    await self.alert_collector.wait_for_alerts_async(config.COLLECTION_INTERVAL)
 
             except Exception as e:
-                logger.error(f"Failed to process alert: {str(e)}")
+                logger.error(f"Error in collection loop: {str(e)}")
+                await asyncio.sleep(10)
+
+    async def _correlate_async(self, db_executor):
+        """Correlate stage for the asyncio runtime"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await loop.run_in_executor(db_executor, self._run_correlation)
+            await asyncio.sleep(config.CORRELATION_ANALYSIS_INTERVAL)
 
     def _analyze_correlations(self):
         """Analyze alerts for suspicious patterns"""
         try:
             detections = self.correlation_engine.analyze_alerts()
 
+            # Look up attackers in active correlations ahead of other IPs
+            self.ip_enricher.set_priority_ips(d['src_ip'] for d in detections if d.get('src_ip'))
+
             for detection in detections:
                 try:
                     # Store correlation in database
@@ -146,9 +371,32 @@ class SIEMOrchestrator:
         return {
             'running': self.running,
             'use_mock_alerts': self.use_mock_alerts,
+            'runtime': self.runtime,
+            'enrichment_mode': self.enrichment_mode,
             'timestamp': datetime.now().isoformat(),
-            'stats': stats
+            'stats': stats,
+            'pipeline': self.get_pipeline_metrics(),
+            'enrichment_cache': self.ip_enricher.get_cache_stats(),
+            'enrichment_lookups': self.ip_enricher.get_lookup_stats(),
+            'deferred_enrichment': self.deferred_enricher.get_stats()
+        }
+
+    def get_pipeline_metrics(self):
+        """Get queue-depth gauges and counters for every stage"""
+        metrics = self.pipeline.get_metrics() if self.pipeline else {}
+        metrics['collect'] = {
+            'workers': 1,
+            'batches': self.stats['batches_collected'],
+            'alerts': self.stats['alerts_collected']
+        }
+        metrics['correlate'] = {
+            'workers': 1,
+            'runs': self.stats['correlation_runs'],
+            'last_run': self.last_correlation.isoformat() if self.last_correlation else None,
+            'last_run_seconds': self.stats['last_correlation_seconds'],
+            'partitions_dropped': self.stats['partitions_dropped']
         }
+        return metrics
 
 
 def main():
@@ -157,17 +405,32 @@ def main():
 
     parser = argparse.ArgumentParser(description='Mini SIEM - Security Information and Event Management')
     parser.add_argument('--mock', action='store_true', help='Use mock alerts for testing')
+    parser.add_argument('--runtime', choices=SIEMOrchestrator.RUNTIMES, default=None,
+                        help=f"Processing runtime (default: {config.ORCHESTRATOR_RUNTIME})")
+    parser.add_argument('--enrichment', choices=SIEMOrchestrator.ENRICHMENT_MODES, default=None,
+                        help=f"Enrich before storing or in the background (default: {config.IP_ENRICHMENT_MODE})")
     parser.add_argument('--web-only', action='store_true', help='Only run web interface (manual alert loading)')
+    parser.add_argument('--backfill', nargs='+', metavar='FILE', help='Import archived Snort alert logs and exit')
+    parser.add_argument('--workers', type=int, default=None, help='Parser processes for --backfill (default: CPU count)')
     args = parser.parse_args()
 
-    if args.web_only:
+    if args.backfill:
+        from core.backfill import BackfillImporter, log_progress
+        importer = BackfillImporter(create_database_manager(config), workers=args.workers)
+        for path in args.backfill:
+            totals = importer.import_file(path, progress=log_progress)
+            logger.info(f"Backfilled {totals['alerts']:,} alerts from {path} "
+                        f"({totals['rejected']:,} rejected lines) in {totals['elapsed']:.1f}s "
+                        f"[{totals['lines_per_sec']:,.0f} lines/sec]")
+    elif args.web_only:
         # Just run the web interface
         from app.main import app
         logger.info("Starting Mini SIEM Web Interface only (no background collection)")
         app.run(host='0.0.0.0', port=5000, debug=False)
     else:
         # Start full SIEM with background collection
-        siem = SIEMOrchestrator(use_mock_alerts=args.mock)
+        siem = SIEMOrchestrator(use_mock_alerts=args.mock, runtime=args.runtime,
+                                enrichment_mode=args.enrichment)
         siem.start()
 
         try:
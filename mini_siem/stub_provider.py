@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Mini SIEM Stub Enrichment Provider
+Serves IP-API.com style lookups locally, with configurable latency and
+error injection, to test and load-test enrichment without the Internet
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.stub_provider import StubProviderServer
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Mini SIEM stub enrichment provider')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8081, help='Port to listen on')
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds per request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random seconds per request')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fraction of requests that fail (0-1)')
+    parser.add_argument('--error-status', type=int, default=503,
+                        help='HTTP status of failed requests (429 to mimic rate limiting)')
+    parser.add_argument('--max-batch', type=int, default=100, help='Largest /batch request accepted')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed')
+    args = parser.parse_args()
+
+    server = StubProviderServer(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                                error_rate=args.error_rate, error_status=args.error_status,
+                                max_batch=args.max_batch, seed=args.seed)
+    print(f"→ Stub provider on {server.url} "
+          f"({args.latency * 1000:g}ms latency, {args.error_rate:.0%} errors)")
+    print(f"→ Set IP_ENRICHMENT_PROVIDER_URL = \"{server.url}\" in config.py to use it")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+    stats = server.get_stats()
+    print(f"\n✓ {stats['requests']:,} requests ({stats['batch_requests']:,} batches), "
+          f"{stats['ips']:,} IPs, {stats['errors']:,} injected errors")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,15 +6,40 @@ Tests all components of the system
 
 import sys
 import time
+import gzip
+import json
+import pickle
+import sqlite3
+import asyncio
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
 from pathlib import Path
+from datetime import datetime, timedelta, timezone
 
 # Add parent to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from core.database import DatabaseManager
-from core.enricher import IPEnricher
-from core.collector import MockAlertGenerator, SnortAlertParser
+from core.database import DatabaseManager, create_database_manager
+from core.migrations import MIGRATIONS, SCHEMA_VERSION
+from core.enricher import IPEnricher, AsyncIPEnricher, build_enricher
+from core.cache import EnrichmentCache, PersistentEnrichmentCache
+from core.breaker import CircuitBreaker
+from core.ratelimit import PriorityRateLimiter, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from core.geoip import GeoIPDatabase
+from core.providers import EnrichmentProvider, IPAPIProvider, create_provider
+from core.stub_provider import StubProviderServer
+from core.networks import NetworkClassifier, HOME_NETWORK
+from core.collector import MockAlertGenerator, SnortAlertParser, AlertCollector
 from core.correlator import CorrelationEngine
+from core.backfill import BackfillImporter
+from core.alert import Alert
+from core.pipeline import AlertPipeline, AsyncAlertPipeline, GroupCommitWriter
+from core.deferred import DeferredEnricher
+import config
+from core.loadgen import LoadGenerator, write_lines, replay_log, line_timestamp
 
 
 def print_header(text):
@@ -39,6 +64,29 @@ def print_info(text):
     print(f"→ {text}")
 
 
+def start_stub_provider(delay=0.0):
+    """Start a local IP-API.com stand-in; returns (server, base URL, paths seen)"""
+    paths = []
+
+    class StubLookup(BaseHTTPRequestHandler):
+        def do_GET(self):
+            paths.append(self.path)
+            time.sleep(delay)
+            body = b'{"country": "Testland", "countryCode": "TL"}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubLookup)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", paths
+
+
 def test_database():
     """Test database functionality"""
     print_header("Testing Database Module")
@@ -84,6 +132,369 @@ def test_database():
         return False
 
 
+def test_connection_pool():
+    """Test pooled WAL connections in the database manager"""
+    print_header("Testing Database Connection Pool")
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseManager(str(Path(tmp) / "pool.db"))
+            with db._connect() as conn:
+                assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+                assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+                assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2
+            print_success("WAL journal, synchronous=NORMAL, in-memory temp store")
+
+            # Sequential calls share one connection
+            before = db.get_pool_stats()['opened']
+            for alert in MockAlertGenerator.generate_batch(count=20):
+                db.insert_alert(alert)
+            db.get_recent_alerts(limit=5)
+            stats = db.get_pool_stats()
+            assert stats['opened'] == before and stats['reused'] >= 21, stats
+            print_success(f"21 calls on {stats['opened']} connection(s), {stats['reused']} reuses")
+
+            # Concurrent readers and a writer never hold more than POOL_SIZE idle
+            def work(n):
+                db.insert_alert(MockAlertGenerator.generate_alert())
+                return db.get_alert_stats()['total_alerts']
+
+            with ThreadPoolExecutor(max_workers=12) as pool:
+                totals = list(pool.map(work, range(60)))
+            stats = db.get_pool_stats()
+            assert max(totals) == 80 and stats['idle'] <= stats['pool_size'], stats
+            print_success(f"60 concurrent calls: {stats['opened']} opened, {stats['idle']} idle")
+
+            # A reader sees committed rows while a write transaction is open
+            writer = sqlite3.connect(str(Path(tmp) / "pool.db"))
+            writer.execute("BEGIN IMMEDIATE")
+            for partition in db.get_partitions():
+                writer.execute(f"DELETE FROM {partition['name']}")
+            assert db.get_alert_stats()['total_alerts'] == 80
+            writer.rollback()
+            writer.close()
+            print_success("Readers are not blocked by an open write transaction")
+
+            db.close()
+            assert db.get_pool_stats()['idle'] == 0
+            assert db.get_alert_stats()['total_alerts'] == 80
+            db.close()
+            print_success("close() releases idle connections; the manager stays usable")
+
+        return True
+
+    except Exception as e:
+        print_error(f"Connection pool test failed: {str(e)}")
+        return False
+
+
+def test_time_range_queries():
+    """Test epoch timestamps, their backfill and index range scans"""
+    print_header("Testing Time-Range Queries")
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "time.db")
+            now = datetime.now()
+
+            # A database from before timestamp_us, with every stored format
+            with sqlite3.connect(path) as conn:
+                conn.execute("CREATE TABLE alerts (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                             "signature TEXT NOT NULL, src_ip TEXT NOT NULL, dst_ip TEXT NOT NULL, "
+                             "src_port INTEGER, dst_port INTEGER, protocol TEXT, severity TEXT, "
+                             "message TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, "
+                             "enrichment_data TEXT, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)")
+                conn.execute("CREATE INDEX idx_timestamp ON alerts(timestamp)")
+                legacy = [
+                    (now - timedelta(minutes=2)).isoformat(),
+                    str(now - timedelta(minutes=3)),
+                    (now - timedelta(minutes=4)).strftime('%Y-%m-%d %H:%M:%S'),
+                    (now - timedelta(minutes=30)).isoformat(),
+                    (now - timedelta(days=10)).strftime('%Y-%m-%d %H:%M:%S'),
+                    'not a time'
+                ]
+                conn.executemany("INSERT INTO alerts (signature, src_ip, dst_ip, timestamp) "
+                                 "VALUES (?, '203.0.113.5', '10.0.0.1', ?)",
+                                 [(f"Sig {i % 3}", ts) for i, ts in enumerate(legacy)])
+
+            db = DatabaseManager(path)
+            with sqlite3.connect(path) as conn:
+                filled = sum(conn.execute(f"SELECT COUNT(*) FROM {p['name']} "
+                                          f"WHERE timestamp_us IS NOT NULL").fetchone()[0]
+                             for p in db.get_partitions())
+            assert filled == len(legacy)
+            print_success(f"Backfilled timestamp_us for {len(legacy)} legacy rows")
+
+            # New rows in each accepted timestamp type
+            db.insert_alerts([
+                {'signature': 'Sig 3', 'src_ip': '203.0.113.5', 'dst_ip': '10.0.0.1',
+                 'timestamp': now - timedelta(minutes=1)},
+                {'signature': 'Sig 4', 'src_ip': '203.0.113.5', 'dst_ip': '10.0.0.1',
+                 'timestamp': (now - timedelta(minutes=20)).strftime('%Y-%m-%d %H:%M:%S')},
+                {'signature': 'Sig 5', 'src_ip': '198.51.100.7', 'dst_ip': '10.0.0.1',
+                 'timestamp': now}
+            ])
+            # The unreadable timestamp fell back to created_at, i.e. just now
+            assert db.get_alert_count_by_ip('203.0.113.5', minutes=10) == 5
+            assert db.get_unique_signatures_by_ip('203.0.113.5', minutes=10) == 4
+            assert db.get_alert_count_by_ip('203.0.113.5', minutes=60) == 7
+            alerts = db.get_alerts_by_ip('203.0.113.5', minutes=10)
+            assert [a['signature'] for a in alerts][1:] == ['Sig 3', 'Sig 0', 'Sig 1', 'Sig 2']
+            assert db.get_recent_alerts(limit=1)[0]['signature'] == 'Sig 5'
+            print_success("Windows count datetime, ISO and strftime timestamps alike")
+
+            db.clear_old_alerts(days=7)
+            assert db.get_alert_stats()['total_alerts'] == 8
+            print_success("clear_old_alerts removed the 10-day-old alert")
+
+            # Every time-window query is an index range scan of its partitions
+            cutoff = DatabaseManager._cutoff_us(600)
+            table = db.get_partitions()[0]['name']
+            queries = {
+                'alerts by ip': (f"SELECT * FROM {table} WHERE src_ip = ? AND timestamp_us > ? "
+                                 f"ORDER BY timestamp_us DESC", ('203.0.113.5', cutoff)),
+                'count by ip': (f"SELECT COUNT(*) FROM {table} WHERE src_ip = ? AND timestamp_us > ?",
+                                ('203.0.113.5', cutoff)),
+                'signatures by ip': (f"SELECT DISTINCT signature FROM {table} "
+                                     f"WHERE src_ip = ? AND timestamp_us > ?", ('203.0.113.5', cutoff)),
+                'clear old': (f"DELETE FROM {table} WHERE timestamp_us < ?", (cutoff,))
+            }
+            with sqlite3.connect(path) as conn:
+                for name, (sql, params) in queries.items():
+                    plan = ' '.join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+                    assert f'SEARCH {table} USING' in plan, (name, plan)
+                    assert 'timestamp_us>?' in plan or 'timestamp_us<?' in plan, (name, plan)
+                    assert 'SCAN' not in plan and 'FOR ORDER BY' not in plan, (name, plan)
+                    print_info(f"  {name}: {plan}")
+                plan = ' '.join(row[-1] for row in conn.execute(
+                    f"EXPLAIN QUERY PLAN SELECT * FROM {table} ORDER BY timestamp_us DESC LIMIT 50"))
+                assert 'FOR ORDER BY' not in plan, plan
+            print_success("Time-window queries use index range scans")
+            db.close()
+
+        return True
+
+    except Exception as e:
+        print_error(f"Time-range query test failed: {str(e)}")
+        return False
+
+
+def test_schema_migrations():
+    """Test versioned schema migrations from every earlier version"""
+    print_header("Testing Schema Migrations")
+
+    rows = 5000
+    now = datetime.now()
+    enrichment = json.dumps({'source': {'country': 'Testland', 'city': 'Lab'},
+                             'destination': IPEnricher._get_private_ip_enrichment()})
+    expected_indexes = {'idx_enrichment_expires', 'idx_correlations_created_at', 'idx_blocked_at',
+                        'idx_alert_partitions_start'}
+    partition_indexes = ('_timestamp_us', '_src_ip_window', '_signature_window', '_pending')
+
+    class RecordingManager(DatabaseManager):
+        migrations_run = []
+
+        def migrate(self, version, target=SCHEMA_VERSION):
+            self.migrations_run.append(version)
+            return super().migrate(version, target)
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for start_version in range(SCHEMA_VERSION):
+                path = str(Path(tmp) / f"v{start_version}.db")
+
+                # A database as the code of start_version left it
+                with sqlite3.connect(path) as conn:
+                    cursor = conn.cursor()
+                    for _, _, apply, _ in MIGRATIONS[:start_version]:
+                        apply(cursor)
+                    if start_version:
+                        timestamps = [now - timedelta(seconds=i) for i in range(rows)]
+                        # Per-row enrichment JSON was only written before version 4
+                        data = [(f"Sig {i % 7}", f"203.0.113.{i % 50}", '10.0.0.1', str(ts),
+                                 enrichment if start_version < 4 else None)
+                                for i, ts in enumerate(timestamps)]
+                        conn.executemany("INSERT INTO alerts (signature, src_ip, dst_ip, timestamp, "
+                                         "enrichment_data) VALUES (?, ?, ?, ?, ?)", data)
+                        if start_version >= 6:
+                            conn.execute("UPDATE alerts SET timestamp_us = "
+                                         "CAST(strftime('%s', timestamp, 'utc') AS INTEGER) * 1000000")
+
+                start = time.time()
+                db = RecordingManager(path)
+                elapsed = time.time() - start
+                partitions = [p['name'] for p in db.get_partitions()]
+                with sqlite3.connect(path) as conn:
+                    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+                    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+                    indexes = {row[0] for row in conn.execute(
+                        "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")}
+                    assert indexes == expected_indexes | {name + suffix for name in partitions
+                                                          for suffix in partition_indexes}, indexes
+                    tables = {row[0] for row in conn.execute(
+                        "SELECT name FROM sqlite_master WHERE type = 'table'")}
+                    assert 'alerts' not in tables, tables
+                count = db.get_alert_stats()['total_alerts']
+                assert count == (rows if start_version else 0)
+                if start_version:
+                    assert db.get_alert_count_by_ip('203.0.113.7', minutes=120) == rows // 50
+                if 0 < start_version < 4:
+                    assert db.get_recent_alerts(limit=1)[0]['enrichment']['source']['country'] == 'Testland'
+                print_success(f"v{start_version} -> v{SCHEMA_VERSION}: {count:,} alerts kept "
+                              f"({elapsed * 1000:.0f}ms)")
+                db.close()
+
+            # A current database is recognized once and left alone
+            RecordingManager.migrations_run.clear()
+            RecordingManager(path).close()
+            assert RecordingManager.migrations_run == []
+            print_success("Current schema: startup runs no DDL")
+
+            # Unreadable timestamps are dated when stored, or migrated, not 1970
+            garbled = str(Path(tmp) / "garbled.db")
+            with sqlite3.connect(garbled) as conn:
+                for _, _, apply, _ in MIGRATIONS[:5]:
+                    apply(conn.cursor())
+                stored_at = datetime.now(timezone.utc) - timedelta(hours=2)
+                conn.executemany("INSERT INTO alerts (signature, src_ip, dst_ip, timestamp, created_at) "
+                                 "VALUES ('Garbled', '203.0.113.9', '10.0.0.1', 'not a time', ?)",
+                                 [(stored_at.strftime('%Y-%m-%d %H:%M:%S'),), ('also not a time',)])
+            db = DatabaseManager(garbled)
+            assert db.apply_retention(days=1) == 0
+            assert len(db.get_recent_alerts()) == 2
+            assert not any(p['name'].startswith('alerts_1970') for p in db.get_partitions())
+            db.close()
+            print_success("Unreadable timestamps fall back to created_at or the migration time")
+
+            # Window queries and ORDER BY clauses are served by the indexes
+            table = partitions[0]
+            queries = {
+                'alerts by ip': (f"SELECT * FROM {table} WHERE src_ip = ? AND timestamp_us > ? "
+                                 f"ORDER BY timestamp_us DESC", f'{table}_src_ip_window'),
+                'count by ip': (f"SELECT COUNT(*) FROM {table} WHERE src_ip = ? AND timestamp_us > ?",
+                                f'COVERING INDEX {table}_src_ip_window'),
+                'signatures by ip': (f"SELECT DISTINCT signature FROM {table} "
+                                     f"WHERE src_ip = ? AND timestamp_us > ?",
+                                     f'COVERING INDEX {table}_src_ip_window'),
+                'alerts by signature': (f"SELECT * FROM {table} WHERE signature = ? "
+                                        f"AND timestamp_us > ? ORDER BY timestamp_us DESC",
+                                        f'{table}_signature_window'),
+                'correlations': ("SELECT * FROM correlations ORDER BY created_at DESC LIMIT 20",
+                                 'idx_correlations_created_at'),
+                'blocked ips': ("SELECT ip_address, reason, blocked_at FROM blocked_ips "
+                                "ORDER BY blocked_at DESC", 'COVERING INDEX idx_blocked_at')
+            }
+            with sqlite3.connect(path) as conn:
+                for name, (sql, index) in queries.items():
+                    params = ('x', 0) if sql.count('?') == 2 else ()
+                    plan = ' '.join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+                    assert index in plan and 'FOR ORDER BY' not in plan, (name, plan)
+            print_success(f"{len(queries)} queries use their indexes without sorting")
+
+        return True
+
+    except Exception as e:
+        print_error(f"Schema migration test failed: {str(e)}")
+        return False
+
+
+def test_partitions():
+    """Test time-partitioned alert storage and partition-drop retention"""
+    print_header("Testing Alert Partitions")
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "partitions.db")
+            db = DatabaseManager(path, partition_hours=1)
+            now = datetime.now()
+            ages = [timedelta(0), timedelta(minutes=1), timedelta(minutes=90), timedelta(hours=3),
+                    timedelta(days=2)]
+            ids = [db.insert_alert({'signature': f"Sig {i}", 'src_ip': '203.0.113.9',
+                                    'dst_ip': '10.0.0.1', 'timestamp': now - age})
+                   for i, age in enumerate(ages)]
+            partitions = db.get_partitions()
+            assert ids == sorted(ids) and len(set(ids)) == len(ids), ids
+            assert 4 <= len(partitions) <= 5, partitions
+            assert all(p['end_us'] - p['start_us'] == 3600 * 1000000 for p in partitions)
+            print_success(f"{len(ids)} alerts routed to {len(partitions)} hourly partitions, ids unique")
+
+            # Windows only read the partitions they overlap, newest first
+            assert db.get_alert_count_by_ip('203.0.113.9', minutes=30) == 2
+            assert db.get_unique_signatures_by_ip('203.0.113.9', minutes=240) == 4
+            assert [a['signature'] for a in db.get_alerts_by_ip('203.0.113.9', minutes=240)] == \
+                ['Sig 0', 'Sig 1', 'Sig 2', 'Sig 3']
+            assert [a['signature'] for a in db.get_recent_alerts(limit=4)] == \
+                ['Sig 0', 'Sig 1', 'Sig 2', 'Sig 3']
+            with db._connect() as conn:
+                assert len(db._partitions(conn, DatabaseManager._cutoff_us(1800))) <= 2
+            print_success("Window queries fan out across overlapping partitions only")
+
+            # Backfill updates find their partition by id range
+            pending = db.get_pending_enrichment(limit=10)
+            assert [row[0] for row in pending] == ids
+            enrichment = {'source': {'country': 'Testland'}, 'destination': {}, 'status': 'complete'}
+            db.update_enrichment([(alert_id, src, dst, enrichment) for alert_id, src, dst, _ in pending])
+            assert db.count_pending_enrichment() == 0
+            print_success("Enrichment backfill updated alerts in every partition")
+
+            # Retention drops whole partitions; the rest stay untouched
+            oldest = partitions[-1]['name']
+            assert db.apply_retention(days=1) == 1
+            assert db.get_alert_stats()['total_alerts'] == 4
+            with sqlite3.connect(path) as conn:
+                tables = {row[0] for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'")}
+            assert oldest not in tables and db.apply_retention(days=1) == 0
+            print_success(f"apply_retention dropped {oldest}")
+
+            # Another manager keeps the existing period; a dropped partition is recreated
+            other = DatabaseManager(path, partition_hours=24)
+            other.insert_alert({'signature': 'Other', 'src_ip': '203.0.113.9', 'dst_ip': '10.0.0.1'})
+            assert other.partitions.period_us == 3600 * 1000000
+            remaining = len(db.get_partitions())
+            assert other.apply_retention(days=-1) == remaining
+            db.insert_alert({'signature': 'Again', 'src_ip': '203.0.113.9', 'dst_ip': '10.0.0.1'})
+            assert [a['signature'] for a in db.get_recent_alerts(limit=5)] == ['Again']
+            other.close()
+            print_success("Period kept across managers; writes survive a concurrent drop")
+
+            # The alert total comes from per-partition counts kept by the writers
+            def stored_rows():
+                with sqlite3.connect(path) as conn:
+                    return sum(conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+                               for name, in conn.execute("SELECT name FROM alert_partitions"))
+
+            unique_before = db.get_alert_stats()['unique_ips']
+            db.insert_alerts([{'signature': 'Count', 'src_ip': f"198.51.100.{i}", 'dst_ip': '10.0.0.1',
+                               'timestamp': now + timedelta(hours=1) - timedelta(minutes=20 * i)}
+                              for i in range(12)])
+            stats = db.get_alert_stats()
+            assert stats['total_alerts'] == stored_rows() == 13, stats
+            assert stats['unique_ips'] == unique_before, "distinct IPs recounted within the TTL"
+            db.clear_old_alerts(days=0)
+            db.apply_retention(days=1)
+            assert db.get_alert_stats()['total_alerts'] == stored_rows() > 0
+            db.UNIQUE_IPS_TTL = 0
+            assert db.get_alert_stats()['unique_ips'] == len({a['src_ip'] for a in db.get_recent_alerts()})
+            db.close()
+            print_success("Alert totals kept in the catalog through inserts, deletes and drops")
+
+            # Every entry point builds its manager with the configured period
+            fresh = create_database_manager(SimpleNamespace(ALERT_PARTITION_HOURS=6),
+                                            str(Path(tmp) / "configured.db"))
+            fresh.insert_alert({'signature': 'Configured', 'src_ip': '203.0.113.9', 'dst_ip': '10.0.0.1'})
+            partition = fresh.get_partitions()[0]
+            assert partition['end_us'] - partition['start_us'] == 6 * 3600 * 1000000
+            fresh.close()
+            print_success("create_database_manager applies ALERT_PARTITION_HOURS")
+
+        return True
+
+    except Exception as e:
+        print_error(f"Partition test failed: {str(e)}")
+        return False
+
+
 def test_enricher():
     """Test IP enrichment"""
     print_header("Testing IP Enrichment Module")
@@ -119,6 +530,665 @@ def test_enricher():
         return False
 
 
+def test_enrichment_cache():
+    """Test the bounded LRU/TTL enrichment cache"""
+    print_header("Testing Enrichment Cache")
+
+    try:
+        cache = EnrichmentCache(max_size=3, ttl=60, shards=1)
+        for ip in ('1.1.1.1', '2.2.2.2', '3.3.3.3'):
+            cache.set(ip, {'country': ip})
+        assert cache.get('1.1.1.1') == {'country': '1.1.1.1'}
+        cache.set('4.4.4.4', {'country': '4.4.4.4'})
+        assert len(cache) == 3 and '2.2.2.2' not in cache and '1.1.1.1' in cache
+        print_success("Least recently used entry evicted at max_size")
+
+        value = {'country': 'Shared'}
+        cache.set('5.5.5.5', value)
+        assert cache.get('5.5.5.5') is value, "hit returned a copy"
+        cache.set('6.6.6.6', {'country': 'Short'}, ttl=0.05)
+        time.sleep(0.1)
+        assert cache.get('6.6.6.6') is None
+        stats = cache.get_stats()
+        assert stats['expirations'] == 1 and stats['evictions'] >= 2 and stats['hits'] == 2
+        assert stats['memory_bytes'] > 0 and stats['size'] == len(cache)
+        print_success(f"TTL expiry and counters work: {stats}")
+
+        # Concurrent writers and readers must not corrupt shards or exceed the bound
+        cache = EnrichmentCache(max_size=1000, ttl=60, shards=8)
+        errors = []
+
+        def hammer(worker):
+            try:
+                for i in range(5000):
+                    ip = f"198.51.{worker}.{i % 700}"
+                    if cache.get(ip) is None:
+                        cache.set(ip, {'worker': worker})
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=hammer, args=(w,)) for w in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = cache.get_stats()
+        assert not errors and stats['size'] <= 1000 and stats['hits'] + stats['misses'] == 40000
+        print_success(f"8 threads: {stats['size']} entries, {stats['evictions']} evictions, "
+                      f"hit rate {stats['hit_rate']:.0%}")
+
+        # The running memory estimate drops back to nothing as entries go
+        cache = EnrichmentCache(max_size=100, ttl=60, shards=4)
+        for i in range(300):
+            cache.set(f"192.0.2.{i % 150}", {'country': 'X' * (i % 7), 'asn': [i]},
+                      ttl=0.05 if i % 3 == 0 else None)
+        assert cache.get_stats()['memory_bytes'] > sum(map(sys.getsizeof, cache._shards))
+        time.sleep(0.1)
+        cache.purge_expired()
+        for key, _, _ in cache.items():
+            cache.delete(key)
+        assert len(cache) == 0 and sum(cache._bytes) == 0, cache._bytes
+        print_success("Memory estimate tracks sets, overwrites, evictions and removals")
+
+        enricher = IPEnricher(use_free_api=True, cache=EnrichmentCache(max_size=10))
+        enricher._cache_enrichment('203.0.113.9', {'country': 'Cached'})
+        assert enricher.enrich_ip('203.0.113.9')['country'] == 'Cached'
+        assert enricher.get_cache_stats()['hits'] == 1
+        print_success("IPEnricher serves lookups from its cache")
+
+        return True
+
+    except Exception as e:
+        print_error(f"Enrichment cache test failed: {str(e)}")
+        return False
+
+
+def test_persistent_cache():
+    """Test the database-backed enrichment cache tier"""
+    print_header("Testing Persistent Enrichment Cache")
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseManager(str(Path(tmp) / "cache.db"))
+            cache = PersistentEnrichmentCache(db, flush_interval=0.05)
+            for i in range(1000):
+                cache.set(f"198.51.{i // 250}.{i % 250}", {'country': 'Persisted', 'n': i})
+            cache.set('198.51.100.1', {'country': 'Stale'}, ttl=-1)
+            time.sleep(0.3)
+            assert cache.get_stats()['persistent_writes'] == 1001, cache.get_stats()
+            print_success("Background writer saved 1001 entries in batches")
+            cache.close()
+
+            # A restarted process starts warm; expired entries stay behind
+            restarted = PersistentEnrichmentCache(db)
+            assert restarted.warm() == 1000
+            assert restarted.get('198.51.3.249') == {'country': 'Persisted', 'n': 999}
+            assert restarted.get('198.51.100.1') is None
+            stats = restarted.get_stats()
+            assert stats['hits'] == 1 and stats['persistent_hits'] == 0
+            print_success("Restarted cache warmed with 1000 entries, served from memory")
+
+            # Entries written by another process are found on a memory miss
+            other = PersistentEnrichmentCache(db)
+            other.set('203.0.113.77', {'country': 'Elsewhere'})
+            other.close()
+            assert restarted.get('203.0.113.77') == {'country': 'Elsewhere'}
+            assert restarted.get_stats()['persistent_hits'] == 1
+            assert db.purge_enrichment_cache() == 1
+            restarted.close()
+            print_success("Memory misses fall through to the database tier")
+
+            # Lookups finishing during shutdown are written, not dropped
+            restarted.set('203.0.113.78', {'country': 'Late'})
+            assert restarted.get_stats()['pending_writes'] == 0
+            assert PersistentEnrichmentCache(db).load('203.0.113.78') == {'country': 'Late'}
+            print_success("Entries set after close() are written synchronously")
+
+            # Every entry point builds its enricher through the same factory
+            settings = SimpleNamespace(**{**vars(config), 'IP_ENRICHMENT_CACHE_SIZE': 500,
+                                          'IP_ENRICHMENT_TIMEOUT': 1.5})
+            enrichers = [build_enricher(settings, db, process) for process in config.IP_ENRICHMENT_RATE_SHARES]
+            enricher = enrichers[0]
+            assert isinstance(enricher.cache, PersistentEnrichmentCache) and enricher.cache.max_size == 500
+            assert enricher.cache.get('198.51.3.249') == {'country': 'Persisted', 'n': 999}
+            assert enricher.provider.timeout == 1.5
+            print_success("build_enricher wires the configured cache, provider and limiter")
+
+            # Processes running together stay within the provider quota
+            buckets = [e.rate_limiter.bucket for e in enrichers]
+            rate = sum(bucket.rate for bucket in buckets) * 60
+            burst = sum(bucket.burst for bucket in buckets)
+            assert abs(rate - config.IP_ENRICHMENT_RATE_PER_MINUTE) < 1e-6, rate
+            assert burst <= config.IP_ENRICHMENT_RATE_BURST, burst
+            for enricher in enrichers:
+                enricher.close()
+                enricher.cache.close()
+            try:
+                build_enricher(settings, db, 'unknown')
+                assert False, "unknown process accepted"
+            except ValueError:
+                pass
+            print_success(f"Rate shares of {len(enrichers)} processes add up to "
+                          f"{rate:g}/min, burst {burst}")
+
+        return True
+
+    except Exception as e:
+        print_error(f"Persistent cache test failed: {str(e)}")
+        return False
+
+
+def test_geoip():
+    """Test the offline GeoIP range database"""
+    print_header("Testing Offline GeoIP Database")
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            ranges = Path(tmp) / "ranges.csv"
+            ranges.write_text(
+                "start_ip,end_ip,country_code,country,city,latitude,longitude,asn,org\n"
+                "203.0.113.128,203.0.113.255,DE,Germany,Berlin,52.5,13.4,64500,Example Two\n"
+                "203.0.113.0,203.0.113.127,US,United States,Boston,42.3,-71.0,64499,Example One\n"
+                "3405777408,3405777663,US,United States,Boston,42.3,-71.0,64499,Example One\n"
+                "not-an-ip,1.2.3.4,XX,Bad,Row,,,,\n"
+            )
+            db = GeoIPDatabase.from_csv(str(ranges))
+            assert len(db) == 3 and len(db.records) == 2, "records not shared between ranges"
+            assert db.lookup('203.0.113.0')['city'] == 'Boston'
+            assert db.lookup('203.0.113.127')['asn'] == 'AS64499'
+            assert db.lookup('203.0.113.128')['country'] == 'Germany'
+            assert db.lookup('203.0.113.255')['latitude'] == 52.5
+            assert db.lookup('203.0.112.255') is None and db.lookup('203.0.114.0') is None
+            assert db.lookup('203.0.10.1')['org'] == 'Example One'  # integer bounds
+            assert db.lookup('not an ip') is None
+            assert db.lookup('203.0.113.5') is db.lookup('203.0.113.6')
+            print_success("Range boundaries, shared records and integer bounds work")
+
+            networks = Path(tmp) / "networks.csv.gz"
+            with gzip.open(networks, 'wt') as f:
+                f.write("network,country_iso_code,country_name,autonomous_system_organization\n"
+                        "198.51.100.0/24,NL,Netherlands,Docs Net\n"
+                        "2001:db8::/32,JP,Japan,Docs Six\n")
+            db = GeoIPDatabase.from_csv(str(networks))
+            assert db.lookup('198.51.100.200')['country'] == 'Netherlands'
+            assert db.lookup('2001:db8:1::1')['org'] == 'Docs Six'
+            assert db.lookup('2001:db9::1') is None
+            print_success("CIDR datasets with IPv6 ranges load from .csv.gz")
+
+            enricher = IPEnricher(use_free_api=True, geoip=db)
+            enricher.provider = None  # any network use would now raise
+            assert enricher.enrich_ip('198.51.100.7')['country_code'] == 'NL'
+            assert enricher.enrich_ip('192.0.2.1')['country'] == 'Unknown'
+            assert enricher.enrich_ip('10.1.2.3')['country'] == 'Private'
+            assert enricher.get_cache_stats()['size'] == 0
+            print_success("IPEnricher answers from the offline database without network access")
+
+        return True
+
+    except Exception as e:
+        print_error(f"GeoIP test failed: {str(e)}")
+        return False
+
+
+def test_network_classifier():
+    """Test HOME_NET and special-use address classification"""
+    print_header("Testing Network Classification")
+
+    try:
+        networks = NetworkClassifier(['10.0.0.0/8', '198.51.100.0/25', '2001:db8:10::/48'])
+        assert networks.classify('10.20.30.40') == HOME_NETWORK
+        assert networks.classify('172.31.255.255') == 'Private Range'
+        assert networks.classify('172.32.0.1') is None
+        assert networks.classify('198.51.100.127') == HOME_NETWORK  # public block in HOME_NET
+        assert networks.classify('198.51.100.128') is None
+        assert networks.classify('100.64.0.1') == 'Shared Address Space'
+        assert networks.classify('127.0.0.1') == 'Loopback'
+        assert networks.classify('239.1.2.3') == 'Multicast'
+        assert networks.classify('8.8.8.8') is None
+        print_success("IPv4 longest-prefix matches work")
+
+        assert networks.classify('2001:db8:10::1') == HOME_NETWORK
+        assert networks.classify('2001:db8:11::1') is None
+        assert networks.classify('fd12::1') == 'Private Range'
+        assert networks.classify('fe80::1') == 'Link-Local'
+        assert networks.classify('::1') == 'Loopback'
+        assert networks.classify('::ffff:10.1.1.1') == HOME_NETWORK
+        assert networks.classify('2606:4700::1111') is None
+        assert networks.classify('not-an-ip') is None and networks.classify('') is None
+        print_success("IPv6 and IPv4-mapped addresses are classified")
+
+        class CountingEnricher(IPEnricher):
+            def _lookup(self, ip, priority=PRIORITY_NORMAL):
+                looked_up.append(ip)
+                return dict(self._get_default_enrichment(), country='Testland')
+
+        looked_up = []
+        enricher = CountingEnricher(use_free_api=True, networks=networks)
+        alert = enricher.enrich_alert({'src_ip': '2606:4700::1111', 'dst_ip': '198.51.100.10',
+                                       'severity': 'HIGH'})
+        assert looked_up == ['2606:4700::1111'], f"looked up {looked_up}"
+        assert alert['enrichment']['destination']['region'] == HOME_NETWORK
+        assert alert['enrichment']['status'] == 'complete'
+        enricher.enrich_alert({'src_ip': '10.0.0.1', 'dst_ip': 'fe80::2'})
+        assert looked_up == ['2606:4700::1111']
+        print_success("Internal addresses are never looked up")
+
+        return True
+
+    except Exception as e:
+        print_error(f"Network classification test failed: {str(e)}")
+        return False
+
+
+def test_lookup_coalescing():
+    """Test single-flight lookups and parallel src/dst enrichment"""
+    print_header("Testing Lookup Coalescing")
+
+    requests_seen = []
+
+    class SlowLookup(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append(self.path)
+            time.sleep(0.3)
+            body = b'{"country": "Testland", "countryCode": "TL"}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowLookup)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        enricher = IPEnricher(lookup_workers=4, provider=IPAPIProvider(url))
+
+        # 20 threads asking for one uncached IP send a single request
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(enricher.enrich_ip('198.51.100.7')))
+                   for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(results) == 20 and all(r['country'] == 'Testland' for r in results)
+        assert len(requests_seen) == 1, f"{len(requests_seen)} requests for one IP"
+        assert enricher.get_lookup_stats()['coalesced'] == 19
+        assert enricher.get_lookup_stats()['in_flight'] == 0
+        print_success("20 concurrent lookups of one IP sent 1 request")
+
+        # Source and destination are resolved in parallel
+        start = time.time()
+        alert = enricher.enrich_alert({'src_ip': '198.51.100.8', 'dst_ip': '198.51.100.9'})
+        elapsed = time.time() - start
+        assert alert['enrichment']['source']['country'] == 'Testland'
+        assert alert['enrichment']['destination']['country'] == 'Testland'
+        assert elapsed < 0.55, f"src and dst looked up in turn ({elapsed:.2f}s)"
+        assert len(requests_seen) == 3
+        enricher.close()
+        print_success(f"src and dst enriched in parallel ({elapsed:.2f}s)")
+
+        async def run():
+            async_enricher = AsyncIPEnricher(IPEnricher(provider=IPAPIProvider(url)), max_concurrency=10)
+            start = time.time()
+            results = await asyncio.gather(*(async_enricher.enrich_ip('198.51.100.10')
+                                             for _ in range(20)))
+            alert = await async_enricher.enrich_alert({'src_ip': '198.51.100.11',
+                                                       'dst_ip': '198.51.100.12'})
+            return results, alert, async_enricher.stats, time.time() - start
+
+        requests_seen.clear()
+        results, alert, stats, elapsed = asyncio.run(run())
+        assert all(r['country'] == 'Testland' for r in results)
+        assert alert['enrichment']['destination']['country'] == 'Testland'
+        assert len(requests_seen) == 3 and stats['lookups'] == 3 and stats['coalesced'] == 19
+        assert elapsed < 1.0, f"async lookups did not overlap ({elapsed:.2f}s)"
+        print_success(f"asyncio: 20 lookups of one IP and a src/dst pair sent 3 requests ({elapsed:.2f}s)")
+        return True
+
+    except Exception as e:
+        print_error(f"Lookup coalescing test failed: {str(e)}")
+        return False
+
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_enrichment_failures():
+    """Test negative caching and the enrichment circuit breaker"""
+    print_header("Testing Enrichment Failure Handling")
+
+    requests_seen = []
+    healthy = threading.Event()
+
+    class FlakyLookup(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append(self.path)
+            body = b'{"country": "Testland", "countryCode": "TL"}' if healthy.is_set() else b'{}'
+            self.send_response(200 if healthy.is_set() else 503)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyLookup)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        breaker = CircuitBreaker('test provider', failure_threshold=3, cooldown=0.3)
+        enricher = IPEnricher(negative_ttl=60, breaker=breaker, provider=IPAPIProvider(url))
+
+        # A failed IP is marked pending and not retried while negatively cached
+        first = enricher.enrich_ip('198.51.100.1')
+        again = enricher.enrich_ip('198.51.100.1')
+        assert first['pending'] and again['pending'] and len(requests_seen) == 1
+        assert enricher.get_lookup_stats()['negative_hits'] == 1
+        print_success("Failed lookup cached as pending for negative_ttl")
+
+        # Three failures in a row open the breaker; later IPs fail fast
+        enricher.enrich_ip('198.51.100.2')
+        enricher.enrich_ip('198.51.100.3')
+        assert breaker.state == CircuitBreaker.OPEN and len(requests_seen) == 3
+        alert = enricher.enrich_alert({'src_ip': '198.51.100.4', 'dst_ip': '10.0.0.1'})
+        assert alert['enrichment']['status'] == 'pending' and len(requests_seen) == 3
+        stats = enricher.get_lookup_stats()['breaker']
+        assert stats['state'] == 'open' and stats['rejected'] == 1 and stats['opened'] == 1
+        print_success("Breaker opened after 3 failures; alert marked pending without a request")
+
+        # After the cool-down one trial call goes through and closes it
+        healthy.set()
+        time.sleep(0.35)
+        alert = enricher.enrich_alert({'src_ip': '198.51.100.5', 'dst_ip': '10.0.0.1'})
+        assert alert['enrichment']['status'] == 'complete'
+        assert alert['enrichment']['source']['country'] == 'Testland'
+        assert breaker.state == CircuitBreaker.CLOSED and len(requests_seen) == 4
+        print_success("Trial call after cool-down closed the breaker")
+        return True
+
+    except Exception as e:
+        print_error(f"Enrichment failure test failed: {str(e)}")
+        return False
+
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_rate_limiter():
+    """Test the priority token-bucket limiter in front of enrichment"""
+    print_header("Testing Enrichment Rate Limiter")
+
+    try:
+        # 5 calls/sec: waiters are served one token at a time, HIGH first
+        limiter = PriorityRateLimiter(rate=5, burst=1, max_wait=(3.0, 3.0, 0.0), shed_depth=2)
+        assert limiter.acquire(PRIORITY_NORMAL)
+        order = []
+
+        def wait_for_token(priority):
+            if limiter.acquire(priority):
+                order.append(priority)
+
+        threads = []
+        for priority in (PRIORITY_NORMAL,) * 3 + (PRIORITY_HIGH,) * 3:
+            threads.append(threading.Thread(target=wait_for_token, args=(priority,)))
+            threads[-1].start()
+            time.sleep(0.02)
+
+        # Under pressure low-priority lookups are dropped rather than queued
+        assert not limiter.acquire(PRIORITY_LOW)
+        for t in threads:
+            t.join()
+        assert order == [PRIORITY_HIGH] * 3 + [PRIORITY_NORMAL] * 3, order
+        stats = limiter.get_stats()['priorities']
+        assert stats['low']['dropped'] == 1
+        assert stats['normal']['avg_wait_seconds'] > stats['high']['avg_wait_seconds'] > 0
+        print_success(f"HIGH served before NORMAL; queue wait high "
+                      f"{stats['high']['avg_wait_seconds']:.2f}s, normal "
+                      f"{stats['normal']['avg_wait_seconds']:.2f}s")
+
+        # With no token free a LOW lookup is deferred at once
+        assert not limiter.acquire(PRIORITY_LOW)
+        assert limiter.get_stats()['priorities']['low']['deferred'] == 1
+        assert asyncio.run(limiter.acquire_async(PRIORITY_HIGH))
+        print_success("LOW deferred without waiting; async waiter granted")
+
+        # The enricher maps alert severity and active correlations to priority
+        enricher = IPEnricher(rate_limiter=PriorityRateLimiter(rate=0.001, burst=0, max_wait=(0.2, 0.2, 0.0)),
+                              provider=IPAPIProvider("http://127.0.0.1:9"))
+        assert enricher.alert_priority({'severity': 'CRITICAL'}) == PRIORITY_HIGH
+        assert enricher.alert_priority({'severity': 'MEDIUM'}) == PRIORITY_NORMAL
+        assert enricher.alert_priority({'severity': 'INFO'}) == PRIORITY_LOW
+
+        alert = enricher.enrich_alert({'src_ip': '198.51.100.20', 'dst_ip': '10.0.0.1',
+                                       'severity': 'LOW'})
+        assert alert['enrichment']['status'] == 'pending'
+        enricher.set_priority_ips(['198.51.100.21'])
+        enricher.enrich_alert({'src_ip': '198.51.100.21', 'dst_ip': '10.0.0.1', 'severity': 'LOW'})
+        stats = enricher.get_lookup_stats()['rate_limiter']['priorities']
+        assert stats['low']['deferred'] == 1 and stats['high']['deferred'] == 1
+        assert enricher.get_lookup_stats()['breaker']['failures'] == 0
+        print_success("Deferred lookups marked pending; correlated IPs promoted to HIGH")
+
+        # The breaker is asked first: refused calls cost no token, and a
+        # half-open trial the limiter turns away goes to the next caller
+        breaker = CircuitBreaker('Token test', failure_threshold=1, cooldown=0.05)
+        limiter = PriorityRateLimiter(rate=0.001, burst=1, max_wait=(0.0, 0.0, 0.0))
+        enricher = IPEnricher(breaker=breaker, rate_limiter=limiter,
+                              provider=IPAPIProvider("http://127.0.0.1:9"))
+        breaker.record_failure()
+        time.sleep(0.1)
+        assert breaker.allow()  # a trial call is in flight elsewhere
+        assert not enricher._admit(PRIORITY_HIGH)
+        assert limiter.get_stats()['tokens'] >= 0.99, limiter.get_stats()
+        breaker.release()
+        limiter.acquire(PRIORITY_HIGH)
+        assert not enricher._admit(PRIORITY_HIGH)
+        assert breaker.allow(), "trial slot not released after the limiter refused"
+        print_success("Breaker checked before the limiter; no tokens spent on refused calls")
+        return True
+
+    except Exception as e:
+        print_error(f"Rate limiter test failed: {str(e)}")
+        return False
+
+
+def test_enrichment_providers():
+    """Test pluggable providers, batch lookups and the stub provider server"""
+    print_header("Testing Enrichment Providers")
+
+    stub = StubProviderServer(latency=0.05, seed=1).start()
+    try:
+        provider = create_provider('ip-api', base_url=stub.url, batch_size=10)
+        assert isinstance(provider, IPAPIProvider) and provider.batch_size == 10
+        record = provider.lookup('198.51.100.1')
+        assert record == IPAPIProvider.from_ip_api(StubProviderServer.make_record('198.51.100.1'))
+        found = provider.lookup_many(['198.51.100.2', '198.51.100.3'])
+        assert set(found) == {'198.51.100.2', '198.51.100.3'}
+        assert stub.get_stats()['batch_requests'] == 1
+        print_success("Single and batch lookups against the stub server")
+
+        class Incomplete(EnrichmentProvider):
+            name = 'incomplete'
+        try:
+            Incomplete()
+            assert False, "provider without lookup() was created"
+        except TypeError:
+            pass
+        print_success("A provider without lookup() fails when created")
+
+        # 25 uncached IPs in groups of 10: three requests, two of them concurrent
+        enricher = IPEnricher(provider=provider, lookup_workers=4)
+        before = stub.get_stats()['requests']
+        ips = [f"198.51.100.{i}" for i in range(10, 35)]
+        start = time.time()
+        results = enricher.enrich_ips(ips + ['10.0.0.1'])
+        elapsed = time.time() - start
+        assert stub.get_stats()['requests'] - before == 3, stub.get_stats()
+        assert all(not results[ip].get('pending') for ip in ips)
+        assert results['10.0.0.1']['country'] == 'Private'
+        assert enricher.get_cache_stats()['size'] >= 25 and elapsed < 0.15 * 3
+        assert enricher.get_lookup_stats()['batch_size'] == 10
+        enricher.enrich_ips(ips)
+        assert stub.get_stats()['requests'] - before == 3  # all cached now
+        enricher.close()
+        print_success(f"25 IPs resolved in 3 batched requests ({elapsed:.2f}s)")
+
+        # Injected errors leave the batch pending and count against the breaker
+        stub.error_rate = 1.0
+        breaker = CircuitBreaker('stub', failure_threshold=2, cooldown=60)
+        enricher = IPEnricher(provider=create_provider('ip-api', base_url=stub.url, batch_size=10),
+                              breaker=breaker)
+        results = enricher.enrich_ips([f"198.51.100.{i}" for i in range(50, 60)])
+        assert all(r.get('pending') for r in results.values())
+        assert breaker.get_stats()['failures'] == 1
+        assert enricher.get_lookup_stats()['negative_cached'] == 10
+        enricher.enrich_ip('198.51.100.70')
+        assert breaker.state == CircuitBreaker.OPEN
+        errors = stub.get_stats()['errors']
+        assert enricher.enrich_ip('198.51.100.71').get('pending')
+        assert stub.get_stats()['errors'] == errors  # open breaker: no request sent
+        enricher.close()
+        print_success("Injected errors mark IPs pending and open the breaker")
+
+        return True
+
+    except Exception as e:
+        print_error(f"Enrichment provider test failed: {str(e)}")
+        return False
+
+    finally:
+        stub.stop()
+
+
+def test_deferred_enrichment():
+    """Test storing alerts first and backfilling their enrichment"""
+    print_header("Testing Deferred Enrichment")
+
+    server, url, paths = start_stub_provider(delay=0.3)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # An existing database gains the pending flag on open
+            db_path = str(Path(tmp) / "deferred.db")
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("CREATE TABLE alerts (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                             "signature TEXT NOT NULL, src_ip TEXT NOT NULL, dst_ip TEXT NOT NULL, "
+                             "src_port INTEGER, dst_port INTEGER, protocol TEXT, severity TEXT, "
+                             "message TEXT, timestamp DATETIME, enrichment_data TEXT, "
+                             "created_at DATETIME DEFAULT CURRENT_TIMESTAMP)")
+            db = DatabaseManager(db_path)
+            with sqlite3.connect(db_path) as conn:
+                tables = {row[0] for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'")}
+            assert 'alerts' not in tables and 'alert_partitions' in tables, tables
+            print_success("Old alerts table migrated")
+
+            # Without an enricher the pipeline stores alerts at once, flagged
+            alerts = MockAlertGenerator.generate_batch(count=50)
+            for i, alert in enumerate(alerts):
+                alert['src_ip'] = f"198.51.100.{i % 5 + 1}"
+                alert['severity'] = 'HIGH' if i % 10 == 0 else 'LOW'
+            pipeline = AlertPipeline(None, db, persist_batch_size=100)
+            pipeline.start()
+            start = time.time()
+            pipeline.submit(alerts)
+            pipeline.stop()
+            elapsed = time.time() - start
+            assert 'enrich' not in pipeline.get_metrics()
+            assert db.count_pending_enrichment() == 50 and elapsed < 0.3
+            print_success(f"50 alerts stored unenriched in {elapsed * 1000:.0f}ms")
+
+            # The backfill looks each distinct IP up once and updates in bulk
+            enricher = IPEnricher(provider=IPAPIProvider(url))
+            deferred = DeferredEnricher(enricher, db, batch_size=20)
+            passes = []
+            while db.count_pending_enrichment():
+                passes.append(deferred.run_once())
+                assert len(passes) <= 5, passes
+            stored = db.get_recent_alerts(limit=50)
+            assert all(a['enrichment']['status'] == 'complete' for a in stored)
+            assert all(a['enrichment']['source']['country'] == 'Testland' for a in stored)
+            assert len(paths) == 5, f"{len(paths)} lookups for 5 IPs"
+            stats = deferred.get_stats()
+            assert stats['alerts_enriched'] == 50 and stats['backlog'] == 0
+            enricher.close()
+            print_success(f"Backfilled 50 alerts in {len(passes)} passes with 5 lookups")
+        return True
+
+    except Exception as e:
+        print_error(f"Deferred enrichment test failed: {str(e)}")
+        return False
+
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_enrichment_storage():
+    """Test the normalized ip_enrichment table and its migration"""
+    print_header("Testing Normalized Enrichment Storage")
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # A database from before normalization, enrichment copied per row
+            db_path = str(Path(tmp) / "legacy.db")
+            record = dict(IPEnricher._get_default_enrichment(), country='Testland')
+            private = IPEnricher._get_private_ip_enrichment()
+            legacy = json.dumps({'source': record, 'destination': private,
+                                 'enriched_at': '2025-01-02T03:04:05'})
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("CREATE TABLE alerts (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                             "signature TEXT NOT NULL, src_ip TEXT NOT NULL, dst_ip TEXT NOT NULL, "
+                             "src_port INTEGER, dst_port INTEGER, protocol TEXT, severity TEXT, "
+                             "message TEXT, timestamp DATETIME, enrichment_data TEXT, "
+                             "created_at DATETIME DEFAULT CURRENT_TIMESTAMP)")
+                conn.executemany("INSERT INTO alerts (signature, src_ip, dst_ip, severity, timestamp, "
+                                 "enrichment_data) VALUES (?, ?, ?, ?, ?, ?)",
+                                 [('Legacy', f"198.51.100.{i % 3 + 1}", '10.0.0.1', 'LOW',
+                                   f"2025-01-02 03:04:{i:02d}", legacy) for i in range(30)])
+
+            db = DatabaseManager(db_path)
+            with sqlite3.connect(db_path) as conn:
+                columns = {row[1] for p in db.get_partitions()
+                           for row in conn.execute(f"PRAGMA table_info({p['name']})")}
+                records = conn.execute("SELECT COUNT(*) FROM ip_enrichment").fetchone()[0]
+            assert 'enrichment_data' not in columns and records == 4, (columns, records)
+            alerts = db.get_recent_alerts(limit=30)
+            assert all(a['enrichment']['source'] == record for a in alerts)
+            assert all(a['enrichment']['destination'] == private for a in alerts)
+            # Alerts from one IP share a single parsed record
+            assert len({id(a['enrichment']['source']) for a in alerts}) == 3
+            print_success("30 legacy rows migrated to 4 ip_enrichment records")
+
+            # Unchanged records are reused; a changed one becomes a new version
+            alert = {'signature': 'New', 'src_ip': '198.51.100.1', 'dst_ip': '10.0.0.1',
+                     'severity': 'HIGH', 'timestamp': '2025-01-02 04:00:00',
+                     'enrichment': {'source': dict(record), 'destination': private}}
+            db.insert_alert(alert)
+            alert['enrichment'] = {'source': dict(record, city='Moved'), 'destination': private}
+            db.insert_alert(alert)
+            with sqlite3.connect(db_path) as conn:
+                versions = conn.execute("SELECT version FROM ip_enrichment WHERE ip = '198.51.100.1' "
+                                        "ORDER BY version").fetchall()
+            assert versions == [(1,), (2,)], versions
+            newest = db.get_recent_alerts(limit=2)
+            assert [a['enrichment']['source']['city'] for a in newest] == ['Moved', 'Unknown']
+            print_success("Records versioned per IP only when they change")
+        return True
+
+    except Exception as e:
+        print_error(f"Enrichment storage test failed: {str(e)}")
+        return False
+
+
 def test_collector():
     """Test alert collection and parsing"""
     print_header("Testing Alert Collector Module")
@@ -149,6 +1219,675 @@ def test_collector():
         return False
 
 
+def test_batch_parser():
+    """Test buffer-level batch parsing against the per-line parser"""
+    print_header("Testing Batch Alert Parser")
+
+    try:
+        parser = SnortAlertParser()
+
+        lines = [
+            "01/02-13:45:33.123456  [Classification: Attempted Information Leak] [Priority: 2] "
+            "{TCP} 192.168.1.100:54321 -> 10.0.0.1:443",
+            "",
+            "garbage line that is not an alert",
+            "2025-12-11T12:00:00,1,1000,1,Port Scan,TCP,203.0.113.5,4444,10.0.0.1,22,1,Recon,1",
+            "01/02-13:45:34.5  [Classification: Web Attack|SQLi] [Priority: 1] "
+            "{UDP} 203.0.113.9:53 -> 10.0.0.2:5353",
+            "02/30-00:00:00.000001  [Classification: Bad Date] [Priority: 3] "
+            "{TCP} 1.2.3.4:1 -> 5.6.7.8:2",
+        ]
+        buffer = ("\n".join(lines) + "\n").encode('utf-8')
+
+        # Reference: the per-line path used by read_new_alerts before batching
+        expected = []
+        for line in lines:
+            if not line.strip():
+                continue
+            alert = parser.parse_snort_line(line) or parser.parse_csv_format(line)
+            if alert:
+                expected.append(alert)
+
+        batch = parser.parse_buffer(buffer)
+        assert batch['alerts'] == expected, "Batch output differs from per-line output"
+        assert batch['matched'] == 3
+        assert batch['csv'] == 1
+        assert batch['rejected'] == 2
+        print_success(f"Batch parse matches per-line parse "
+                      f"({batch['matched']} matched, {batch['rejected']} rejected)")
+
+        return True
+
+    except Exception as e:
+        print_error(f"Batch parser test failed: {str(e)}")
+        return False
+
+
+def test_timestamp_year():
+    """Test dating year-less Snort timestamps across the new year"""
+    print_header("Testing Snort Timestamp Years")
+
+    try:
+        parser = SnortAlertParser()
+        line = ("{}  [Classification: Year Test] [Priority: 2] "
+                "{{TCP}} 203.0.113.5:4444 -> 10.0.0.1:22")
+        cases = [
+            # (read at, Snort timestamp, expected)
+            (datetime(2027, 1, 1, 0, 0, 5), "12/31-23:59:58.000000", datetime(2026, 12, 31, 23, 59, 58)),
+            (datetime(2027, 1, 1, 0, 0, 5), "01/01-00:00:03.5", datetime(2027, 1, 1, 0, 0, 3, 500000)),
+            (datetime(2026, 6, 1, 12, 0), "06/01-18:00:00.000000", datetime(2026, 6, 1, 18, 0)),
+            (datetime(2026, 6, 1, 12, 0), "12/25-00:00:00.000000", datetime(2025, 12, 25)),
+        ]
+        for now, text, expected in cases:
+            assert SnortAlertParser._parse_fast_timestamp(text, now) == expected, (now, text)
+            batch = parser.parse_buffer(f"{line.format(text)}\n".encode(), now=now)
+            assert batch['alerts'][0].timestamp == expected, (now, text, batch['alerts'][0].timestamp)
+        print_success("Dec 31 -> Jan 1 rollover dated alike by the line and batch parsers")
+
+        # Alerts stored before, dated 1900, get the year they were stored in
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "yearless.db")
+            with sqlite3.connect(path) as conn:
+                for _, _, apply, _ in MIGRATIONS[:7]:  # before partitioning
+                    apply(conn.cursor())
+                rows = [('1900-05-31 08:00:00', '2026-06-01 12:00:00', '2026-05-31 08:00:00'),
+                        ('1900-12-25 00:00:00', '2026-06-01 12:00:00', '2025-12-25 00:00:00'),
+                        ('2026-03-01 10:00:00', '2026-03-01 10:00:00', '2026-03-01 10:00:00')]
+                conn.executemany("INSERT INTO alerts (signature, src_ip, dst_ip, timestamp, created_at, "
+                                 "timestamp_us) VALUES ('Year', '203.0.113.5', '10.0.0.1', ?, ?, 0)",
+                                 [row[:2] for row in rows])
+                for alert_id, (timestamp, _, _) in enumerate(rows, 1):
+                    conn.execute("UPDATE alerts SET timestamp_us = ? WHERE id = ?",
+                                 (round(datetime.fromisoformat(timestamp).timestamp() * 1000000)
+                                  if not timestamp.startswith('1900') else
+                                  -2208988800000000 + alert_id, alert_id))
+                conn.execute("PRAGMA user_version = 7")
+            db = DatabaseManager(path)
+            stored = {a['id']: a['timestamp'] for a in db.get_recent_alerts(limit=10)}
+            assert [stored[i] for i in (1, 2, 3)] == [row[2] for row in rows], stored
+            assert not any(p['name'].startswith('alerts_1900') for p in db.get_partitions())
+            db.close()
+        print_success("Stored year-1900 alerts re-dated before partitioning")
+
+        return True
+
+    except Exception as e:
+        print_error(f"Timestamp year test failed: {str(e)}")
+        return False
+
+
+def test_tailing():
+    """Test event-driven and polling file tailing"""
+    print_header("Testing Alert File Tailing")
+
+    line = ("01/02-13:45:33.123456  [Classification: Tail Test] [Priority: 1] "
+            "{TCP} 203.0.113.7:4444 -> 10.0.0.1:22\n")
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for mode in ('auto', 'poll'):
+                alert_file = Path(tmp) / f"alert_{mode}.log"
+                alert_file.write_text("")
+
+                collector = AlertCollector(str(alert_file), tail_mode=mode,
+                                           coalesce_delay=0.02, poll_interval=0.02)
+                assert collector.start_collection()
+
+                # Nothing written: wait times out empty-handed
+                assert not collector.wait_for_alerts(timeout=0.1)
+
+                def write_burst():
+                    time.sleep(0.05)
+                    with open(alert_file, 'a') as f:
+                        for _ in range(3):
+                            f.write(line)
+                            f.flush()
+
+                writer = threading.Thread(target=write_burst)
+                writer.start()
+                start = time.time()
+                assert collector.wait_for_alerts(timeout=5)
+                latency = time.time() - start
+                writer.join()
+
+                alerts = collector.read_new_alerts()
+                assert len(alerts) == 3, f"expected 3 alerts, got {len(alerts)}"
+                print_success(f"{type(collector.watcher).__name__}: burst read as one batch "
+                              f"after {latency * 1000:.0f} ms")
+                collector.stop_collection()
+
+        return True
+
+    except Exception as e:
+        print_error(f"Tailing test failed: {str(e)}")
+        return False
+
+
+def test_checkpoints():
+    """Test resumable, rotation-safe collector checkpoints"""
+    print_header("Testing Collector Checkpoints")
+
+    def line(n):
+        return (f"01/02-13:45:{n:02d}.000000  [Classification: Checkpoint {n}] [Priority: 2] "
+                f"{{TCP}} 203.0.113.7:4444 -> 10.0.0.1:22\n")
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            alert_file = Path(tmp) / "alert_fast.log"
+            checkpoint = str(Path(tmp) / "collector.checkpoint")
+            alert_file.write_text(line(0))
+
+            collector = AlertCollector(str(alert_file), tail_mode='poll', checkpoint_file=checkpoint)
+            assert collector.start_collection()
+            with open(alert_file, 'a') as f:
+                f.write(line(1))
+                f.write(line(2)[:30])  # partial line still being written
+            assert len(collector.read_new_alerts()) == 1
+            assert collector.commit_checkpoint()
+            assert not collector.commit_checkpoint(), "unchanged checkpoint was rewritten"
+            collector.stop_collection()
+            print_success("Checkpoint written once per batch")
+
+            # While we are down: the line is finished, more alerts arrive,
+            # then logrotate renames the file and a new one is started
+            with open(alert_file, 'a') as f:
+                f.write(line(2)[30:])
+                f.write(line(3))
+            alert_file.rename(Path(tmp) / "alert_fast.log.1")
+            alert_file.write_text(line(4))
+
+            collector = AlertCollector(str(alert_file), tail_mode='poll', checkpoint_file=checkpoint)
+            assert collector.start_collection()
+            alerts = collector.read_new_alerts()
+            signatures = [a['signature'] for a in alerts]
+            assert signatures == ['Checkpoint 2', 'Checkpoint 3', 'Checkpoint 4'], signatures
+            collector.commit_checkpoint()
+            print_success("Restart resumed in the rotated file, then moved to the new one")
+
+            # copytruncate-style rotation
+            alert_file.write_text("")
+            assert collector.read_new_alerts() == []
+            with open(alert_file, 'a') as f:
+                f.write(line(5))
+            alerts = collector.read_new_alerts()
+            assert [a['signature'] for a in alerts] == ['Checkpoint 5']
+            collector.commit_checkpoint()
+            collector.stop_collection()
+            print_success("Truncation detected and re-read from the start")
+
+            # A long downtime: the backlog spans a rotation and is read one
+            # bounded chunk per call rather than in a single read
+            with open(alert_file, 'a') as f:
+                for n in range(6, 60):
+                    f.write(line(n))
+            alert_file.rename(Path(tmp) / "alert_fast.log.1")
+            alert_file.write_text(line(0) * 10)
+
+            collector = AlertCollector(str(alert_file), tail_mode='poll', checkpoint_file=checkpoint)
+            collector.READ_CHUNK_SIZE = 10 * len(line(0))
+            assert collector.start_collection()
+            batches = []
+            while collector.has_pending_data():
+                batches.append(collector.read_new_alerts())
+            signatures = [a['signature'] for batch in batches for a in batch]
+            assert signatures == [f"Checkpoint {n}" for n in range(6, 60)] + ['Checkpoint 0'] * 10, signatures
+            assert max(len(batch) for batch in batches) <= 20 and len(batches) >= 6, \
+                [len(batch) for batch in batches]
+            collector.stop_collection()
+            print_success(f"Backlog of 64 alerts read in {len(batches)} bounded chunks across a rotation")
+
+        return True
+
+    except Exception as e:
+        print_error(f"Checkpoint test failed: {str(e)}")
+        return False
+
+
+def test_backfill():
+    """Test that a parallel backfill matches a serial import"""
+    print_header("Testing Parallel Backfill")
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = Path(tmp) / "alert_fast.log"
+            with open(archive, 'w') as f:
+                for i in range(3000):
+                    if i % 100 == 0:
+                        f.write("not an alert\n")
+                    f.write(f"01/02-13:{i // 60 % 60:02d}:{i % 60:02d}.{i:06d}  "
+                            f"[Classification: Backfill {i % 7}] [Priority: {i % 3 + 1}] "
+                            f"{{TCP}} 203.0.113.{i % 250}:{1024 + i} -> 10.0.0.1:22\n")
+
+            results = {}
+            for workers in (1, 4):
+                db = DatabaseManager(str(Path(tmp) / f"backfill_{workers}.db"))
+                importer = BackfillImporter(db, workers=workers, chunk_size=4096, batch_size=500)
+                totals = importer.import_file(str(archive))
+                assert totals['alerts'] == 3000 and totals['rejected'] == 30, totals
+                results[workers] = db.get_recent_alerts(limit=10000)
+
+            strip = lambda rows: [{k: v for k, v in r.items() if k != 'created_at'} for r in rows]
+            assert strip(results[1]) == strip(results[4]), "Parallel import differs from serial"
+            print_success(f"4 workers imported the same {len(results[4])} rows as a serial import")
+
+        return True
+
+    except Exception as e:
+        print_error(f"Backfill test failed: {str(e)}")
+        return False
+
+
+def test_compressed_logs():
+    """Test streaming ingest of compressed rotated alert logs"""
+    print_header("Testing Compressed Alert Logs")
+
+    def line(n):
+        return (f"01/02-13:45:{n % 60:02d}.{n:06d}  [Classification: Archive {n}] [Priority: 2] "
+                f"{{TCP}} 203.0.113.7:4444 -> 10.0.0.1:22\n")
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # Backfill: a .gz archive yields the same rows as the plain file
+            plain = Path(tmp) / "archive.log"
+            plain.write_text("".join(line(i) for i in range(500)))
+            with open(plain, 'rb') as src, gzip.open(str(plain) + ".gz", 'wb') as dst:
+                dst.write(src.read())
+
+            rows = {}
+            for name in ("archive.log", "archive.log.gz"):
+                db = DatabaseManager(str(Path(tmp) / f"{name}.db"))
+                BackfillImporter(db, workers=2, chunk_size=2048).import_file(str(Path(tmp) / name))
+                rows[name] = [(a['signature'], a['timestamp']) for a in db.get_recent_alerts(limit=1000)]
+            assert len(rows["archive.log"]) == 500
+            assert rows["archive.log"] == rows["archive.log.gz"], "gzip backfill differs from plain"
+            print_success("Backfill from .gz matches plain-text backfill")
+
+            # Collector: the checkpointed file was rotated and compressed while down
+            alert_file = Path(tmp) / "alert_fast.log"
+            checkpoint = str(Path(tmp) / "collector.checkpoint")
+            alert_file.write_text(line(0))
+            collector = AlertCollector(str(alert_file), tail_mode='poll', checkpoint_file=checkpoint)
+            assert collector.start_collection()
+            with open(alert_file, 'a') as f:
+                f.write(line(1))
+            assert len(collector.read_new_alerts()) == 1
+            collector.commit_checkpoint()
+            collector.stop_collection()
+
+            with open(alert_file, 'a') as f:
+                f.write(line(2))
+            rotated = alert_file.rename(Path(tmp) / "alert_fast.log.1")
+            with open(rotated, 'rb') as src, gzip.open(str(rotated) + ".gz", 'wb') as dst:
+                dst.write(src.read())
+            rotated.unlink()
+            alert_file.write_text(line(3))
+
+            collector = AlertCollector(str(alert_file), tail_mode='poll', checkpoint_file=checkpoint)
+            assert collector.start_collection()
+            signatures = []
+            while collector.has_pending_data():
+                signatures += [a['signature'] for a in collector.read_new_alerts()]
+            collector.stop_collection()
+            assert signatures == ['Archive 2', 'Archive 3'], signatures
+            print_success("Restart resumed inside the compressed rotated file")
+
+        return True
+
+    except Exception as e:
+        print_error(f"Compressed log test failed: {str(e)}")
+        return False
+
+
+def test_format_sniffing():
+    """Test per-source format detection and counted parse failures"""
+    print_header("Testing Alert Format Sniffing")
+
+    samples = {
+        'fast': ("01/02-13:45:{n:02d}.000000  [Classification: Sniff] [Priority: 1] "
+                 "{{TCP}} 203.0.113.7:4444 -> 10.0.0.1:22\n"),
+        'csv': "2025-12-11T12:00:{n:02d},1,1000,1,Sniff,TCP,203.0.113.7,4444,10.0.0.1,22,1,Recon,1\n",
+        'json': ('{{"timestamp": "01/02-13:45:{n:02d}.000000", "msg": "Sniff", "class": "Recon", '
+                 '"priority": 1, "proto": "TCP", "src_ap": "203.0.113.7:4444", "dst_ap": "10.0.0.1:22"}}\n')
+    }
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for fmt, template in samples.items():
+                alert_file = Path(tmp) / f"alert_{fmt}.log"
+                alert_file.write_text("".join(template.format(n=n) for n in range(5)))
+
+                collector = AlertCollector(str(alert_file), tail_mode='poll')
+                assert collector.start_collection()
+                assert collector.line_format == fmt, f"sniffed {collector.line_format} for {fmt}"
+
+                with open(alert_file, 'a') as f:
+                    f.write(template.format(n=10))
+                    f.write("junk line\n" * 50)
+                alerts = collector.read_new_alerts()
+                assert len(alerts) == 1 and alerts[0]['src_ip'] == '203.0.113.7'
+                assert alerts[0]['dst_port'] == 22
+                stats = collector.get_stats()
+                assert stats['parse_failures'] == {fmt: 50}, stats['parse_failures']
+                collector.stop_collection()
+                print_success(f"{fmt}: detected once, 50 junk lines counted")
+
+        return True
+
+    except Exception as e:
+        print_error(f"Format sniffing test failed: {str(e)}")
+        return False
+
+
+def test_alert_record():
+    """Test the slotted Alert record and its dict view"""
+    print_header("Testing Alert Record")
+
+    try:
+        parser = SnortAlertParser()
+        buffer = b"".join(
+            b"01/02-13:45:33.123456  [Classification: Record Test] [Priority: 2] "
+            b"{TCP} 203.0.113.7:4444 -> 10.0.0.1:22\n" for _ in range(3)
+        )
+        alerts = parser.parse_buffer(buffer)['alerts']
+        alert = alerts[0]
+        assert isinstance(alert, Alert)
+        assert alerts[1].signature is alert.signature, "signature not interned"
+        assert alerts[1].protocol is alert.protocol, "protocol not interned"
+        print_success("Parser produces Alert records with shared field strings")
+
+        # Dict-style access used by the enricher, database and Flask layer
+        assert alert['src_ip'] == '203.0.113.7' and alert.get('dst_port') == 22
+        assert 'enrichment' not in alert and alert.get('missing', 'x') == 'x'
+        alert['enrichment'] = {'source': {'country': 'Testland'}, 'destination': {'country': 'Private'}}
+        view = alert.to_dict()
+        assert dict(alert) == view and view['enrichment'] == alert.enrichment
+        assert Alert.from_dict(view) == alert
+        assert pickle.loads(pickle.dumps(alert)) == alert
+        print_success("Dict view, round trip and pickling work")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseManager(str(Path(tmp) / "record.db"))
+            db.insert_alert(alert)
+            stored = db.get_recent_alerts(limit=1)[0]
+            assert stored['signature'] == 'Record Test' and stored['dst_port'] == 22
+            assert stored['enrichment']['source'] == alert.enrichment['source']
+            assert stored['enrichment']['destination'] == alert.enrichment['destination']
+        print_success("DatabaseManager stores Alert records directly")
+
+        return True
+
+    except Exception as e:
+        print_error(f"Alert record test failed: {str(e)}")
+        return False
+
+
+def test_group_commit():
+    """Test the group-commit alert writer"""
+    print_header("Testing Group Commit Writer")
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseManager(str(Path(tmp) / "group.db"))
+            committed = []
+            writer = GroupCommitWriter(db, batch_size=50, max_latency=0.2,
+                                       on_commit=lambda items: committed.append(len(items)))
+            writer.start()
+
+            # A burst fills whole groups without waiting for the latency bound
+            start = time.time()
+            writer.write_many(MockAlertGenerator.generate_batch(count=100), token='burst')
+            assert writer.flush(timeout=5)
+            elapsed = time.time() - start
+            assert committed == [50, 50] and elapsed < 0.2, (committed, elapsed)
+            print_success(f"100 alerts committed as 2 groups of 50 ({elapsed * 1000:.0f}ms)")
+
+            # A lone alert is committed once the latency bound expires
+            start = time.time()
+            writer.write(MockAlertGenerator.generate_alert())
+            assert writer.flush(timeout=5)
+            elapsed = time.time() - start
+            assert committed[-1] == 1 and 0.15 <= elapsed < 1.0, (committed, elapsed)
+            print_success(f"Partial group committed after {elapsed * 1000:.0f}ms")
+
+            writer.stop()
+            metrics = writer.get_metrics()
+            assert metrics['processed'] == 101 and metrics['batches'] == 3
+            assert metrics['avg_batch'] == 33.7 and metrics['commit_seconds'] > 0
+            assert db.get_alert_stats()['total_alerts'] == 101
+            print_success("Commit counters and stored rows match")
+
+        return True
+
+    except Exception as e:
+        print_error(f"Group commit test failed: {str(e)}")
+        return False
+
+
+def test_pipeline():
+    """Test the staged enrich/persist pipeline"""
+    print_header("Testing Processing Pipeline")
+
+    class SlowEnricher:
+        def enrich_alert(self, alert):
+            time.sleep(0.01)
+            alert['enrichment'] = {'source': {'country': 'Slow'}, 'destination': {}}
+            return alert
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseManager(str(Path(tmp) / "pipeline.db"))
+            committed = []
+            pipeline = AlertPipeline(SlowEnricher(), db, enrich_workers=4, queue_size=5,
+                                     persist_batch_size=10, on_checkpoint=committed.append)
+            pipeline.start()
+
+            # A small queue and a slow enrich stage must block the producer
+            start = time.time()
+            for i in range(6):
+                pipeline.submit(MockAlertGenerator.generate_batch(count=10), {'offset': i})
+            pipeline.submit([], {'offset': 6})
+            submit_time = time.time() - start
+            pipeline.stop()
+
+            metrics = pipeline.get_metrics()
+            assert metrics['enrich']['blocked_puts'] > 0, "no backpressure on a full queue"
+            assert metrics['enrich']['queue_size'] == 5 and metrics['enrich']['workers'] == 4
+            print_success(f"Collector held back by a full enrich queue ({submit_time:.2f}s)")
+
+            assert db.get_alert_stats()['total_alerts'] == 60
+            assert metrics['persist']['processed'] == 60 and metrics['batches_in_flight'] == 0
+            assert all(a['enrichment'] for a in db.get_recent_alerts(limit=60))
+            print_success("All alerts enriched and stored on shutdown")
+
+            offsets = [state['offset'] for state in committed]
+            assert offsets == sorted(offsets) and offsets[-1] == 6, offsets
+            print_success(f"Read positions committed in order: {offsets}")
+
+        return True
+
+    except Exception as e:
+        print_error(f"Pipeline test failed: {str(e)}")
+        return False
+
+
+def test_async_runtime():
+    """Test the asyncio enrichment, tailing and pipeline pieces"""
+    print_header("Testing asyncio Runtime")
+
+    async def handle_lookup(reader, writer):
+        request = await reader.readuntil(b'\r\n\r\n')
+        ip = request.split()[1].rsplit(b'/', 1)[-1].decode()
+        await asyncio.sleep(0.2)
+        body = ('{"country": "Testland", "countryCode": "TL", "query": "%s"}' % ip).encode()
+        writer.write(b"HTTP/1.0 200 OK\r\nContent-Type: application/json\r\n\r\n" + body)
+        await writer.drain()
+        writer.close()
+
+    async def run():
+        server = await asyncio.start_server(handle_lookup, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        ip_enricher = IPEnricher(provider=IPAPIProvider(f"http://127.0.0.1:{port}"))
+        enricher = AsyncIPEnricher(ip_enricher, max_concurrency=50)
+
+        # 50 lookups of 0.2s each must overlap rather than run in turn
+        start = time.time()
+        ips = [f"198.51.100.{i}" for i in range(1, 51)]
+        results = await asyncio.gather(*(enricher.enrich_ip(ip) for ip in ips))
+        elapsed = time.time() - start
+        assert all(r['country'] == 'Testland' for r in results)
+        assert elapsed < 2, f"lookups did not overlap ({elapsed:.2f}s)"
+        print_success(f"50 concurrent lookups in {elapsed:.2f}s")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            alert_file = Path(tmp) / "alert_fast.log"
+            alert_file.write_text("")
+            collector = AlertCollector(str(alert_file), coalesce_delay=0.01, poll_interval=0.05)
+            assert collector.start_collection()
+
+            db = DatabaseManager(str(Path(tmp) / "async.db"))
+            committed = []
+            with ThreadPoolExecutor(max_workers=1) as db_executor:
+                pipeline = AsyncAlertPipeline(enricher, db, db_executor, enrich_concurrency=20,
+                                              queue_size=10, persist_batch_size=25,
+                                              on_checkpoint=committed.append)
+                pipeline.start()
+
+                async def append_later():
+                    await asyncio.sleep(0.1)
+                    with open(alert_file, 'a') as f:
+                        for i in range(1, 41):
+                            f.write(f"01/02-13:45:33.{i:06d}  [Classification: Async Test] "
+                                    f"[Priority: 2] {{TCP}} 198.51.100.{i}:4444 -> 10.0.0.1:22\n")
+
+                writer = asyncio.ensure_future(append_later())
+                assert await collector.wait_for_alerts_async(timeout=5), "write not noticed"
+                await writer
+                alerts = collector.read_new_alerts()
+                assert len(alerts) == 40, len(alerts)
+                print_success("Async tail woke up on the write")
+
+                await pipeline.submit(alerts, collector.checkpoint_state())
+                await pipeline.stop()
+
+            metrics = pipeline.get_metrics()
+            stored = db.get_recent_alerts(limit=50)
+            assert len(stored) == 40 and metrics['persist']['processed'] == 40
+            assert all(a['enrichment']['source']['country'] == 'Testland' for a in stored)
+            assert metrics['enrich']['blocked_puts'] > 0, "no backpressure on a full queue"
+            assert committed and committed[-1]['offset'] == alert_file.stat().st_size
+            collector.stop_collection()
+            print_success("Async pipeline enriched, stored and checkpointed 40 alerts")
+
+            # The persistent cache's database tier is never read on the loop
+            other = PersistentEnrichmentCache(db)
+            other.set('203.0.113.88', {'country': 'Stored'})
+            other.close()
+            cache = PersistentEnrichmentCache(db)
+            reads = []
+            load = db.get_cached_enrichment
+            db.get_cached_enrichment = lambda ip: reads.append(threading.current_thread()) or load(ip)
+            offline = [IPEnricher(cache=cache, provider=IPAPIProvider("http://127.0.0.1:9"))
+                       for _ in range(2)]
+            result = await AsyncIPEnricher(offline[0], timeout=0.5).enrich_ip('203.0.113.88')
+            assert result['country'] != 'Stored' and not reads, reads
+            with ThreadPoolExecutor(max_workers=1) as db_executor:
+                result = await AsyncIPEnricher(offline[1], db_executor=db_executor).enrich_ip('203.0.113.88')
+            assert result['country'] == 'Stored' and reads and threading.main_thread() not in reads
+            assert cache.get_memory('203.0.113.88') == {'country': 'Stored'}
+            for ip_enricher in offline:
+                ip_enricher.close()
+            cache.close()
+            print_success("Database tier of the cache read on the db executor, not the loop")
+
+        # A half-open trial cancelled mid-lookup must not wedge the breaker
+        breaker = CircuitBreaker('Cancel test', failure_threshold=1, cooldown=0.05)
+        breaker.record_failure()
+        await asyncio.sleep(0.1)
+        trial = AsyncIPEnricher(IPEnricher(breaker=breaker,
+                                           provider=IPAPIProvider(f"http://127.0.0.1:{port}")))
+        caller = asyncio.ensure_future(trial.enrich_ip('198.51.100.200'))
+        await asyncio.sleep(0.05)
+        trial._inflight['198.51.100.200'].cancel()
+        try:
+            await caller
+        except asyncio.CancelledError:
+            pass
+        assert breaker.state == CircuitBreaker.OPEN, breaker.get_stats()
+        await asyncio.sleep(0.1)
+        assert (await trial.enrich_ip('198.51.100.201'))['country'] == 'Testland'
+        assert breaker.state == CircuitBreaker.CLOSED, breaker.get_stats()
+        print_success("Cancelled half-open trial reopened the breaker, which then recovered")
+
+        server.close()
+        await server.wait_closed()
+
+    try:
+        asyncio.run(run())
+        return True
+
+    except Exception as e:
+        print_error(f"asyncio runtime test failed: {str(e)}")
+        return False
+
+
+def test_load_generator():
+    """Test the synthetic load generator and log replay"""
+    print_header("Testing Load Generator")
+
+    try:
+        start_time = datetime(2026, 1, 1, 12, 0, 0)
+        first = list(LoadGenerator(seed=7).lines(2000, rate=1000, start_time=start_time))
+        again = list(LoadGenerator(seed=7).lines(2000, rate=1000, start_time=start_time))
+        assert first == again, "same seed gave different lines"
+        print_success("Output is reproducible for a fixed seed")
+
+        parser = SnortAlertParser()
+        for fmt in ('fast', 'csv'):
+            lines = LoadGenerator(seed=7).lines(2000, rate=1000, fmt=fmt, start_time=start_time)
+            buffer = ''.join(lines).encode('utf-8')
+            assert parser.sniff_format(buffer) == fmt
+            result = parser.buffer_parser(fmt)(buffer)
+            assert result['matched'] == 2000 and result['rejected'] == 0, (fmt, result['rejected'])
+        print_success("Fast and CSV lines all parse")
+
+        generator = LoadGenerator(seed=7, attackers=500, scan_probability=0.01, scan_length=50)
+        alerts = list(generator.alerts(20000, rate=1000, start_time=start_time))
+        sources = {}
+        for alert in alerts:
+            sources[alert.src_ip] = sources.get(alert.src_ip, 0) + 1
+        top = max(sources.values())
+        assert top > 20 * len(alerts) / 500, "attackers not Zipf-skewed"
+        assert alerts[-1].timestamp - alerts[0].timestamp == timedelta(seconds=19.999)
+        scan_ports = [a.dst_port for a in alerts if a.dst_port < 50 and a.signature == LoadGenerator.SCAN_SIGNATURE]
+        assert scan_ports, "no scan bursts generated"
+        print_success(f"Top attacker sent {top} of {len(alerts)} alerts; scan bursts present")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            target = Path(tmp) / "load.log"
+            result = write_lines(str(target), LoadGenerator(seed=7).lines(2000, rate=10000), rate=10000)
+            assert result['lines'] == 2000 and len(target.read_text().splitlines()) == 2000
+            assert result['elapsed'] >= 0.15, f"rate not enforced ({result['elapsed']:.2f}s)"
+            print_success(f"Wrote 2000 lines at {result['lines_per_sec']:,.0f} lines/sec (target 10,000)")
+
+            # A 2 second capture replayed at 10x takes about 0.2 seconds
+            capture = Path(tmp) / "capture.log.gz"
+            with gzip.open(capture, 'wt') as f:
+                f.writelines(LoadGenerator(seed=7).lines(200, rate=100, start_time=start_time))
+            replayed = Path(tmp) / "replayed.log"
+            result = replay_log(str(capture), str(replayed), speed=10, retime=True)
+            assert result['lines'] == 200 and abs(result['capture_seconds'] - 1.99) < 0.01
+            assert 0.15 <= result['elapsed'] < 1.0, f"replay took {result['elapsed']:.2f}s"
+            last = line_timestamp(replayed.read_text().splitlines()[-1])
+            assert (last.month, last.day) == (datetime.now().month, datetime.now().day)
+            print_success(f"Replayed 2s capture at 10x in {result['elapsed']:.2f}s with current timestamps")
+
+        return True
+
+    except Exception as e:
+        print_error(f"Load generator test failed: {str(e)}")
+        return False
+
+
 def test_correlator():
     """Test correlation engine"""
     print_header("Testing Correlation Engine")
@@ -236,8 +1975,34 @@ def main():
 
     tests = [
         ("Database Module", test_database),
+        ("Database Connection Pool", test_connection_pool),
+        ("Time-Range Queries", test_time_range_queries),
+        ("Schema Migrations", test_schema_migrations),
+        ("Alert Partitions", test_partitions),
         ("IP Enrichment", test_enricher),
+        ("Enrichment Cache", test_enrichment_cache),
+        ("Persistent Enrichment Cache", test_persistent_cache),
+        ("Offline GeoIP Database", test_geoip),
+        ("Network Classification", test_network_classifier),
+        ("Lookup Coalescing", test_lookup_coalescing),
+        ("Enrichment Failure Handling", test_enrichment_failures),
+        ("Enrichment Rate Limiter", test_rate_limiter),
+        ("Enrichment Providers", test_enrichment_providers),
+        ("Deferred Enrichment", test_deferred_enrichment),
+        ("Normalized Enrichment Storage", test_enrichment_storage),
         ("Alert Collection", test_collector),
+        ("Batch Alert Parser", test_batch_parser),
+        ("Snort Timestamp Years", test_timestamp_year),
+        ("Alert File Tailing", test_tailing),
+        ("Collector Checkpoints", test_checkpoints),
+        ("Parallel Backfill", test_backfill),
+        ("Compressed Alert Logs", test_compressed_logs),
+        ("Alert Format Sniffing", test_format_sniffing),
+        ("Alert Record", test_alert_record),
+        ("Group Commit Writer", test_group_commit),
+        ("Processing Pipeline", test_pipeline),
+        ("asyncio Runtime", test_async_runtime),
+        ("Load Generator", test_load_generator),
         ("Correlation Engine", test_correlator),
         ("End-to-End System", test_end_to_end),
     ]